@@ -0,0 +1,28 @@
+"""Add doctor calendar version
+
+Revision ID: 4e7a2c9d1b58
+Revises: b27e9d3f4a10
+Create Date: 2025-06-23 10:12:37.511204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e7a2c9d1b58'
+down_revision: Union[str, None] = 'b27e9d3f4a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('doctors', sa.Column('calendar_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('doctors', 'calendar_version')
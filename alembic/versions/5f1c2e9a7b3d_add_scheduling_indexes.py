@@ -0,0 +1,39 @@
+"""Add scheduling indexes
+
+Revision ID: 5f1c2e9a7b3d
+Revises: c86bb0400409
+Create Date: 2025-06-20 10:12:44.531207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f1c2e9a7b3d'
+down_revision: Union[str, None] = 'c86bb0400409'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_appointments_doctor_id_start_time_end_time', 'appointments', ['doctor_id', 'start_time', 'end_time'], unique=False)
+    op.create_index(
+        'ix_appointments_scheduled_doctor_id_start_time',
+        'appointments',
+        ['doctor_id', 'start_time', 'end_time'],
+        unique=False,
+        postgresql_where=sa.text("status = 'scheduled'"),
+        sqlite_where=sa.text("status = 'scheduled'"),
+    )
+    op.create_index('ix_doctor_availabilities_doctor_id_start_time_end_time', 'doctor_availabilities', ['doctor_id', 'start_time', 'end_time'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_doctor_availabilities_doctor_id_start_time_end_time', table_name='doctor_availabilities')
+    op.drop_index('ix_appointments_scheduled_doctor_id_start_time', table_name='appointments')
+    op.drop_index('ix_appointments_doctor_id_start_time_end_time', table_name='appointments')
@@ -0,0 +1,84 @@
+"""Add appointment overlap exclusion constraint
+
+Revision ID: 8d4a61f0c2e5
+Revises: 5f1c2e9a7b3d
+Create Date: 2025-06-21 09:40:18.220514
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4a61f0c2e5'
+down_revision: Union[str, None] = '5f1c2e9a7b3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Scheduled appointments the constraint would reject: pairs of one doctor's
+# bookings that overlap, and bookings that end before they start (tsrange
+# refuses those outright).
+CONFLICTS = sa.text("""
+    SELECT a.id, b.id, a.doctor_id, a.start_time, a.end_time, b.start_time, b.end_time
+    FROM appointments a
+    JOIN appointments b
+      ON b.doctor_id = a.doctor_id AND b.id > a.id
+     AND b.start_time < a.end_time AND a.start_time < b.end_time
+    WHERE a.status = 'scheduled' AND b.status = 'scheduled'
+    ORDER BY a.doctor_id, a.start_time, b.start_time
+""")
+REVERSED = sa.text("""
+    SELECT id, doctor_id, start_time, end_time
+    FROM appointments
+    WHERE status = 'scheduled' AND end_time < start_time
+    ORDER BY id
+""")
+
+
+def check_existing_bookings() -> None:
+    """Refuse to upgrade while existing rows violate the constraint.
+
+    Bookings made before the guarded insert could race each other into
+    double bookings. Which of two overlapping patients keeps the slot is a
+    decision for the clinic, so the migration does not cancel anything: it
+    lists the offending rows and stops, to be rerun once they are resolved.
+    """
+    bind = op.get_bind()
+    problems = [
+        f"  appointments {first} and {second} of doctor {doctor_id} overlap: "
+        f"{first_start} - {first_end} and {second_start} - {second_end}"
+        for first, second, doctor_id, first_start, first_end, second_start, second_end
+        in bind.execute(CONFLICTS)
+    ]
+    problems.extend(
+        f"  appointment {appointment_id} of doctor {doctor_id} ends before it starts: {start} - {end}"
+        for appointment_id, doctor_id, start, end in bind.execute(REVERSED)
+    )
+    if problems:
+        raise RuntimeError(
+            "Cannot add appointments_no_overlap; cancel or reschedule these scheduled "
+            "appointments and run the upgrade again:\n" + "\n".join(problems)
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    check_existing_bookings()
+    # btree_gist provides the gist operator class for the integer equality part.
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    op.create_exclude_constraint(
+        'appointments_no_overlap',
+        'appointments',
+        ('doctor_id', '='),
+        (sa.text('tsrange(start_time, end_time)'), '&&'),
+        using='gist',
+        where=sa.text("status = 'scheduled'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('appointments_no_overlap', 'appointments', type_='exclude')
@@ -0,0 +1,53 @@
+"""Add availability rules
+
+Revision ID: 9c3f5e1a7d24
+Revises: 4e7a2c9d1b58
+Create Date: 2025-06-24 09:41:12.087254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c3f5e1a7d24'
+down_revision: Union[str, None] = '4e7a2c9d1b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('availability_rules',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('weekday_mask', sa.Integer(), nullable=False),
+    sa.Column('start_date', sa.Date(), nullable=False),
+    sa.Column('end_date', sa.Date(), nullable=True),
+    sa.Column('start_time', sa.Time(), nullable=False),
+    sa.Column('end_time', sa.Time(), nullable=False),
+    sa.ForeignKeyConstraint(['doctor_id'], ['doctors.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_availability_rules_id'), 'availability_rules', ['id'], unique=False)
+    op.create_index('ix_availability_rules_doctor_id_start_date', 'availability_rules', ['doctor_id', 'start_date'], unique=False)
+    op.create_table('availability_exceptions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('rule_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.ForeignKeyConstraint(['rule_id'], ['availability_rules.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('rule_id', 'date', name='uq_availability_exceptions_rule_id_date')
+    )
+    op.create_index(op.f('ix_availability_exceptions_id'), 'availability_exceptions', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_availability_exceptions_id'), table_name='availability_exceptions')
+    op.drop_table('availability_exceptions')
+    op.drop_index('ix_availability_rules_doctor_id_start_date', table_name='availability_rules')
+    op.drop_index(op.f('ix_availability_rules_id'), table_name='availability_rules')
+    op.drop_table('availability_rules')
@@ -0,0 +1,37 @@
+"""Add listing filter indexes
+
+Revision ID: b27e9d3f4a10
+Revises: 8d4a61f0c2e5
+Create Date: 2025-06-22 16:05:51.904377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b27e9d3f4a10'
+down_revision: Union[str, None] = '8d4a61f0c2e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # text_pattern_ops lets LIKE 'prefix%' use the index under any collation.
+    for table in ('patients', 'doctors'):
+        for column in ('first_name', 'last_name'):
+            op.create_index(f'ix_{table}_{column}_lower', table, [sa.text(f'lower({column}) text_pattern_ops')], unique=False)
+    op.create_index('ix_patients_insurance', 'patients', ['insurance'], unique=False)
+    op.create_index('ix_doctors_specialization', 'doctors', ['specialization'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_doctors_specialization', table_name='doctors')
+    op.drop_index('ix_patients_insurance', table_name='patients')
+    for table in ('patients', 'doctors'):
+        for column in ('first_name', 'last_name'):
+            op.drop_index(f'ix_{table}_{column}_lower', table_name=table)
@@ -0,0 +1,39 @@
+"""Add doctor search trigram index
+
+Revision ID: b7e2d4a91c63
+Revises: d5b8e3f16a72
+Create Date: 2025-06-28 10:14:52.601384
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2d4a91c63'
+down_revision: Union[str, None] = 'd5b8e3f16a72'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        'ix_doctors_search_trgm',
+        'doctors',
+        [sa.text("lower(first_name || ' ' || last_name || ' ' || specialization) gin_trgm_ops")],
+        unique=False,
+        postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_doctors_search_trgm', table_name='doctors')
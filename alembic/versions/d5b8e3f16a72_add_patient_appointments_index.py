@@ -0,0 +1,28 @@
+"""Add patient appointments index
+
+Revision ID: d5b8e3f16a72
+Revises: 9c3f5e1a7d24
+Create Date: 2025-06-27 11:03:18.240917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5b8e3f16a72'
+down_revision: Union[str, None] = '9c3f5e1a7d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_appointments_patient_id_start_time', 'appointments', ['patient_id', 'start_time'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_appointments_patient_id_start_time', table_name='appointments')
@@ -0,0 +1,96 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import async_crud, crud, records, schemas
+from typing import List, Optional
+from datetime import date
+from app.schemas import TimeSlot
+from app.models import User
+from app.security import require_role_async
+from app.database import get_async_db, get_async_read_db
+from app.api.endpoints import (
+    MAX_PAGE_SIZE, next_cursor_headers, validate_search_range, slot_search_response,
+    slots_etag, slots_headers, slots_not_modified
+)
+
+# Served instead of the matching routes in app.api.endpoints when
+# DB_MODE=async; see app.main.
+router = APIRouter()
+
+@router.get("/patients", response_model=List[schemas.PatientOut])
+async def list_patients(
+    cursor: Optional[int] = Query(None, description="Next-page cursor from the X-Next-Cursor header"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    name: Optional[str] = Query(None, description="Prefix of the first or last name"),
+    insurance: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(require_role_async(["admin"]))
+):
+    patients, next_cursor = await db.run_sync(
+        crud.list_patient_records, cursor=cursor, limit=limit, name=name, insurance=insurance
+    )
+    return records.json_response(patients, next_cursor_headers(next_cursor))
+
+@router.get("/doctors", response_model=List[schemas.DoctorOut])
+async def list_doctors(
+    cursor: Optional[int] = Query(None, description="Next-page cursor from the X-Next-Cursor header"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    name: Optional[str] = Query(None, description="Prefix of the first or last name"),
+    specialization: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(require_role_async(["admin"]))
+):
+    doctors, next_cursor = await db.run_sync(
+        crud.list_doctor_records, cursor=cursor, limit=limit, name=name, specialization=specialization
+    )
+    return records.json_response(doctors, next_cursor_headers(next_cursor))
+
+@router.get("/doctors/{doctor_id}/available-slots", response_model=List[TimeSlot],
+            responses={304: {"description": "The slots still match the If-None-Match ETag"}})
+async def get_available_slots(
+    doctor_id: int,
+    request: Request,
+    date: date = Query(..., description="Date in YYYY-MM-DD format"),
+    duration_minutes: int = Query(30, ge=5, le=240, description="Desired appointment duration in minutes"),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(require_role_async(["admin","doctor"]))
+):
+    version = await async_crud.get_calendar_version(db, doctor_id)
+    etag = slots_etag(doctor_id, version, date, duration_minutes)
+    not_modified = slots_not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+    slots = await async_crud.generate_open_slots(db, doctor_id, date, duration_minutes, version=version)
+    return records.json_response(slots, slots_headers(etag))
+
+@router.get("/available-slots/search")
+async def search_available_slots(
+    start_date: date = Query(..., description="First date to search, YYYY-MM-DD"),
+    end_date: date = Query(..., description="Last date to search (inclusive), YYYY-MM-DD"),
+    duration_minutes: int = Query(30, ge=5, le=240, description="Desired appointment duration in minutes"),
+    specialization: Optional[str] = Query(None),
+    doctor_ids: Optional[List[int]] = Query(None, alias="doctor_id"),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(require_role_async(["admin","doctor"]))
+):
+    validate_search_range(start_date, end_date)
+    results = await async_crud.search_open_slots(
+        db, start_date, end_date, duration_minutes,
+        specialization=specialization, doctor_ids=doctor_ids
+    )
+    return slot_search_response(results)
+
+@router.post("/appointments", response_model=schemas.AppointmentOut)
+async def create_appointment(
+    appt: schemas.AppointmentCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_role_async("admin"))
+):
+    if appt.end_time <= appt.start_time:
+        raise HTTPException(status_code=400, detail="end_time must be after start_time")
+    if not await async_crud.is_doctor_available(db, appt.doctor_id, appt.start_time, appt.end_time):
+        raise HTTPException(status_code=400, detail="Doctor not available at that time.")
+
+    db_appointment = await async_crud.create_appointment(db, appt)
+    if db_appointment is None:
+        raise HTTPException(status_code=400, detail="Doctor not available at that time.")
+    return db_appointment
@@ -1,16 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect, status
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from app import crud, schemas, database, models
-from typing import List
-from datetime import date
+from app import crud, schemas, database, models, export, bulk, slot_store, events, metrics, records, reports
+from typing import List, Optional, Tuple
+from datetime import date, datetime
+from collections import Counter
+import asyncio
 from app.schemas import TimeSlot, UserCreate, UserOut, Token
-from app.models import User, Doctor
-from app.security import get_password_hash, verify_password, create_access_token, get_current_user, require_role
+from app.models import User, Doctor, Patient, Role, AppointmentStatus
+from app.security import verify_password, create_access_token, get_current_user, require_role, require_role_ws
 from fastapi.security import OAuth2PasswordRequestForm
-from app.database import get_db
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from app.database import get_db, get_read_db
+from app.config import settings
+from app.hashing import hasher
 
 router = APIRouter()
 
+MAX_SEARCH_DAYS = 31
+MAX_NEXT_AVAILABLE = 50
+MAX_NEXT_AVAILABLE_DAYS = 366
+MAX_PAGE_SIZE = 1000
+MAX_BATCH_SIZE = 200
+BULK_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": {"type": "array", "items": {"type": "object"}}},
+            "text/csv": {"schema": {"type": "string"}},
+        },
+    }
+}
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def next_cursor_headers(next_cursor) -> dict:
+    return {NEXT_CURSOR_HEADER: str(next_cursor)} if next_cursor is not None else {}
+
 @router.post("/register", response_model=UserOut)
 def register(
     user: UserCreate, 
@@ -18,12 +43,7 @@ def register(
 ):
     if db.query(User).filter(User.email == user.email).first():
         raise HTTPException(status_code=400, detail="Email already registered")
-    hashed = get_password_hash(user.password)
-    db_user = User(email=user.email, hashed_password=hashed, role=user.role)
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+    return crud.create_user(db, user)
 
 @router.post("/login", response_model=Token)
 def login(
@@ -33,7 +53,7 @@ def login(
     user = db.query(User).filter(User.email == form.username).first()
     if not user or not verify_password(form.password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    token = create_access_token(data={"sub": user.email})
+    token = create_access_token(data={"sub": user.email, "uid": user.id, "role": user.role.value})
     return {"access_token": token, "token_type": "bearer"}
 
 @router.post("/patients", response_model=schemas.PatientOut)
@@ -46,10 +66,15 @@ def create_patient(
 
 @router.get("/patients", response_model=List[schemas.PatientOut])
 def list_patients(
-    db: Session = Depends(database.get_db),
+    cursor: Optional[int] = Query(None, description="Next-page cursor from the X-Next-Cursor header"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    name: Optional[str] = Query(None, description="Prefix of the first or last name"),
+    insurance: Optional[str] = Query(None),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(require_role(["admin"]))
 ):
-    return db.query(models.Patient).all()
+    patients, next_cursor = crud.list_patient_records(db, cursor=cursor, limit=limit, name=name, insurance=insurance)
+    return records.json_response(patients, next_cursor_headers(next_cursor))
 
 @router.post("/doctors", response_model=schemas.DoctorOut)
 def create_doctor(
@@ -61,20 +86,193 @@ def create_doctor(
 
 @router.get("/doctors", response_model=List[schemas.DoctorOut])
 def list_doctors(
-    db: Session = Depends(database.get_db),
+    cursor: Optional[int] = Query(None, description="Next-page cursor from the X-Next-Cursor header"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    name: Optional[str] = Query(None, description="Prefix of the first or last name"),
+    specialization: Optional[str] = Query(None),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(require_role(["admin"]))
 ):
-    return db.query(models.Doctor).all()
+    doctors, next_cursor = crud.list_doctor_records(
+        db, cursor=cursor, limit=limit, name=name, specialization=specialization
+    )
+    return records.json_response(doctors, next_cursor_headers(next_cursor))
+
+@router.get("/doctors/search", response_model=List[schemas.DoctorOut])
+def search_doctors(
+    q: str = Query(..., min_length=1, max_length=100, description="Start of a name or specialization word"),
+    specialization: Optional[str] = Query(None),
+    cursor: Optional[int] = Query(None, ge=0, description="Next-page cursor from the X-Next-Cursor header"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_role(["admin", "doctor", "patient"]))
+):
+    doctors, next_cursor = crud.search_doctor_records(
+        db, q, specialization=specialization, offset=cursor or 0, limit=limit
+    )
+    return records.json_response(doctors, next_cursor_headers(next_cursor))
+
+# Authenticated and different per user, so shared caches must not store it;
+# browsers may, as long as they revalidate with If-None-Match.
+SLOT_CACHE_HEADERS = {"Cache-Control": "private, no-cache", "Vary": "Authorization"}
+
+def slots_etag(doctor_id: int, version: int, day: date, duration_minutes: int) -> str:
+    return f'"{doctor_id}-{version}-{day.isoformat()}-{duration_minutes}"'
 
-@router.get("/doctors/{doctor_id}/available-slots", response_model=List[TimeSlot])
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # If-None-Match uses the weak comparison, so W/"..." matches as well.
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+def slots_headers(etag: str) -> dict:
+    return {"ETag": etag, **SLOT_CACHE_HEADERS}
+
+def slots_not_modified(request: Request, etag: str) -> Optional[Response]:
+    """A 304 when the client already has ``etag``, otherwise None."""
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=slots_headers(etag))
+    return None
+
+@router.get("/doctors/{doctor_id}/available-slots", response_model=List[TimeSlot],
+            responses={304: {"description": "The slots still match the If-None-Match ETag"}})
 def get_available_slots(
     doctor_id: int,
+    request: Request,
     date: date = Query(..., description="Date in YYYY-MM-DD format"),
     duration_minutes: int = Query(30, ge=5, le=240, description="Desired appointment duration in minutes"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_role(["admin","doctor"]))
+):
+    version = crud.get_calendar_version(db, doctor_id)
+    etag = slots_etag(doctor_id, version, date, duration_minutes)
+    not_modified = slots_not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+    slots = crud.generate_open_slots(db, doctor_id, date, duration_minutes, version=version)
+    return records.json_response(slots, slots_headers(etag))
+
+def current_slots(db: Session, doctor_id: int, day: date, duration_minutes: int) -> Tuple[int, List[dict]]:
+    try:
+        version = crud.get_calendar_version(db, doctor_id)
+        return version, crud.generate_open_slots(db, doctor_id, day, duration_minutes, version=version)
+    finally:
+        # Hand the connection back between updates; the session opens a new
+        # one on its next query.
+        db.close()
+
+def slot_delta(old: List[dict], new: List[dict]) -> Tuple[List[dict], List[dict]]:
+    old_counts = Counter((slot["start"], slot["end"]) for slot in old)
+    new_counts = Counter((slot["start"], slot["end"]) for slot in new)
+    added = [{"start": start, "end": end} for start, end in sorted((new_counts - old_counts).elements())]
+    removed = [{"start": start, "end": end} for start, end in sorted((old_counts - new_counts).elements())]
+    return added, removed
+
+async def wait_for_disconnect(websocket: WebSocket):
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+@router.websocket("/ws/doctors/{doctor_id}/slots")
+async def slot_updates(
+    websocket: WebSocket,
+    doctor_id: int,
+    date: date = Query(..., description="Date in YYYY-MM-DD format"),
+    duration_minutes: int = Query(30, ge=5, le=240, description="Desired appointment duration in minutes"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_role_ws(["admin","doctor"]))
+):
+    """Send the day's slots, then a delta whenever they change.
+
+    Changes made in this process are pushed through app.events; changes made
+    by other workers are found by re-reading the calendar version when the
+    subscription has been idle for SLOT_EVENTS_RECHECK_SECONDS.
+    """
+    await websocket.accept()
+    # Subscribe before the first read so no change falls in between.
+    subscription = events.hub.subscribe(doctor_id, date)
+    disconnected = asyncio.ensure_future(wait_for_disconnect(websocket))
+    try:
+        version, slots = await run_in_threadpool(current_slots, db, doctor_id, date, duration_minutes)
+        await websocket.send_json({
+            "type": "snapshot", "doctor_id": doctor_id, "date": date.isoformat(),
+            "version": version, "slots": slots,
+        })
+        while True:
+            next_change = asyncio.ensure_future(subscription.get(settings.slot_events_recheck_seconds))
+            await asyncio.wait({next_change, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                next_change.cancel()
+                return
+            if subscription.drain():
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Subscriber fell behind")
+                return
+            new_version, new_slots = await run_in_threadpool(current_slots, db, doctor_id, date, duration_minutes)
+            added, removed = slot_delta(slots, new_slots)
+            version, slots = new_version, new_slots
+            if added or removed:
+                await websocket.send_json({"type": "delta", "version": version, "added": added, "removed": removed})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        disconnected.cancel()
+        events.hub.unsubscribe(subscription)
+
+def validate_search_range(start_date: date, end_date: date):
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    if (end_date - start_date).days >= MAX_SEARCH_DAYS:
+        raise HTTPException(status_code=400, detail=f"Search range is limited to {MAX_SEARCH_DAYS} days")
+
+def slot_search_response(results) -> StreamingResponse:
+    def stream():
+        for doctor_id, day, slots in results:
+            yield schemas.DoctorDaySlots(doctor_id=doctor_id, date=day, slots=slots).model_dump_json() + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@router.get("/available-slots/search")
+def search_available_slots(
+    start_date: date = Query(..., description="First date to search, YYYY-MM-DD"),
+    end_date: date = Query(..., description="Last date to search (inclusive), YYYY-MM-DD"),
+    duration_minutes: int = Query(30, ge=5, le=240, description="Desired appointment duration in minutes"),
+    specialization: Optional[str] = Query(None),
+    doctor_ids: Optional[List[int]] = Query(None, alias="doctor_id"),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(require_role(["admin","doctor"]))
 ):
-    return crud.generate_open_slots(db, doctor_id, date, duration_minutes)
+    validate_search_range(start_date, end_date)
+    results = crud.search_open_slots(
+        db, start_date, end_date, duration_minutes,
+        specialization=specialization, doctor_ids=doctor_ids
+    )
+    return slot_search_response(results)
+
+@router.get("/available-slots/next", response_model=List[schemas.NextAvailableSlot])
+def next_available_slots(
+    duration_minutes: int = Query(30, ge=5, le=240, description="Desired appointment duration in minutes"),
+    doctor_id: Optional[int] = Query(None),
+    specialization: Optional[str] = Query(None, description="Search all doctors of this specialization"),
+    start: Optional[datetime] = Query(None, description="Earliest start time, defaults to now"),
+    count: int = Query(1, ge=1, le=MAX_NEXT_AVAILABLE),
+    max_days: int = Query(crud.NEXT_AVAILABLE_DAYS, ge=1, le=MAX_NEXT_AVAILABLE_DAYS,
+                          description="How many days ahead to look"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_role(["admin","doctor"]))
+):
+    if doctor_id is not None:
+        doctor_ids = [doctor_id]
+    elif specialization:
+        doctor_ids = crud.specialization_doctor_ids(db, specialization)
+    else:
+        raise HTTPException(status_code=400, detail="Pass doctor_id or specialization")
+    if start is not None and start.tzinfo is not None:
+        # Calendars are stored in the clinic's local wall-clock time.
+        raise HTTPException(status_code=400, detail="start must be a local time without a UTC offset")
+    return records.json_response(crud.next_available_slots(
+        db, doctor_ids, duration_minutes, start or datetime.now(), count=count, max_days=max_days
+    ))
 
 @router.post("/appointments", response_model=schemas.AppointmentOut)
 def create_appointment(
@@ -82,17 +280,29 @@ def create_appointment(
     db: Session = Depends(get_db), 
     current_user: User = Depends(require_role("admin"))
 ):
+    if appt.end_time <= appt.start_time:
+        raise HTTPException(status_code=400, detail="end_time must be after start_time")
     if not crud.is_doctor_available(db, appt.doctor_id, appt.start_time, appt.end_time):
         raise HTTPException(status_code=400, detail="Doctor not available at that time.")
-    
-    return crud.create_appointment(db, appt)
 
-@router.post("/availabilities", response_model=schemas.AvailabilityOut)
-def create_availability(
-    availability: schemas.AvailabilityCreate, 
-    db: Session = Depends(get_db), 
-    current_user: User = Depends(require_role("doctor"))
+    db_appointment = crud.create_appointment(db, appt)
+    if db_appointment is None:
+        raise HTTPException(status_code=400, detail="Doctor not available at that time.")
+    return db_appointment
+
+@router.post("/appointments/batch", response_model=schemas.BulkImportResult)
+def create_appointments_batch(
+    batch: schemas.AppointmentBatchCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role("admin"))
 ):
+    if not batch.appointments:
+        raise HTTPException(status_code=400, detail="appointments must not be empty")
+    if len(batch.appointments) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SIZE} appointments per batch")
+    return crud.create_appointments_batch(db, batch.appointments, batch.mode)
+
+def current_doctor(db: Session, current_user: User) -> Doctor:
     doctor = (
         db.query(Doctor)
         .join(Doctor.user)
@@ -101,5 +311,317 @@ def create_availability(
     )
     if not doctor:
         raise HTTPException(status_code=404, detail="Doctor profile not found")
-    
+    return doctor
+
+@router.post("/availabilities", response_model=schemas.AvailabilityOut)
+def create_availability(
+    availability: schemas.AvailabilityCreate, 
+    db: Session = Depends(get_db), 
+    current_user: User = Depends(require_role("doctor"))
+):
+    if availability.end_time <= availability.start_time:
+        raise HTTPException(status_code=400, detail="end_time must be after start_time")
+    doctor = current_doctor(db, current_user)
     return crud.create_availability(db, doctor.id, availability)
+
+@router.post("/availability-rules", response_model=schemas.AvailabilityRuleOut)
+def create_availability_rule(
+    rule: schemas.AvailabilityRuleCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role("doctor"))
+):
+    if not rule.weekdays:
+        raise HTTPException(status_code=400, detail="weekdays must not be empty")
+    if rule.end_time <= rule.start_time:
+        raise HTTPException(status_code=400, detail="end_time must be after start_time")
+    if rule.end_date is not None and rule.end_date < rule.start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    doctor = current_doctor(db, current_user)
+    return crud.create_availability_rule(db, doctor.id, rule)
+
+@router.post("/availability-rules/{rule_id}/exceptions", response_model=schemas.AvailabilityRuleOut)
+def add_availability_exceptions(
+    rule_id: int,
+    exceptions: schemas.AvailabilityExceptionCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role("doctor"))
+):
+    doctor = current_doctor(db, current_user)
+    rule = crud.get_availability_rule(db, rule_id)
+    if rule is None or rule.doctor_id != doctor.id:
+        raise HTTPException(status_code=404, detail="Availability rule not found")
+    return crud.add_availability_exceptions(db, rule, exceptions.dates)
+
+
+def current_patient(db: Session, current_user: User) -> Patient:
+    patient = (
+        db.query(Patient)
+        .join(Patient.user)
+        .filter(User.email == current_user.email)
+        .first()
+    )
+    if not patient:
+        raise HTTPException(status_code=404, detail="Patient profile not found")
+    return patient
+
+def appointment_scope(db: Session, current_user: User) -> dict:
+    """Owner filters for the caller's appointments; admins are not restricted."""
+    if current_user.role == Role.doctor:
+        return {"doctor_id": current_doctor(db, current_user).id}
+    if current_user.role == Role.patient:
+        return {"patient_id": current_patient(db, current_user).id}
+    return {}
+
+def get_scoped_appointment(db: Session, appointment_id: int, scope: dict):
+    appointment = crud.get_appointment(db, appointment_id)
+    if appointment is None or any(getattr(appointment, key) != value for key, value in scope.items()):
+        raise HTTPException(status_code=404, detail="Appointment not found")
+    return appointment
+
+def appointment_not_scheduled(appointment) -> HTTPException:
+    return HTTPException(status_code=409, detail=f"Appointment is already {appointment.status.value}")
+
+def transition_appointment(db: Session, appointment_id: int, new_status: AppointmentStatus, current_user: User):
+    scope = appointment_scope(db, current_user)
+    appointment = crud.transition_appointment(db, appointment_id, new_status, **scope)
+    if appointment is None:
+        # Only the failure path reads the row, to tell the two cases apart.
+        raise appointment_not_scheduled(get_scoped_appointment(db, appointment_id, scope))
+    return appointment
+
+@router.post("/appointments/{appointment_id}/cancel", response_model=schemas.AppointmentOut)
+def cancel_appointment(
+    appointment_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["admin", "doctor", "patient"]))
+):
+    return transition_appointment(db, appointment_id, AppointmentStatus.canceled, current_user)
+
+@router.post("/appointments/{appointment_id}/complete", response_model=schemas.AppointmentOut)
+def complete_appointment(
+    appointment_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["admin", "doctor"]))
+):
+    return transition_appointment(db, appointment_id, AppointmentStatus.completed, current_user)
+
+@router.post("/appointments/{appointment_id}/reschedule", response_model=schemas.AppointmentOut)
+def reschedule_appointment(
+    appointment_id: int,
+    new_time: schemas.AppointmentReschedule,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(["admin", "doctor"]))
+):
+    if new_time.end_time <= new_time.start_time:
+        raise HTTPException(status_code=400, detail="end_time must be after start_time")
+    scope = appointment_scope(db, current_user)
+    appointment = get_scoped_appointment(db, appointment_id, scope)
+    if appointment.status != AppointmentStatus.scheduled:
+        raise appointment_not_scheduled(appointment)
+    if not crud.availability_covers(db, appointment.doctor_id, new_time.start_time, new_time.end_time):
+        raise HTTPException(status_code=400, detail="Doctor not available at that time.")
+
+    moved = crud.reschedule_appointment(db, appointment, new_time.start_time, new_time.end_time)
+    if moved is None:
+        if appointment.status != AppointmentStatus.scheduled:
+            raise appointment_not_scheduled(appointment)
+        raise HTTPException(status_code=400, detail="Doctor not available at that time.")
+    return moved
+
+def encode_appointment_cursor(cursor: Tuple[datetime, int]) -> str:
+    return f"{cursor[0].isoformat()}_{cursor[1]}"
+
+def decode_appointment_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    if cursor is None:
+        return None
+    try:
+        start_time, appointment_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(start_time), int(appointment_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def appointments_page(db: Session, cursor: Optional[str], limit: int, **filters):
+    if filters["start_date"] and filters["end_date"] and filters["end_date"] < filters["start_date"]:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    appointments, next_cursor = crud.list_appointment_records(
+        db, cursor=decode_appointment_cursor(cursor), limit=limit, **filters
+    )
+    return records.json_response(
+        appointments, next_cursor_headers(next_cursor and encode_appointment_cursor(next_cursor))
+    )
+
+@router.get("/doctors/{doctor_id}/appointments", response_model=List[schemas.AppointmentOut])
+def list_doctor_appointments(
+    doctor_id: int,
+    start_date: Optional[date] = Query(None, description="First date, YYYY-MM-DD"),
+    end_date: Optional[date] = Query(None, description="Last date (inclusive), YYYY-MM-DD"),
+    appointment_status: Optional[AppointmentStatus] = Query(None, alias="status"),
+    cursor: Optional[str] = Query(None, description="Next-page cursor from the X-Next-Cursor header"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_role(["admin", "doctor"]))
+):
+    if appointment_scope(db, current_user).get("doctor_id", doctor_id) != doctor_id:
+        raise HTTPException(status_code=403, detail="Doctors can only list their own appointments")
+    return appointments_page(
+        db, cursor, limit, doctor_id=doctor_id,
+        start_date=start_date, end_date=end_date, status=appointment_status
+    )
+
+@router.get("/patients/{patient_id}/appointments", response_model=List[schemas.AppointmentOut])
+def list_patient_appointments(
+    patient_id: int,
+    start_date: Optional[date] = Query(None, description="First date, YYYY-MM-DD"),
+    end_date: Optional[date] = Query(None, description="Last date (inclusive), YYYY-MM-DD"),
+    appointment_status: Optional[AppointmentStatus] = Query(None, alias="status"),
+    cursor: Optional[str] = Query(None, description="Next-page cursor from the X-Next-Cursor header"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_role(["admin", "patient"]))
+):
+    if appointment_scope(db, current_user).get("patient_id", patient_id) != patient_id:
+        raise HTTPException(status_code=403, detail="Patients can only list their own appointments")
+    return appointments_page(
+        db, cursor, limit, patient_id=patient_id,
+        start_date=start_date, end_date=end_date, status=appointment_status
+    )
+
+async def read_bulk_rows(request: Request) -> List[dict]:
+    try:
+        return bulk.parse_rows(await request.body(), request.headers.get("content-type", ""))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+@router.post("/bulk/patients", response_model=schemas.BulkImportResult, openapi_extra=BULK_REQUEST_BODY)
+async def bulk_import_patients(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role("admin"))
+):
+    rows = await read_bulk_rows(request)
+    return await run_in_threadpool(crud.bulk_create_patients, db, rows)
+
+@router.post("/bulk/doctors", response_model=schemas.BulkImportResult, openapi_extra=BULK_REQUEST_BODY)
+async def bulk_import_doctors(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role("admin"))
+):
+    rows = await read_bulk_rows(request)
+    return await run_in_threadpool(crud.bulk_create_doctors, db, rows)
+
+@router.post("/bulk/availabilities", response_model=schemas.BulkImportResult, openapi_extra=BULK_REQUEST_BODY)
+async def bulk_import_availabilities(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role("admin"))
+):
+    rows = await read_bulk_rows(request)
+    return await run_in_threadpool(crud.bulk_create_availabilities, db, rows)
+
+def export_response(db: Session, name: str, query, export_format: schemas.ExportFormat):
+    columns = [column.key for column in query.selected_columns]
+
+    def stream():
+        # get_read_db has already closed the session by the time the body is
+        # streamed; it reopens a connection on first use and is closed here.
+        try:
+            chunks = crud.stream_rows(db, query)
+            if export_format == schemas.ExportFormat.csv:
+                yield from export.csv_chunks(columns, chunks)
+            else:
+                yield from export.ndjson_chunks(columns, chunks)
+        finally:
+            db.close()
+
+    media_type = "text/csv" if export_format == schemas.ExportFormat.csv else "application/x-ndjson"
+    filename = f"{name}.{export_format.value}"
+    return StreamingResponse(stream(), media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@router.get("/export/patients")
+def export_patients(
+    format: schemas.ExportFormat = Query(schemas.ExportFormat.ndjson),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_role("admin"))
+):
+    return export_response(db, "patients", crud.patients_export_query(), format)
+
+@router.get("/export/doctors")
+def export_doctors(
+    format: schemas.ExportFormat = Query(schemas.ExportFormat.ndjson),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_role("admin"))
+):
+    return export_response(db, "doctors", crud.doctors_export_query(), format)
+
+@router.get("/export/appointments")
+def export_appointments(
+    format: schemas.ExportFormat = Query(schemas.ExportFormat.ndjson),
+    start_date: Optional[date] = Query(None, description="First appointment date, YYYY-MM-DD"),
+    end_date: Optional[date] = Query(None, description="Last appointment date (inclusive), YYYY-MM-DD"),
+    doctor_id: Optional[int] = Query(None),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_role("admin"))
+):
+    query = crud.appointments_export_query(start_date, end_date, doctor_id)
+    return export_response(db, "appointments", query, format)
+
+def collected_metrics():
+    pools = database.pool_stats()
+    store = slot_store.store
+    yield from metrics.sampled("db_pool_checkouts_total", "Connections checked out of the pool.",
+                               [({"engine": p["engine"]}, p["checkouts"]) for p in pools], "counter")
+    yield from metrics.sampled("db_pool_checked_out", "Connections currently checked out.",
+                               [({"engine": p["engine"]}, p["checked_out"]) for p in pools if "checked_out" in p])
+    yield from metrics.sampled("slot_store_entries", "Doctor-days held by the slot store.",
+                               [({}, len(store.keys()))])
+    yield from metrics.sampled("slot_store_hits_total", "Slot lookups served from the store.",
+                               [({}, store.hits)], "counter")
+    yield from metrics.sampled("slot_store_misses_total", "Slot lookups that went to the database.",
+                               [({}, store.misses)], "counter")
+    yield from metrics.sampled("slot_events_dropped_total", "Slot subscribers dropped for falling behind.",
+                               [({}, events.hub.dropped)], "counter")
+    timings = hasher.timings
+    yield from metrics.sampled("password_hash_operations_total", "Password hashes and verifications.",
+                               [({"operation": op}, count) for op, count in timings.count.items()], "counter")
+    yield from metrics.sampled("password_hash_seconds_total", "Time spent hashing and verifying passwords.",
+                               [({"operation": op}, total) for op, total in timings.total_seconds.items()], "counter")
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus text format; restrict access to it at the proxy."""
+    return PlainTextResponse(metrics.render(collected_metrics()), media_type="text/plain; version=0.0.4")
+
+@router.get("/admin/db-pool", response_model=List[schemas.PoolStats])
+def db_pool_stats(current_user: User = Depends(require_role("admin"))):
+    return database.pool_stats()
+
+@router.get("/admin/reports/capacity", response_model=schemas.CapacityReport)
+def capacity_report(
+    start_date: date = Query(..., description="First date of the report, YYYY-MM-DD"),
+    end_date: date = Query(..., description="Last date of the report (inclusive), YYYY-MM-DD"),
+    duration_minutes: int = Query(30, ge=5, le=240, description="Appointment duration the slot counts are for"),
+    specialization: Optional[str] = Query(None),
+    daily: bool = Query(False, description="Include a row per doctor and day"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_role("admin"))
+):
+    validate_search_range(start_date, end_date)
+    report = reports.capacity_report(db, start_date, end_date, duration_minutes,
+                                     specialization=specialization, daily=daily)
+    return records.json_response(report)
+
+@router.post("/admin/slot-store/check", response_model=schemas.SlotStoreReport)
+def check_slot_store(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role("admin"))
+):
+    """Recompute every stored doctor-day and drop the ones that drifted."""
+    stale = crud.check_slot_store(db)
+    return {
+        "entries": len(slot_store.store.keys()),
+        "hits": slot_store.store.hits,
+        "misses": slot_store.store.misses,
+        "stale": [{"doctor_id": doctor_id, "date": day} for doctor_id, day in stale],
+    }
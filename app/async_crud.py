@@ -0,0 +1,84 @@
+"""AsyncSession counterparts of the hot paths in ``app.crud``.
+
+They execute the same statements as the synchronous functions, so both
+modes stay in step. Anything not ported here can still be reached from
+async code with ``await db.run_sync(crud.<function>, ...)``.
+"""
+from datetime import date, datetime
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import crud, events, models, recurrence, schemas, slot_store
+
+
+async def is_doctor_available(db: AsyncSession, doctor_id: int, start_time: datetime, end_time: datetime) -> bool:
+    if await db.scalar(crud.covering_availability_query(doctor_id, start_time, end_time)) is None:
+        rules = (await db.scalars(crud.covering_rules_query(doctor_id, start_time, end_time))).all()
+        if not crud.rules_cover(rules, start_time, end_time):
+            return False
+
+    return await db.scalar(crud.conflicting_appointments_query(doctor_id, start_time, end_time).limit(1)) is None
+
+
+async def get_calendar_version(db: AsyncSession, doctor_id: int) -> int:
+    return await db.scalar(crud.calendar_version_query(doctor_id)) or 0
+
+
+async def load_day_slots(db: AsyncSession, doctor_id: int, day: date, version: int) -> slot_store.DaySlots:
+    availabilities = (await db.scalars(crud.availabilities_for_day(doctor_id, day))).all()
+    rules = (await db.scalars(crud.day_rules_query(doctor_id, day))).all()
+    windows = [(a.start_time, a.end_time) for a in availabilities]
+    windows.extend(recurrence.rule_windows(rules, day))
+    appointments = (await db.scalars(crud.appointments_for_day(doctor_id, day))).all() if windows else []
+    return slot_store.DaySlots(day, windows, [(a.start_time, a.end_time) for a in appointments], version)
+
+
+async def generate_open_slots(db: AsyncSession, doctor_id: int, date: date, slot_minutes: int,
+                              version: Optional[int] = None):
+    if version is None:
+        version = await get_calendar_version(db, doctor_id)
+    day_slots = slot_store.store.get(doctor_id, date, version)
+    if day_slots is None:
+        day_slots = await load_day_slots(db, doctor_id, date, version)
+        slot_store.store.put(doctor_id, day_slots)
+    return day_slots.open_slots(slot_minutes)
+
+
+async def search_open_slots(
+    db: AsyncSession,
+    start_date: date,
+    end_date: date,
+    slot_minutes: int,
+    specialization: Optional[str] = None,
+    doctor_ids: Optional[List[int]] = None,
+) -> Iterator[Tuple[int, date, List[dict]]]:
+    availabilities, appointments, rules = crud.search_queries(start_date, end_date, specialization, doctor_ids)
+    return crud.iter_doctor_slots(
+        (await db.execute(availabilities)).all(), (await db.execute(appointments)).all(),
+        start_date, end_date, slot_minutes, (await db.scalars(rules)).all()
+    )
+
+
+async def create_appointment(db: AsyncSession, appointment: schemas.AppointmentCreate):
+    if appointment.end_time <= appointment.start_time:
+        raise ValueError("end_time must be after start_time")
+    try:
+        appointment_id = (await db.execute(crud.guarded_appointment_insert(appointment))).scalar()
+    except IntegrityError as exc:
+        await db.rollback()
+        if crud.is_exclusion_violation(exc):
+            return None
+        raise
+
+    if appointment_id is None:
+        await db.rollback()
+        return None
+    version = (await db.execute(
+        crud.calendar_version_bump([appointment.doctor_id]).returning(models.Doctor.calendar_version)
+    )).scalar()
+    await db.commit()
+    if version is not None:
+        slot_store.store.book(appointment.doctor_id, appointment.start_time, appointment.end_time, version)
+    day = appointment.start_time.date()
+    events.hub.publish(appointment.doctor_id, day, day)
+    return await db.get(models.Appointment, appointment_id)
@@ -0,0 +1,20 @@
+import csv
+import io
+import orjson
+from typing import List
+
+
+def parse_rows(content: bytes, content_type: str) -> List[dict]:
+    """Decode a bulk upload given as a CSV file or a JSON array of objects."""
+    if content_type.split(";")[0].strip() == "text/csv":
+        reader = csv.DictReader(io.StringIO(content.decode("utf-8-sig")))
+        # Empty CSV cells stand for missing optional values.
+        return [{key: value if value != "" else None for key, value in row.items()} for row in reader]
+
+    try:
+        rows = orjson.loads(content)
+    except orjson.JSONDecodeError as exc:
+        raise ValueError(f"Invalid JSON: {exc}")
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise ValueError("Expected a JSON array of objects")
+    return rows
@@ -0,0 +1,129 @@
+"""Command line tools for the health app.
+
+    python -m app.cli import patients roster.csv
+    python -m app.cli import availabilities blocks.json --chunk-size 1000
+    python -m app.cli capacity-report 2025-07-01 2025-07-31 --duration 45 --check 10
+    python -m app.cli normalize-availabilities --dry-run
+"""
+import argparse
+import sys
+from datetime import date
+import orjson
+from app import bulk, crud, reports
+from app.database import SessionLocal
+
+IMPORTERS = {
+    "patients": crud.bulk_create_patients,
+    "doctors": crud.bulk_create_doctors,
+    "availabilities": crud.bulk_create_availabilities,
+}
+
+
+def import_command(args) -> int:
+    with open(args.file, "rb") as f:
+        content = f.read()
+    content_type = "text/csv" if args.file.lower().endswith(".csv") else "application/json"
+    try:
+        rows = bulk.parse_rows(content, content_type)
+    except ValueError as exc:
+        print(f"{args.file}: {exc}", file=sys.stderr)
+        return 2
+
+    db = SessionLocal()
+    try:
+        result = IMPORTERS[args.kind](db, rows, chunk_size=args.chunk_size)
+    finally:
+        db.close()
+
+    for row in result.results:
+        if row.error:
+            print(f"row {row.row}: {row.error}", file=sys.stderr)
+    print(f"{args.kind}: {result.created} created, {result.failed} failed")
+    return 1 if result.failed else 0
+
+
+def _percent(ratio) -> str:
+    return "-" if ratio is None else f"{ratio:.0%}"
+
+
+def capacity_report_command(args) -> int:
+    if args.end_date < args.start_date:
+        print("end_date must not be before start_date", file=sys.stderr)
+        return 2
+    db = SessionLocal()
+    try:
+        report = reports.capacity_report(db, args.start_date, args.end_date, args.duration,
+                                         specialization=args.specialization, daily=args.daily or args.check > 0)
+        mismatches = reports.cross_check(db, report, args.check) if args.check else []
+    finally:
+        db.close()
+
+    if args.json:
+        if not args.daily:
+            for doctor in report["doctors"]:
+                doctor["days"] = None
+        sys.stdout.write(orjson.dumps(report, option=orjson.OPT_INDENT_2).decode() + "\n")
+    else:
+        print(f"{'doctor':>8} {'available h':>12} {'booked h':>9} {'used':>5} {'gaps':>5} {'fragm.':>6} {'slots':>6}")
+        for doctor in report["doctors"]:
+            print(f"{doctor['doctor_id']:>8} {doctor['available_minutes'] / 60:>12.1f} "
+                  f"{doctor['booked_minutes'] / 60:>9.1f} {_percent(doctor['utilization']):>5} "
+                  f"{doctor['free_gaps']:>5} {_percent(doctor['fragmentation']):>6} {doctor['slots']:>6}")
+    for doctor_id, day, counted, generated in mismatches:
+        print(f"doctor {doctor_id} on {day}: report has {counted} slots, generate_open_slots {generated}",
+              file=sys.stderr)
+    return 1 if mismatches else 0
+
+
+def normalize_availabilities_command(args) -> int:
+    db = SessionLocal()
+    doctors = before_total = after_total = 0
+    try:
+        for doctor_id, before, after in crud.normalize_availabilities(db, args.doctor or None, dry_run=args.dry_run):
+            if before != after:
+                doctors += 1
+                print(f"doctor {doctor_id}: {before} blocks -> {after}")
+            before_total += before
+            after_total += after
+    finally:
+        db.close()
+    note = " (dry run, nothing written)" if args.dry_run else ""
+    print(f"doctors changed: {doctors}, blocks: {before_total} -> {after_total}{note}")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Health app maintenance commands.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import", help="Bulk import a CSV or JSON file")
+    importer.add_argument("kind", choices=sorted(IMPORTERS))
+    importer.add_argument("file", help="A .csv file with a header row, or a JSON array of objects")
+    importer.add_argument("--chunk-size", type=int, default=crud.IMPORT_CHUNK_SIZE,
+                          help="Rows inserted per transaction")
+    importer.set_defaults(handler=import_command)
+
+    capacity = commands.add_parser("capacity-report", help="Utilization and free capacity of every doctor")
+    capacity.add_argument("start_date", type=date.fromisoformat)
+    capacity.add_argument("end_date", type=date.fromisoformat, help="Last date (inclusive)")
+    capacity.add_argument("--duration", type=int, default=30, help="Appointment minutes the slot counts are for")
+    capacity.add_argument("--specialization")
+    capacity.add_argument("--daily", action="store_true", help="Include a row per doctor and day in --json")
+    capacity.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    capacity.add_argument("--check", type=int, default=5, metavar="DAYS",
+                          help="Compare this many sampled doctor-days with generate_open_slots (0 to skip)")
+    capacity.set_defaults(handler=capacity_report_command)
+
+    normalize = commands.add_parser("normalize-availabilities",
+                                    help="Merge overlapping and adjacent availability blocks")
+    normalize.add_argument("--doctor", type=int, action="append", metavar="ID",
+                           help="Only this doctor; repeat for several (default: every doctor)")
+    normalize.add_argument("--dry-run", action="store_true", help="Report the changes without writing them")
+    normalize.set_defaults(handler=normalize_availabilities_command)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,130 +1,1150 @@
-from sqlalchemy.orm import Session
-from app import models, schemas
-from datetime import datetime, timedelta
-from sqlalchemy import func
-from passlib.hash import bcrypt
+from sqlalchemy.orm import Session, aliased, joinedload, selectinload
+from app import directory, events, models, records, recurrence, schemas, slots, slot_store
+from datetime import datetime, date, time, timedelta
+from sqlalchemy import (
+    String, and_, case, delete, event, exists, func, insert, inspect, literal, literal_column, or_, select, union_all, update
+)
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from pydantic import BaseModel, ValidationError
+from typing import Iterable, Iterator, List, Optional, Tuple
+from collections import defaultdict
+from heapq import merge
+from itertools import groupby, islice
+from contextlib import contextmanager
+from app.security import get_password_hash
+from app.hashing import hasher
 
-# Patient
-def create_patient(db: Session, patient: schemas.PatientCreate):
-    user = models.User(
-        email=patient.email,
-        hashed_password=bcrypt.hash(patient.password),
-        role=models.Role.patient
-    )
+# User
+def _add_user(db: Session, email: str, hashed_password: str, role: models.Role) -> models.User:
+    user = models.User(email=email, hashed_password=hashed_password, role=role)
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    db.flush()
+    return user
 
-    db_patient = models.Patient(
-        user_id=user.id,
-        first_name=patient.first_name,
-        last_name=patient.last_name,
-        insurance=patient.insurance,
-        phone=patient.phone
-    )
-    db.add(db_patient)
-    db.commit()
-    db.refresh(db_patient)
+@contextmanager
+def _unit_of_work(db: Session):
+    """Commit everything added inside the block once, or roll all of it back."""
+    try:
+        yield
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+def create_user(db: Session, user: schemas.UserCreate):
+    # Hash before touching the database so the transaction stays short.
+    hashed_password = get_password_hash(user.password)
+    with _unit_of_work(db):
+        db_user = _add_user(db, user.email, hashed_password, user.role)
+    return db_user
+
+# Patient
+def create_patient(db: Session, patient: schemas.PatientCreate):
+    hashed_password = get_password_hash(patient.password)
+    with _unit_of_work(db):
+        user = _add_user(db, patient.email, hashed_password, models.Role.patient)
+        db_patient = models.Patient(
+            user_id=user.id,
+            first_name=patient.first_name,
+            last_name=patient.last_name,
+            insurance=patient.insurance,
+            phone=patient.phone
+        )
+        db.add(db_patient)
     return db_patient
 
 def get_patient(db: Session, patient_id: int):
     return db.query(models.Patient).filter(models.Patient.id == patient_id).first()
 
+def like_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def name_prefix_filter(model, prefix: str):
+    # Matches the lower(...) text_pattern_ops indexes on first and last name.
+    escaped = like_escape(prefix.lower())
+    return or_(
+        func.lower(model.first_name).like(escaped + "%", escape="\\"),
+        func.lower(model.last_name).like(escaped + "%", escape="\\"),
+    )
+
+def paginate(query, model, cursor: Optional[int], limit: int):
+    """Keyset page over ``model.id``; returns the rows and the next cursor."""
+    if cursor is not None:
+        query = query.filter(model.id > cursor)
+    rows = query.order_by(model.id).limit(limit + 1).all()
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1].id
+    return rows, None
+
+def _filter_patients(query, name: Optional[str], insurance: Optional[str]):
+    if name:
+        query = query.filter(name_prefix_filter(models.Patient, name))
+    if insurance:
+        query = query.filter(models.Patient.insurance == insurance)
+    return query
+
+def list_patients(db: Session, cursor: Optional[int] = None, limit: int = 100,
+                  name: Optional[str] = None, insurance: Optional[str] = None):
+    query = db.query(models.Patient).options(joinedload(models.Patient.user))
+    return paginate(_filter_patients(query, name, insurance), models.Patient, cursor, limit)
+
+def list_patient_records(db: Session, cursor: Optional[int] = None, limit: int = 100,
+                         name: Optional[str] = None, insurance: Optional[str] = None):
+    """list_patients as plain dicts from a column-projected query (see app.records)."""
+    query = db.query(*records.PATIENT_COLUMNS).join(models.Patient.user)
+    rows, next_cursor = paginate(_filter_patients(query, name, insurance), models.Patient, cursor, limit)
+    return records.patients(rows), next_cursor
+
 # Doctor
 def create_doctor(db: Session, doctor: schemas.DoctorCreate):
-    user = models.User(
-        email=doctor.email,
-        hashed_password=bcrypt.hash(doctor.password),
-        role=models.Role.doctor
+    hashed_password = get_password_hash(doctor.password)
+    with _unit_of_work(db):
+        user = _add_user(db, doctor.email, hashed_password, models.Role.doctor)
+        db_doctor = models.Doctor(
+            user_id=user.id,
+            first_name=doctor.first_name,
+            last_name=doctor.last_name,
+            specialization=doctor.specialization
+        )
+        db.add(db_doctor)
+    directory.doctors.add(records.doctors([(
+        db_doctor.id, db_doctor.first_name, db_doctor.last_name, db_doctor.specialization,
+        user.id, user.email, user.role,
+    )]))
+    return db_doctor
+
+def _filter_doctors(query, name: Optional[str], specialization: Optional[str]):
+    if name:
+        query = query.filter(name_prefix_filter(models.Doctor, name))
+    if specialization:
+        query = query.filter(models.Doctor.specialization == specialization)
+    return query
+
+def list_doctors(db: Session, cursor: Optional[int] = None, limit: int = 100,
+                 name: Optional[str] = None, specialization: Optional[str] = None):
+    query = db.query(models.Doctor).options(joinedload(models.Doctor.user))
+    return paginate(_filter_doctors(query, name, specialization), models.Doctor, cursor, limit)
+
+def list_doctor_records(db: Session, cursor: Optional[int] = None, limit: int = 100,
+                        name: Optional[str] = None, specialization: Optional[str] = None):
+    query = db.query(*records.DOCTOR_COLUMNS).join(models.Doctor.user)
+    rows, next_cursor = paginate(_filter_doctors(query, name, specialization), models.Doctor, cursor, limit)
+    return records.doctors(rows), next_cursor
+
+# Directory search
+def doctor_search_text():
+    # Same expression as the ix_doctors_search_trgm index.
+    separator = literal_column("' '", String)
+    return func.lower(
+        models.Doctor.first_name + separator + models.Doctor.last_name + separator + models.Doctor.specialization
     )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
 
-    db_doctor = models.Doctor(
-        user_id=user.id,
-        first_name=doctor.first_name,
-        last_name=doctor.last_name,
-        specialization=doctor.specialization
+def _word_rank(word: str):
+    escaped = like_escape(word)
+    return case(
+        (or_(func.lower(models.Doctor.first_name).like(escaped + "%", escape="\\"),
+             func.lower(models.Doctor.last_name).like(escaped + "%", escape="\\")), directory.NAME_WEIGHT),
+        (or_(func.lower(models.Doctor.specialization).like(escaped + "%", escape="\\"),
+             func.lower(models.Doctor.specialization).like("% " + escaped + "%", escape="\\")),
+         directory.SPECIALIZATION_WEIGHT),
+        else_=0,
     )
-    db.add(db_doctor)
-    db.commit()
-    db.refresh(db_doctor)
-    return db_doctor
+
+def _search_doctor_records_trigram(db: Session, q: str, specialization: Optional[str], offset: int, limit: int):
+    words = directory.words(q)
+    text = doctor_search_text()
+    term = literal(" ".join(words), String)
+    # Substring matches for every word, or a fuzzy match of the whole query
+    # (word_similarity) for typos; both are served by the trigram index.
+    query = db.query(*records.DOCTOR_COLUMNS).join(models.Doctor.user).filter(or_(
+        and_(*(text.like("%" + like_escape(word) + "%", escape="\\") for word in words)),
+        term.op("<%")(text),
+    ))
+    if specialization:
+        query = query.filter(models.Doctor.specialization == specialization)
+    ranks = [_word_rank(word) for word in words]
+    rows = query.order_by(
+        sum(ranks[1:], ranks[0]).desc(),
+        func.word_similarity(term, text).desc(),
+        func.lower(models.Doctor.last_name), func.lower(models.Doctor.first_name), models.Doctor.id,
+    ).offset(offset).limit(limit + 1).all()
+    if len(rows) > limit:
+        return records.doctors(rows[:limit]), offset + limit
+    return records.doctors(rows), None
+
+def sync_doctor_directory(db: Session):
+    """Bring the in-memory directory up to date with the doctors table."""
+    count, max_id = db.execute(select(func.count(models.Doctor.id), func.max(models.Doctor.id))).one()
+    known = directory.doctors.fingerprint
+    if known == (count, max_id or 0):
+        return
+    query = db.query(*records.DOCTOR_COLUMNS).join(models.Doctor.user)
+    if known is not None and count > known[0]:
+        # Doctors are only ever added, so normally just the new rows are missing.
+        rows = query.filter(models.Doctor.id > known[1]).all()
+        if known[0] + len(rows) == count:
+            directory.doctors.add(records.doctors(rows))
+            return
+    directory.doctors.load(records.doctors(query.all()))
+
+def search_doctor_records(db: Session, q: str, specialization: Optional[str] = None,
+                          offset: int = 0, limit: int = 20):
+    """Ranked directory search; returns a page of doctor records and the next offset."""
+    if not directory.words(q):
+        return [], None
+    if db.get_bind().dialect.name == "postgresql":
+        return _search_doctor_records_trigram(db, q, specialization, offset, limit)
+    sync_doctor_directory(db)
+    return directory.doctors.search(q, specialization, offset, limit)
+
+# Bulk import
+IMPORT_CHUNK_SIZE = 500
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()
+    )
+
+def _validate_rows(rows: List[dict], schema) -> Tuple[List[Tuple[int, BaseModel]], List[schemas.BulkRowResult]]:
+    valid, errors = [], []
+    for index, row in enumerate(rows):
+        try:
+            valid.append((index, schema(**row)))
+        except ValidationError as exc:
+            errors.append(schemas.BulkRowResult(row=index, error=_validation_message(exc)))
+    return valid, errors
+
+def _import_result(results: List[schemas.BulkRowResult]) -> schemas.BulkImportResult:
+    results.sort(key=lambda result: result.row)
+    created = sum(1 for result in results if result.error is None)
+    return schemas.BulkImportResult(created=created, failed=len(results) - created, results=results)
+
+def _bulk_create_profiles(db: Session, rows: List[dict], schema, role: models.Role, profile_model,
+                          profile_fields: List[str], chunk_size: int) -> schemas.BulkImportResult:
+    valid, results = _validate_rows(rows, schema)
+
+    for offset in range(0, len(valid), chunk_size):
+        chunk = valid[offset:offset + chunk_size]
+        emails = [item.email for _, item in chunk]
+        taken = set(db.scalars(select(models.User.email).where(models.User.email.in_(emails))))
+
+        accepted, seen = [], set()
+        for index, item in chunk:
+            if item.email in taken or item.email in seen:
+                results.append(schemas.BulkRowResult(row=index, error="Email already registered"))
+            else:
+                seen.add(item.email)
+                accepted.append((index, item))
+        if not accepted:
+            continue
+
+        hashes = hasher.hash_many(item.password for _, item in accepted)
+        try:
+            user_ids = dict(db.execute(
+                insert(models.User).returning(models.User.email, models.User.id),
+                [
+                    {"email": item.email, "hashed_password": hashed, "role": role}
+                    for (_, item), hashed in zip(accepted, hashes)
+                ],
+            ).all())
+            profile_ids = dict(db.execute(
+                insert(profile_model).returning(profile_model.user_id, profile_model.id),
+                [
+                    {"user_id": user_ids[item.email], **{field: getattr(item, field) for field in profile_fields}}
+                    for _, item in accepted
+                ],
+            ).all())
+            db.commit()
+        except SQLAlchemyError as exc:
+            db.rollback()
+            message = f"Chunk rejected by the database: {exc.__class__.__name__}"
+            results.extend(schemas.BulkRowResult(row=index, error=message) for index, _ in accepted)
+            continue
+
+        results.extend(
+            schemas.BulkRowResult(row=index, id=profile_ids[user_ids[item.email]])
+            for index, item in accepted
+        )
+
+    return _import_result(results)
+
+def bulk_create_patients(db: Session, rows: List[dict], chunk_size: int = IMPORT_CHUNK_SIZE) -> schemas.BulkImportResult:
+    return _bulk_create_profiles(
+        db, rows, schemas.PatientCreate, models.Role.patient, models.Patient,
+        ["first_name", "last_name", "insurance", "phone"], chunk_size,
+    )
+
+def bulk_create_doctors(db: Session, rows: List[dict], chunk_size: int = IMPORT_CHUNK_SIZE) -> schemas.BulkImportResult:
+    return _bulk_create_profiles(
+        db, rows, schemas.DoctorCreate, models.Role.doctor, models.Doctor,
+        ["first_name", "last_name", "specialization"], chunk_size,
+    )
+
+def _expand_weekly(item: schemas.BulkAvailabilityCreate) -> Iterator[Tuple[datetime, datetime]]:
+    start, end = item.start_time, item.end_time
+    last_day = item.repeat_weekly_until or start.date()
+    while start.date() <= last_day:
+        yield start, end
+        start += timedelta(weeks=1)
+        end += timedelta(weeks=1)
+
+def _calendar_days_changed(rows: Iterable[dict]):
+    # Core inserts bypass the session hooks in app.slot_store.
+    spans = {}
+    for row in rows:
+        first, last = spans.get(row["doctor_id"], (row["start_time"].date(), row["end_time"].date()))
+        spans[row["doctor_id"]] = (min(first, row["start_time"].date()), max(last, row["end_time"].date()))
+    for doctor_id, (first, last) in spans.items():
+        slot_store.store.invalidate(doctor_id, first, last)
+        events.hub.publish(doctor_id, first, last)
+
+def bulk_create_availabilities(db: Session, rows: List[dict], chunk_size: int = IMPORT_CHUNK_SIZE) -> schemas.BulkImportResult:
+    valid, results = _validate_rows(rows, schemas.BulkAvailabilityCreate)
+
+    doctor_ids = {item.doctor_id for _, item in valid}
+    known = set(db.scalars(select(models.Doctor.id).where(models.Doctor.id.in_(doctor_ids))))
+
+    accepted = []
+    for index, item in valid:
+        if item.doctor_id not in known:
+            results.append(schemas.BulkRowResult(row=index, error="Doctor not found"))
+        elif item.end_time <= item.start_time:
+            results.append(schemas.BulkRowResult(row=index, error="end_time must be after start_time"))
+        else:
+            accepted.append((index, item))
+
+    for offset in range(0, len(accepted), chunk_size):
+        chunk = accepted[offset:offset + chunk_size]
+        values = [
+            (index, {"doctor_id": item.doctor_id, "start_time": start, "end_time": end})
+            for index, item in chunk
+            for start, end in _expand_weekly(item)
+        ]
+        new_blocks = defaultdict(list)
+        for _, row in values:
+            new_blocks[row["doctor_id"]].append((row["start_time"], row["end_time"]))
+        try:
+            # Lock the chunk's calendars, then merge each doctor's new
+            # blocks into the stored ones as create_availability does.
+            db.execute(calendar_version_bump(sorted(new_blocks)))
+            stored, changed = {}, []
+            for doctor_id, blocks in new_blocks.items():
+                stored[doctor_id], doctor_changed = _merge_availabilities(db, doctor_id, blocks)
+                changed.extend(doctor_changed)
+            db.commit()
+        except SQLAlchemyError as exc:
+            db.rollback()
+            message = f"Chunk rejected by the database: {exc.__class__.__name__}"
+            results.extend(schemas.BulkRowResult(row=index, error=message) for index, _ in chunk)
+            continue
+        _calendar_days_changed(changed)
+
+        # Each row reports the stored block that covers it, a recurring row
+        # the one covering its first occurrence.
+        holders = {}
+        for index, row in values:
+            if index not in holders:
+                block = (row["start_time"], row["end_time"])
+                holders[index] = next(
+                    id for stored_block, id in stored[row["doctor_id"]].items()
+                    if slots.block_covers(stored_block, block)
+                )
+        results.extend(schemas.BulkRowResult(row=index, id=holders[index]) for index, _ in chunk)
+
+    return _import_result(results)
+
+# Export
+EXPORT_CHUNK_SIZE = 1000
+
+def patients_export_query():
+    return select(
+        models.Patient.id, models.User.email, models.Patient.first_name,
+        models.Patient.last_name, models.Patient.phone, models.Patient.insurance,
+    ).join(models.Patient.user).order_by(models.Patient.id)
+
+def doctors_export_query():
+    return select(
+        models.Doctor.id, models.User.email, models.Doctor.first_name,
+        models.Doctor.last_name, models.Doctor.specialization,
+    ).join(models.Doctor.user).order_by(models.Doctor.id)
+
+def appointments_export_query(start_date: Optional[date] = None, end_date: Optional[date] = None,
+                              doctor_id: Optional[int] = None):
+    query = select(
+        models.Appointment.id, models.Appointment.doctor_id, models.Appointment.patient_id,
+        models.Appointment.start_time, models.Appointment.end_time, models.Appointment.status,
+    ).order_by(models.Appointment.start_time, models.Appointment.id)
+    if start_date:
+        query = query.where(models.Appointment.start_time >= datetime.combine(start_date, time.min))
+    if end_date:
+        query = query.where(models.Appointment.start_time < datetime.combine(end_date + timedelta(days=1), time.min))
+    if doctor_id:
+        query = query.where(models.Appointment.doctor_id == doctor_id)
+    return query
+
+def stream_rows(db: Session, query, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[list]:
+    """Yield lists of up to ``chunk_size`` rows from a server-side cursor."""
+    result = db.execute(query.execution_options(yield_per=chunk_size))
+    try:
+        for partition in result.partitions():
+            yield partition
+    finally:
+        result.close()
+
+# Calendar versions
+def calendar_version_query(doctor_id: int):
+    return select(models.Doctor.calendar_version).where(models.Doctor.id == doctor_id)
+
+def calendar_version_bump(doctor_ids: Iterable[int]):
+    return update(models.Doctor).where(models.Doctor.id.in_(set(doctor_ids))).values(
+        calendar_version=models.Doctor.calendar_version + 1
+    )
+
+@event.listens_for(models.Appointment, "after_insert")
+@event.listens_for(models.Appointment, "after_update")
+@event.listens_for(models.Appointment, "after_delete")
+@event.listens_for(models.DoctorAvailability, "after_insert")
+@event.listens_for(models.DoctorAvailability, "after_update")
+@event.listens_for(models.DoctorAvailability, "after_delete")
+@event.listens_for(models.AvailabilityRule, "after_insert")
+@event.listens_for(models.AvailabilityRule, "after_update")
+@event.listens_for(models.AvailabilityRule, "after_delete")
+def _bump_calendar_version(mapper, connection, target):
+    # Covers ORM writes, including exceptions added through rule.exceptions
+    # (which leave the rule dirty); the Core inserts below bump explicitly.
+    doctor_ids = {target.doctor_id, *inspect(target).attrs.doctor_id.history.deleted}
+    connection.execute(calendar_version_bump(doctor_ids))
 
 # Appointment
+EXCLUSION_VIOLATION = "23P01"
+
+def guarded_appointment_insert(appointment: schemas.AppointmentCreate):
+    """INSERT ... SELECT that only writes the row if no scheduled appointment overlaps it."""
+    table = models.Appointment.__table__
+    values = appointment.model_dump()
+    conflict = conflicting_appointments_query(values["doctor_id"], values["start_time"], values["end_time"])
+    return insert(models.Appointment).from_select(
+        ["patient_id", "doctor_id", "start_time", "end_time", "status"],
+        select(
+            literal(values["patient_id"], table.c.patient_id.type),
+            literal(values["doctor_id"], table.c.doctor_id.type),
+            literal(values["start_time"], table.c.start_time.type),
+            literal(values["end_time"], table.c.end_time.type),
+            literal(models.AppointmentStatus.scheduled, table.c.status.type),
+        ).where(~conflict.exists())
+    ).returning(models.Appointment.id)
+
+def is_exclusion_violation(exc: IntegrityError) -> bool:
+    return getattr(exc.orig, "pgcode", None) == EXCLUSION_VIOLATION or \
+        getattr(exc.orig, "sqlstate", None) == EXCLUSION_VIOLATION
+
 def create_appointment(db: Session, appointment: schemas.AppointmentCreate):
-    db_appointment = models.Appointment(**appointment.dict())
-    db.add(db_appointment)
+    """Insert the appointment unless it overlaps a scheduled one.
+
+    The overlap check is part of the INSERT itself, so concurrent bookings of
+    one slot cannot both pass it; on PostgreSQL the appointments_no_overlap
+    exclusion constraint backs it up. Returns None when the slot is taken.
+    """
+    if appointment.end_time <= appointment.start_time:
+        raise ValueError("end_time must be after start_time")
+    try:
+        appointment_id = db.execute(guarded_appointment_insert(appointment)).scalar()
+    except IntegrityError as exc:
+        db.rollback()
+        if is_exclusion_violation(exc):
+            return None
+        raise
+
+    if appointment_id is None:
+        db.rollback()
+        return None
+    version = db.execute(
+        calendar_version_bump([appointment.doctor_id]).returning(models.Doctor.calendar_version)
+    ).scalar()
     db.commit()
-    db.refresh(db_appointment)
-    return db_appointment
+    if version is not None:
+        slot_store.store.book(appointment.doctor_id, appointment.start_time, appointment.end_time, version)
+    day = appointment.start_time.date()
+    events.hub.publish(appointment.doctor_id, day, day)
+    return db.get(models.Appointment, appointment_id)
+
+BATCH_REJECTED = "Not booked: another appointment in the batch failed"
+
+def _appointment_batch(items: List[Tuple[int, schemas.AppointmentCreate]]):
+    """The batch as a derived table of typed literal rows.
+
+    Not VALUES, whose column aliases SQLite does not accept, and not a CTE:
+    pysqlite only opens a transaction for statements that start with INSERT.
+    """
+    table = models.Appointment.__table__
+    return union_all(*[
+        select(
+            literal(index, table.c.id.type).label("row"),
+            literal(item.patient_id, table.c.patient_id.type).label("patient_id"),
+            literal(item.doctor_id, table.c.doctor_id.type).label("doctor_id"),
+            literal(item.start_time, table.c.start_time.type).label("start_time"),
+            literal(item.end_time, table.c.end_time.type).label("end_time"),
+        )
+        for index, item in items
+    ]).subquery("batch")
+
+def _batch_conflict(batch):
+    return exists().where(
+        models.Appointment.doctor_id == batch.c.doctor_id,
+        models.Appointment.status == models.AppointmentStatus.scheduled,
+        models.Appointment.start_time < batch.c.end_time,
+        models.Appointment.end_time > batch.c.start_time,
+    )
+
+def appointment_batch_checks(batch):
+    """One row per batch item: does the doctor/patient exist, is the time
+    inside a concrete availability, does it overlap a scheduled appointment."""
+    return select(
+        batch.c.row,
+        exists().where(models.Doctor.id == batch.c.doctor_id).label("doctor_found"),
+        exists().where(models.Patient.id == batch.c.patient_id).label("patient_found"),
+        exists().where(
+            models.DoctorAvailability.doctor_id == batch.c.doctor_id,
+            models.DoctorAvailability.start_time <= batch.c.start_time,
+            models.DoctorAvailability.end_time >= batch.c.end_time,
+        ).label("covered"),
+        _batch_conflict(batch).label("conflict"),
+    )
+
+def guarded_appointment_batch_insert(batch):
+    """guarded_appointment_insert for a whole batch in one statement."""
+    table = models.Appointment.__table__
+    return insert(models.Appointment).from_select(
+        ["patient_id", "doctor_id", "start_time", "end_time", "status"],
+        select(
+            batch.c.patient_id, batch.c.doctor_id, batch.c.start_time, batch.c.end_time,
+            literal(models.AppointmentStatus.scheduled, table.c.status.type),
+        ).where(~_batch_conflict(batch))
+    ).returning(models.Appointment.id, models.Appointment.doctor_id, models.Appointment.start_time)
+
+def _check_appointment_batch(db: Session, items: List[Tuple[int, schemas.AppointmentCreate]]):
+    errors = {}
+    checks = {row.row: row for row in db.execute(appointment_batch_checks(_appointment_batch(items)))}
+
+    uncovered = [(index, item) for index, item in items if not checks[index].covered]
+    rules = defaultdict(list)
+    if uncovered:
+        for rule in db.scalars(availability_rules_query(
+            min(item.start_time.date() for _, item in uncovered),
+            max(item.start_time.date() for _, item in uncovered),
+            models.AvailabilityRule.doctor_id.in_({item.doctor_id for _, item in uncovered}),
+        )):
+            rules[rule.doctor_id].append(rule)
+
+    booked = defaultdict(list)
+    for index, item in items:
+        check = checks[index]
+        if not check.doctor_found:
+            errors[index] = "Doctor not found"
+        elif not check.patient_found:
+            errors[index] = "Patient not found"
+        elif not check.covered and not rules_cover(rules[item.doctor_id], item.start_time, item.end_time):
+            errors[index] = "Doctor not available at that time."
+        elif check.conflict:
+            errors[index] = "Overlaps a scheduled appointment"
+        elif any(start < item.end_time and item.start_time < end for start, end in booked[item.doctor_id]):
+            errors[index] = "Overlaps another appointment in the batch"
+        else:
+            booked[item.doctor_id].append((item.start_time, item.end_time))
+    return errors
+
+def create_appointments_batch(db: Session, items: List[schemas.AppointmentCreate],
+                              mode: schemas.BatchMode = schemas.BatchMode.all_or_nothing) -> schemas.BulkImportResult:
+    """Book a series of appointments in one transaction.
+
+    Every item is checked by one set-based query (plus one rule lookup for
+    items outside concrete availability) and the accepted ones are written
+    by a single guarded INSERT ... SELECT. With all_or_nothing any failure
+    books nothing; best_effort books every item that passes.
+    """
+    errors = {index: "end_time must be after start_time"
+              for index, item in enumerate(items) if item.end_time <= item.start_time}
+    pending = [(index, item) for index, item in enumerate(items) if index not in errors]
+    if pending:
+        errors.update(_check_appointment_batch(db, pending))
+    accepted = [(index, item) for index, item in pending if index not in errors]
+    if errors and mode == schemas.BatchMode.all_or_nothing:
+        errors.update((index, BATCH_REJECTED) for index, _ in accepted)
+        accepted = []
+
+    ids = {}
+    if accepted:
+        try:
+            inserted = db.execute(guarded_appointment_batch_insert(_appointment_batch(accepted))).all()
+        except IntegrityError as exc:
+            db.rollback()
+            if not is_exclusion_violation(exc):
+                raise
+            inserted = []
+        ids = {(doctor_id, start): appointment_id for appointment_id, doctor_id, start in inserted}
+        # Anything the INSERT guard skipped was booked concurrently.
+        raced = [(index, item) for index, item in accepted if (item.doctor_id, item.start_time) not in ids]
+        errors.update((index, "Doctor not available at that time.") for index, _ in raced)
+        if raced and mode == schemas.BatchMode.all_or_nothing:
+            db.rollback()
+            errors.update((index, BATCH_REJECTED) for index, _ in accepted if index not in errors)
+            ids, accepted = {}, []
+        accepted = [(index, item) for index, item in accepted if index not in errors]
+        if accepted:
+            db.execute(calendar_version_bump(item.doctor_id for _, item in accepted))
+            db.commit()
+            _calendar_days_changed(item.model_dump() for _, item in accepted)
+
+    results = [schemas.BulkRowResult(row=index, error=error) for index, error in errors.items()]
+    results.extend(
+        schemas.BulkRowResult(row=index, id=ids[item.doctor_id, item.start_time]) for index, item in accepted
+    )
+    return _import_result(results)
+
+def get_appointment(db: Session, appointment_id: int):
+    return db.get(models.Appointment, appointment_id)
+
+def appointment_owner_filters(doctor_id: Optional[int] = None, patient_id: Optional[int] = None):
+    filters = []
+    if doctor_id is not None:
+        filters.append(models.Appointment.doctor_id == doctor_id)
+    if patient_id is not None:
+        filters.append(models.Appointment.patient_id == patient_id)
+    return filters
+
+def _scheduled_appointment_update(appointment_id: int, *filters):
+    """ORM-enabled UPDATE of a still-scheduled appointment, returning the row.
+
+    The status check is part of the statement, so two concurrent transitions
+    of one appointment cannot both succeed and nothing is read beforehand.
+    """
+    return update(models.Appointment).where(
+        models.Appointment.id == appointment_id,
+        models.Appointment.status == models.AppointmentStatus.scheduled,
+        *filters,
+    ).returning(models.Appointment).execution_options(synchronize_session="fetch")
+
+def _appointment_changed(db: Session, doctor_id: int) -> Optional[int]:
+    # Core/bulk UPDATEs skip the mapper hooks, so bump the version here.
+    version = db.execute(
+        calendar_version_bump([doctor_id]).returning(models.Doctor.calendar_version)
+    ).scalar()
+    db.commit()
+    return version
+
+def transition_appointment(db: Session, appointment_id: int, status: models.AppointmentStatus,
+                           doctor_id: Optional[int] = None, patient_id: Optional[int] = None):
+    """Move a scheduled appointment to ``status`` in a single conditional UPDATE.
+
+    ``doctor_id``/``patient_id`` restrict the change to that doctor's or
+    patient's appointments. Returns None when no such scheduled appointment
+    exists.
+    """
+    appointment = db.execute(
+        _scheduled_appointment_update(appointment_id, *appointment_owner_filters(doctor_id, patient_id))
+        .values(status=status)
+    ).scalar()
+    if appointment is None:
+        db.rollback()
+        return None
+    doctor_id, start, end = appointment.doctor_id, appointment.start_time, appointment.end_time
+    version = _appointment_changed(db, doctor_id)
+    if version is not None:
+        slot_store.store.release(doctor_id, start, end, version)
+    events.hub.publish(doctor_id, start.date(), start.date())
+    return appointment
+
+def reschedule_appointment(db: Session, appointment: models.Appointment, start_time: datetime,
+                           end_time: datetime):
+    """Move a scheduled appointment unless the new time overlaps another one.
+
+    As with booking, the overlap check is part of the UPDATE itself and the
+    exclusion constraint backs it up on PostgreSQL. Returns None when the
+    appointment is no longer scheduled or the new time is taken.
+    """
+    appointment_id, doctor_id, old_start = appointment.id, appointment.doctor_id, appointment.start_time
+    other = aliased(models.Appointment)
+    conflict = select(other.id).where(
+        other.doctor_id == doctor_id,
+        other.id != appointment_id,
+        other.status == models.AppointmentStatus.scheduled,
+        other.start_time < end_time,
+        other.end_time > start_time,
+    )
+    try:
+        moved = db.execute(
+            _scheduled_appointment_update(appointment_id, models.Appointment.doctor_id == doctor_id, ~conflict.exists())
+            .values(start_time=start_time, end_time=end_time)
+        ).scalar()
+    except IntegrityError as exc:
+        db.rollback()
+        if is_exclusion_violation(exc):
+            return None
+        raise
+
+    if moved is None:
+        db.rollback()
+        return None
+    _appointment_changed(db, doctor_id)
+    for day in {old_start.date(), start_time.date()}:
+        slot_store.store.invalidate(doctor_id, day, day)
+        events.hub.publish(doctor_id, day, day)
+    return moved
+
+APPOINTMENT_LISTING_ORDER = (models.Appointment.start_time, models.Appointment.id)
+
+def _appointments_page(query, cursor: Optional[Tuple[datetime, int]], limit: int,
+                       doctor_id: Optional[int], patient_id: Optional[int], start_date: Optional[date],
+                       end_date: Optional[date], status: Optional[models.AppointmentStatus]):
+    query = query.filter(*appointment_owner_filters(doctor_id, patient_id))
+    if start_date is not None:
+        query = query.filter(models.Appointment.start_time >= datetime.combine(start_date, time.min))
+    if end_date is not None:
+        query = query.filter(models.Appointment.start_time < datetime.combine(end_date + timedelta(days=1), time.min))
+    if status is not None:
+        query = query.filter(models.Appointment.status == status)
+    if cursor is not None:
+        after_start, after_id = cursor
+        query = query.filter(or_(
+            models.Appointment.start_time > after_start,
+            and_(models.Appointment.start_time == after_start, models.Appointment.id > after_id),
+        ))
+    rows = query.order_by(*APPOINTMENT_LISTING_ORDER).limit(limit + 1).all()
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        return rows[:limit], (last.start_time, last.id)
+    return rows, None
+
+def list_appointments(db: Session, cursor: Optional[Tuple[datetime, int]] = None, limit: int = 100,
+                      doctor_id: Optional[int] = None, patient_id: Optional[int] = None,
+                      start_date: Optional[date] = None, end_date: Optional[date] = None,
+                      status: Optional[models.AppointmentStatus] = None):
+    """Keyset page of appointments ordered by start time.
+
+    Served by the (doctor_id, start_time, ...) and (patient_id, start_time)
+    indexes; the cursor is the (start_time, id) of the last row returned.
+    """
+    return _appointments_page(db.query(models.Appointment), cursor, limit,
+                              doctor_id, patient_id, start_date, end_date, status)
+
+def list_appointment_records(db: Session, cursor: Optional[Tuple[datetime, int]] = None, limit: int = 100,
+                             doctor_id: Optional[int] = None, patient_id: Optional[int] = None,
+                             start_date: Optional[date] = None, end_date: Optional[date] = None,
+                             status: Optional[models.AppointmentStatus] = None):
+    rows, next_cursor = _appointments_page(db.query(*records.APPOINTMENT_COLUMNS), cursor, limit,
+                                           doctor_id, patient_id, start_date, end_date, status)
+    return records.appointments(rows), next_cursor
+
+def _availability_rows(doctor_id: int, *filters):
+    availability = models.DoctorAvailability
+    return select(availability.id, availability.start_time, availability.end_time).where(
+        availability.doctor_id == doctor_id, *filters
+    ).order_by(availability.start_time, availability.id)
+
+def _store_normalized_availabilities(db: Session, doctor_id: int, rows,
+                                     new_blocks: Iterable[slots.Interval] = ()) -> Tuple[dict, List[dict]]:
+    """Rewrite the doctor's ``rows`` plus ``new_blocks`` as slots.normalize_availabilities of them.
+
+    Rows that already hold a resulting block are kept. Returns the row id of
+    every block and the rows deleted or inserted.
+    """
+    blocks = slots.normalize_availabilities([*((row.start_time, row.end_time) for row in rows), *new_blocks])
+    ids, removed = {}, []
+    for row in rows:
+        block = (row.start_time, row.end_time)
+        if block in blocks and block not in ids:
+            ids[block] = row.id
+        else:
+            removed.append(row)
+    added = [
+        {"doctor_id": doctor_id, "start_time": start, "end_time": end}
+        for start, end in blocks if (start, end) not in ids
+    ]
+    if removed:
+        db.execute(delete(models.DoctorAvailability).where(
+            models.DoctorAvailability.id.in_([row.id for row in removed])
+        ))
+    if added:
+        availability = models.DoctorAvailability
+        ids.update(
+            ((start, end), id) for id, start, end in db.execute(
+                insert(availability).returning(availability.id, availability.start_time, availability.end_time),
+                added,
+            )
+        )
+    changed = added + [
+        {"doctor_id": doctor_id, "start_time": row.start_time, "end_time": row.end_time} for row in removed
+    ]
+    return ids, changed
+
+def _merge_availabilities(db: Session, doctor_id: int,
+                          new_blocks: List[slots.Interval]) -> Tuple[dict, List[dict]]:
+    """Store ``new_blocks`` merged with the doctor's blocks they overlap or touch.
+
+    The caller holds the doctor's calendar lock and commits. Returns what
+    _store_normalized_availabilities does.
+    """
+    start, end = min(block[0] for block in new_blocks), max(block[1] for block in new_blocks)
+    rows = []
+    while True:
+        # Merged blocks can reach further blocks, so widen until stable.
+        found = db.execute(_availability_rows(
+            doctor_id, models.DoctorAvailability.start_time <= end, models.DoctorAvailability.end_time >= start
+        )).all()
+        if len(found) == len(rows):
+            break
+        rows = found
+        start, end = min(start, rows[0].start_time), max(end, *(row.end_time for row in rows))
+    return _store_normalized_availabilities(db, doctor_id, rows, new_blocks)
 
 def create_availability(db: Session, doctor_id: int, availability: schemas.AvailabilityCreate):
-    db_avail = models.DoctorAvailability(
+    """Add a block, merged with the doctor's blocks it overlaps or touches.
+
+    Returns the stored block that covers the requested one.
+    """
+    if availability.end_time <= availability.start_time:
+        raise ValueError("end_time must be after start_time")
+    new = (availability.start_time, availability.end_time)
+    with _unit_of_work(db):
+        # Taking the doctor's row (a write lock on SQLite) before reading
+        # serializes the writes to one calendar.
+        db.execute(calendar_version_bump([doctor_id]))
+        ids, changed = _merge_availabilities(db, doctor_id, [new])
+    _calendar_days_changed(changed)
+    holder = next(id for block, id in ids.items() if slots.block_covers(block, new))
+    return db.get(models.DoctorAvailability, holder)
+
+def normalize_doctor_availabilities(db: Session, doctor_id: int, dry_run: bool = False) -> Tuple[int, int]:
+    """Merge all of a doctor's availability blocks in one transaction; returns the row counts before and after."""
+    try:
+        db.execute(calendar_version_bump([doctor_id]))
+        rows = db.execute(_availability_rows(doctor_id)).all()
+        ids, changed = _store_normalized_availabilities(db, doctor_id, rows)
+        if dry_run or not changed:
+            db.rollback()
+            return len(rows), len(ids)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    _calendar_days_changed(changed)
+    return len(rows), len(ids)
+
+def normalize_availabilities(db: Session, doctor_ids: Optional[List[int]] = None,
+                             dry_run: bool = False) -> Iterator[Tuple[int, int, int]]:
+    """Normalize every doctor's blocks, one doctor per transaction; yields (doctor_id, before, after)."""
+    if doctor_ids is None:
+        doctor_ids = db.scalars(select(models.DoctorAvailability.doctor_id).distinct().order_by(
+            models.DoctorAvailability.doctor_id
+        )).all()
+    for doctor_id in doctor_ids:
+        yield doctor_id, *normalize_doctor_availabilities(db, doctor_id, dry_run=dry_run)
+
+def create_availability_rule(db: Session, doctor_id: int, rule: schemas.AvailabilityRuleCreate):
+    db_rule = models.AvailabilityRule(
         doctor_id=doctor_id,
-        start_time=availability.start_time,
-        end_time=availability.end_time
+        weekday_mask=recurrence.weekday_mask(rule.weekdays),
+        start_date=rule.start_date,
+        end_date=rule.end_date,
+        start_time=rule.start_time,
+        end_time=rule.end_time,
+        exceptions=[models.AvailabilityException(date=day) for day in sorted(set(rule.exceptions))],
     )
-    db.add(db_avail)
+    db.add(db_rule)
     db.commit()
-    db.refresh(db_avail)
-    return db_avail
+    db.refresh(db_rule)
+    return db_rule
 
-def is_doctor_available(db: Session, doctor_id: int, start_time: datetime, end_time: datetime) -> bool:
-    available = db.query(models.DoctorAvailability).filter(
+def get_availability_rule(db: Session, rule_id: int):
+    return db.get(models.AvailabilityRule, rule_id)
+
+def add_availability_exceptions(db: Session, rule: models.AvailabilityRule, dates: Iterable[date]):
+    # Appended through the relationship so the rule itself is flushed as
+    # changed, which bumps the calendar version and refreshes the slots.
+    known = {exception.date for exception in rule.exceptions}
+    for day in sorted(set(dates) - known):
+        rule.exceptions.append(models.AvailabilityException(date=day))
+    db.commit()
+    db.refresh(rule)
+    return rule
+
+def availability_rules_query(first_day: date, last_day: date, *filters):
+    """Rules that may apply somewhere between the two dates (inclusive)."""
+    return select(models.AvailabilityRule).options(
+        selectinload(models.AvailabilityRule.exceptions)
+    ).where(
+        *filters,
+        models.AvailabilityRule.start_date <= last_day,
+        or_(models.AvailabilityRule.end_date.is_(None), models.AvailabilityRule.end_date >= first_day),
+    ).order_by(models.AvailabilityRule.doctor_id, models.AvailabilityRule.id)
+
+def covering_rules_query(doctor_id: int, start_time: datetime, end_time: datetime):
+    day = start_time.date()
+    return availability_rules_query(
+        day, day,
+        models.AvailabilityRule.doctor_id == doctor_id,
+        models.AvailabilityRule.start_time <= start_time.time(),
+        models.AvailabilityRule.end_time >= end_time.time(),
+    )
+
+def day_rules_query(doctor_id: int, day: date):
+    return availability_rules_query(day, day, models.AvailabilityRule.doctor_id == doctor_id)
+
+def covering_availability_query(doctor_id: int, start_time: datetime, end_time: datetime):
+    return select(models.DoctorAvailability.id).where(
         models.DoctorAvailability.doctor_id == doctor_id,
         models.DoctorAvailability.start_time <= start_time,
         models.DoctorAvailability.end_time >= end_time
-    ).first()
+    ).limit(1)
 
-    if not available:
-        return False
-
-    conflict = db.query(models.Appointment).filter(
+def conflicting_appointments_query(doctor_id: int, start_time: datetime, end_time: datetime):
+    return select(models.Appointment.id).where(
         models.Appointment.doctor_id == doctor_id,
         models.Appointment.status == models.AppointmentStatus.scheduled,
         models.Appointment.start_time < end_time,
         models.Appointment.end_time > start_time
-    ).first()
+    )
 
-    return conflict is None
+def rules_cover(rules, start_time: datetime, end_time: datetime) -> bool:
+    # Rule occurrences never cross midnight.
+    if end_time.date() != start_time.date():
+        return False
+    return any(
+        start <= start_time and end_time <= end
+        for start, end in recurrence.rule_windows(rules, start_time.date())
+    )
 
-def generate_open_slots(db: Session, doctor_id: int, date: datetime.date, slot_minutes: int):
-    availabilities = db.query(models.DoctorAvailability).filter(
-        models.DoctorAvailability.doctor_id == doctor_id,
-        func.date(models.DoctorAvailability.start_time) <= date,
-        func.date(models.DoctorAvailability.end_time) >= date
-    ).all()
+def availability_covers(db: Session, doctor_id: int, start_time: datetime, end_time: datetime) -> bool:
+    return db.scalar(covering_availability_query(doctor_id, start_time, end_time)) is not None or \
+        rules_cover(db.scalars(covering_rules_query(doctor_id, start_time, end_time)).all(), start_time, end_time)
 
-    if not availabilities:
-        return []
+def is_doctor_available(db: Session, doctor_id: int, start_time: datetime, end_time: datetime) -> bool:
+    if not availability_covers(db, doctor_id, start_time, end_time):
+        return False
+
+    return db.scalar(conflicting_appointments_query(doctor_id, start_time, end_time).limit(1)) is None
 
-    appointments = db.query(models.Appointment).filter(
+def availabilities_for_day(doctor_id: int, day: date):
+    # Half-open range predicates instead of func.date(...) keep the
+    # (doctor_id, start_time, end_time) index usable.
+    return select(models.DoctorAvailability).where(
+        models.DoctorAvailability.doctor_id == doctor_id,
+        models.DoctorAvailability.start_time < datetime.combine(day + timedelta(days=1), time.min),
+        models.DoctorAvailability.end_time >= datetime.combine(day, time.min)
+    ).order_by(models.DoctorAvailability.id)
+
+def appointments_for_day(doctor_id: int, day: date):
+    return select(models.Appointment).where(
         models.Appointment.doctor_id == doctor_id,
-        func.date(models.Appointment.start_time) == date,
-        models.Appointment.status == models.AppointmentStatus.scheduled
-    ).all()
+        models.Appointment.status == models.AppointmentStatus.scheduled,
+        models.Appointment.start_time >= datetime.combine(day, time.min),
+        models.Appointment.start_time < datetime.combine(day + timedelta(days=1), time.min)
+    )
 
-    taken_slots = [(a.start_time, a.end_time) for a in appointments]
-    open_slots = []
+def get_calendar_version(db: Session, doctor_id: int) -> int:
+    return db.scalar(calendar_version_query(doctor_id)) or 0
 
-    for avail in availabilities:
-        current = max(avail.start_time, datetime.combine(date, avail.start_time.time()))
-        end = min(avail.end_time, datetime.combine(date, avail.end_time.time()))
+def load_day_slots(db: Session, doctor_id: int, day: date, version: Optional[int] = None) -> slot_store.DaySlots:
+    # The version is read first: data newer than its label only costs a
+    # reload later, while the reverse would serve stale slots.
+    if version is None:
+        version = get_calendar_version(db, doctor_id)
+    availabilities = db.scalars(availabilities_for_day(doctor_id, day)).all()
+    rules = db.scalars(day_rules_query(doctor_id, day)).all()
+    windows = [(a.start_time, a.end_time) for a in availabilities]
+    windows.extend(recurrence.rule_windows(rules, day))
+    appointments = db.scalars(appointments_for_day(doctor_id, day)).all() if windows else []
+    return slot_store.DaySlots(day, windows, [(a.start_time, a.end_time) for a in appointments], version)
 
-        while current + timedelta(minutes=slot_minutes) <= end:
-            slot_end = current + timedelta(minutes=slot_minutes)
-            overlap = any(
-                s < slot_end and e > current for s, e in taken_slots
-            )
+def generate_open_slots(db: Session, doctor_id: int, date: date, slot_minutes: int, version: Optional[int] = None):
+    if version is None:
+        version = get_calendar_version(db, doctor_id)
+    day_slots = slot_store.store.get(doctor_id, date, version)
+    if day_slots is None:
+        day_slots = load_day_slots(db, doctor_id, date, version)
+        slot_store.store.put(doctor_id, day_slots)
+    return day_slots.open_slots(slot_minutes)
+
+def check_slot_store(db: Session) -> List[Tuple[int, date]]:
+    """Compare every stored doctor-day with a fresh load; stale entries are dropped."""
+    return slot_store.check_consistency(db, load_day_slots)
 
-            if not overlap:
-                open_slots.append({
-                    "start": current.strftime("%H:%M"),
-                    "end": slot_end.strftime("%H:%M")
-                })
+def search_queries(start_date: date, end_date: date, specialization: Optional[str] = None,
+                   doctor_ids: Optional[List[int]] = None):
+    range_start = datetime.combine(start_date, time.min)
+    range_end = datetime.combine(end_date + timedelta(days=1), time.min)
 
-            current += timedelta(minutes=5)  # slide window in 5-min increments
+    doctor_filters = []
+    if specialization:
+        doctor_filters.append(models.Doctor.specialization == specialization)
+    if doctor_ids:
+        doctor_filters.append(models.Doctor.id.in_(doctor_ids))
+    doctors = select(models.Doctor.id).where(*doctor_filters)
 
-    return open_slots
\ No newline at end of file
+    availabilities = select(
+        models.DoctorAvailability.doctor_id,
+        models.DoctorAvailability.start_time,
+        models.DoctorAvailability.end_time,
+    ).where(
+        models.DoctorAvailability.doctor_id.in_(doctors),
+        models.DoctorAvailability.start_time < range_end,
+        models.DoctorAvailability.end_time >= range_start,
+    ).order_by(models.DoctorAvailability.doctor_id, models.DoctorAvailability.id)
+
+    appointments = select(
+        models.Appointment.doctor_id,
+        models.Appointment.start_time,
+        models.Appointment.end_time,
+    ).where(
+        models.Appointment.doctor_id.in_(doctors),
+        models.Appointment.status == models.AppointmentStatus.scheduled,
+        models.Appointment.start_time >= range_start,
+        models.Appointment.start_time < range_end,
+    )
+
+    rules = availability_rules_query(start_date, end_date, models.AvailabilityRule.doctor_id.in_(doctors))
+    return availabilities, appointments, rules
+
+def search_open_slots(
+    db: Session,
+    start_date: date,
+    end_date: date,
+    slot_minutes: int,
+    specialization: Optional[str] = None,
+    doctor_ids: Optional[List[int]] = None,
+) -> Iterator[Tuple[int, date, List[dict]]]:
+    availabilities, appointments, rules = search_queries(start_date, end_date, specialization, doctor_ids)
+    # The queries run eagerly so the caller can stream the result after the
+    # session has been released.
+    return iter_doctor_slots(
+        db.execute(availabilities).all(), db.execute(appointments).all(),
+        start_date, end_date, slot_minutes, db.scalars(rules).all()
+    )
+
+def iter_doctor_slots(availabilities, appointments, start_date, end_date, slot_minutes, rules=()):
+    booked = defaultdict(list)
+    for doctor_id, start, end in appointments:
+        booked[doctor_id, start.date()].append((start, end))
+
+    concrete = defaultdict(list)
+    for doctor_id, start, end in availabilities:
+        concrete[doctor_id].append((start, end))
+    recurring = defaultdict(list)
+    for rule in rules:
+        recurring[rule.doctor_id].append(rule)
+
+    for doctor_id in sorted(concrete.keys() | recurring.keys()):
+        rows, doctor_rules = concrete[doctor_id], recurring[doctor_id]
+        day = start_date
+        while day <= end_date:
+            windows = [(start, end) for start, end in rows if start.date() <= day <= end.date()]
+            windows.extend(recurrence.rule_windows(doctor_rules, day))
+            if windows:
+                day_slots = slots.open_slots(windows, booked[doctor_id, day], day, slot_minutes)
+                if day_slots:
+                    yield doctor_id, day, day_slots
+            day += timedelta(days=1)
+
+# Next available
+NEXT_AVAILABLE_DAYS = 90
+KEYSET_FIRST_PAGE = 16
+KEYSET_MAX_PAGE = 512
+
+def keyset_rows(db: Session, statement, start_column, id_column) -> Iterator:
+    """Run ``statement`` page by page in (start, id) order, fetching a page only when it is reached.
+
+    Pages start small and double, so a caller that stops early has read
+    little more than it used.
+    """
+    statement = statement.order_by(start_column, id_column)
+    size, last = KEYSET_FIRST_PAGE, None
+    while True:
+        page = statement
+        if last is not None:
+            page = page.where(start_column >= last[0], or_(start_column > last[0], id_column > last[1]))
+        rows = db.execute(page.limit(size)).all()
+        yield from rows
+        if len(rows) < size:
+            return
+        last = (rows[-1].start_time, rows[-1].id)
+        size = min(size * 2, KEYSET_MAX_PAGE)
+
+def _free_gaps(db: Session, doctor_id: int, rules, not_before: datetime, length: timedelta, last_day: date):
+    """Yield ``(start, doctor_id, end, free_until)`` for the first slot of every free gap, in time order.
+
+    Sweeps day by day over the same windows and bookings as
+    generate_open_slots, reading the doctor's availabilities and
+    appointments through keyset streams as the sweep reaches them.
+    """
+    first_day = not_before.date()
+    range_start = datetime.combine(first_day, time.min)
+    range_end = datetime.combine(last_day + timedelta(days=1), time.min)
+    availability, appointment = models.DoctorAvailability, models.Appointment
+    availabilities = keyset_rows(db, select(availability.id, availability.start_time, availability.end_time).where(
+        availability.doctor_id == doctor_id,
+        availability.end_time >= range_start,
+        availability.start_time < range_end,
+    ), availability.start_time, availability.id)
+    booked = groupby(keyset_rows(db, select(appointment.id, appointment.start_time, appointment.end_time).where(
+        appointment.doctor_id == doctor_id,
+        appointment.status == models.AppointmentStatus.scheduled,
+        appointment.start_time >= range_start,
+        appointment.start_time < range_end,
+    ), appointment.start_time, appointment.id), key=lambda row: row.start_time.date())
+
+    active: List[slots.Interval] = []
+    upcoming = next(availabilities, None)
+    booked_day, booked_rows = date.min, ()
+    day = first_day
+    while day <= last_day:
+        if not active and not rules:
+            if upcoming is None:
+                return
+            day = max(day, upcoming.start_time.date())
+        while upcoming is not None and upcoming.start_time.date() <= day:
+            active.append((upcoming.start_time, upcoming.end_time))
+            upcoming = next(availabilities, None)
+        active = [(start, end) for start, end in active if end.date() >= day]
+        windows = [slots.day_window(start, end, day) for start, end in active]
+        windows.extend(recurrence.rule_windows(rules, day))
+        if windows:
+            while booked_day < day:
+                booked_day, booked_rows = next(booked, (date.max, ()))
+            busy = slots.merge_intervals(
+                (row.start_time, row.end_time) for row in booked_rows
+            ) if booked_day == day else []
+            busy_ends = [end for _, end in busy]
+            found = set()
+            for window in windows:
+                for gap_start, gap_end in slots.free_intervals(window, busy, busy_ends):
+                    start = next(slots.slot_starts(window[0], (max(gap_start, not_before), gap_end), length), None)
+                    if start is not None:
+                        found.add((start, doctor_id, start + length, gap_end))
+            yield from sorted(found)
+        day += timedelta(days=1)
+
+def next_available_slots(db: Session, doctor_ids: List[int], slot_minutes: int, not_before: datetime,
+                         count: int = 1, max_days: int = NEXT_AVAILABLE_DAYS) -> List[dict]:
+    """The ``count`` earliest free gaps fitting ``slot_minutes`` across ``doctor_ids``.
+
+    Each doctor is swept lazily and the sweeps are merged by start time, so
+    the work stops at the answer instead of covering the whole horizon of
+    ``max_days`` days.
+    """
+    last_day = not_before.date() + timedelta(days=max_days - 1)
+    rules = defaultdict(list)
+    for rule in db.scalars(availability_rules_query(
+        not_before.date(), last_day, models.AvailabilityRule.doctor_id.in_(doctor_ids)
+    )):
+        rules[rule.doctor_id].append(rule)
+    length = timedelta(minutes=slot_minutes)
+    sweeps = [_free_gaps(db, doctor_id, rules[doctor_id], not_before, length, last_day) for doctor_id in doctor_ids]
+    return [
+        {"doctor_id": doctor_id, "start": start, "end": end, "free_until": free_until}
+        for start, doctor_id, end, free_until in islice(merge(*sweeps), count)
+    ]
+
+def specialization_doctor_ids(db: Session, specialization: str) -> List[int]:
+    return db.scalars(
+        select(models.Doctor.id).where(models.Doctor.specialization == specialization).order_by(models.Doctor.id)
+    ).all()
@@ -0,0 +1,104 @@
+"""Per-process "find a doctor" index for databases without pg_trgm.
+
+Every lowercased word of a doctor's first name, last name and
+specialization goes into one sorted list, so all doctors with a word
+starting with a query word sit in a single bisect range. The index is
+loaded from the database on first use and labelled with the row count and
+highest id of the doctors table. crud.create_doctor adds its row directly;
+a search that finds the label out of date (after a bulk import, or a doctor
+created by another worker process) loads just the missing rows. On Postgres
+crud.search_doctor_records uses the trigram indexes instead.
+"""
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# A query word that starts a name ranks above one that starts a word of the
+# specialization; matching the whole word doubles the weight.
+NAME_WEIGHT = 2
+SPECIALIZATION_WEIGHT = 1
+
+Fingerprint = Tuple[int, int]
+
+
+def words(text: str) -> List[str]:
+    return text.lower().split()
+
+
+class DoctorDirectory:
+    def __init__(self):
+        self._tokens: List[Tuple[str, int, int]] = []
+        self._doctors: Dict[int, dict] = {}
+        self.fingerprint: Optional[Fingerprint] = None
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._tokens, self._doctors, self.fingerprint = [], {}, None
+
+    def load(self, doctors: Iterable[dict]):
+        """Replace the index with ``doctors``, all rows of the doctors table."""
+        with self._lock:
+            self._tokens, self._doctors = [], {}
+            for doctor in doctors:
+                self._tokens.extend(self._register(doctor))
+            self._tokens.sort()
+            self.fingerprint = (len(self._doctors), max(self._doctors, default=0))
+
+    def add(self, doctors: Iterable[dict]):
+        """Index doctors the caller has just committed; a no-op before the first load."""
+        with self._lock:
+            if self.fingerprint is None:
+                return
+            count, max_id = self.fingerprint
+            for doctor in doctors:
+                if doctor["id"] in self._doctors:
+                    continue
+                for token in self._register(doctor):
+                    insort(self._tokens, token)
+                count, max_id = count + 1, max(max_id, doctor["id"])
+            self.fingerprint = (count, max_id)
+
+    def _register(self, doctor: dict) -> List[Tuple[str, int, int]]:
+        self._doctors[doctor["id"]] = doctor
+        tokens = [(word, NAME_WEIGHT, doctor["id"])
+                  for word in words(doctor["first_name"]) + words(doctor["last_name"])]
+        tokens.extend((word, SPECIALIZATION_WEIGHT, doctor["id"]) for word in words(doctor["specialization"]))
+        return tokens
+
+    def _word_scores(self, word: str) -> Dict[int, int]:
+        scores: Dict[int, int] = {}
+        index = bisect_left(self._tokens, (word,))
+        while index < len(self._tokens) and self._tokens[index][0].startswith(word):
+            token, weight, doctor_id = self._tokens[index]
+            score = weight * 2 if token == word else weight
+            if score > scores.get(doctor_id, 0):
+                scores[doctor_id] = score
+            index += 1
+        return scores
+
+    def search(self, query: str, specialization: Optional[str] = None,
+               offset: int = 0, limit: int = 20) -> Tuple[List[dict], Optional[int]]:
+        """Doctors with a word starting with every query word, best first.
+
+        Returns the page and the offset of the next one, or None.
+        """
+        query_words = words(query)
+        if not query_words:
+            return [], None
+        with self._lock:
+            totals = self._word_scores(query_words[0])
+            for word in query_words[1:]:
+                scores = self._word_scores(word)
+                totals = {doctor_id: total + scores[doctor_id]
+                          for doctor_id, total in totals.items() if doctor_id in scores}
+            matches = [(self._doctors[doctor_id], total) for doctor_id, total in totals.items()]
+        if specialization:
+            matches = [(doctor, total) for doctor, total in matches if doctor["specialization"] == specialization]
+        matches.sort(key=lambda match: (-match[1], match[0]["last_name"].lower(),
+                                        match[0]["first_name"].lower(), match[0]["id"]))
+        page = [doctor for doctor, _ in matches[offset:offset + limit]]
+        return page, offset + limit if len(matches) > offset + limit else None
+
+
+doctors = DoctorDirectory()
@@ -0,0 +1,102 @@
+"""In-process fan-out of calendar changes to slot subscribers.
+
+Writers call ``hub.publish`` after their transaction commits, from any
+thread. Each subscriber owns a bounded asyncio queue on its event loop; one
+that falls ``queue_size`` notifications behind is dropped instead of
+letting the backlog grow.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Optional, Set
+from app.config import settings
+
+# Put on a subscriber's queue in place of its backlog when it is dropped.
+DROPPED = object()
+
+
+@dataclass(frozen=True)
+class CalendarChange:
+    doctor_id: int
+    first_day: date
+    last_day: date
+
+
+class Subscription:
+    def __init__(self, doctor_id: int, day: date, queue_size: int, loop: asyncio.AbstractEventLoop):
+        self.doctor_id = doctor_id
+        self.day = day
+        self.loop = loop
+        self.dropped = False
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    def offer(self, change: CalendarChange):
+        # Runs on the subscriber's loop.
+        if self.dropped:
+            return
+        if self.queue.full():
+            self.dropped = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(DROPPED)
+            return
+        self.queue.put_nowait(change)
+
+    async def get(self, timeout: Optional[float] = None):
+        """Next change, DROPPED, or None if ``timeout`` passes first."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def drain(self) -> bool:
+        """Discard queued changes, since a subscriber recomputing from
+        scratch only needs to know that something changed. Returns whether
+        the subscription has been dropped."""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        return self.dropped
+
+
+class SlotHub:
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._subscribers: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, doctor_id: int, day: date) -> Subscription:
+        subscription = Subscription(doctor_id, day, self.queue_size, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[doctor_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.doctor_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.doctor_id]
+        if subscription.dropped:
+            self.dropped += 1
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, doctor_id: int, first_day: date, last_day: date):
+        change = CalendarChange(doctor_id, first_day, last_day)
+        with self._lock:
+            targets = [s for s in self._subscribers.get(doctor_id, ()) if first_day <= s.day <= last_day]
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, change)
+            except RuntimeError:
+                # The subscriber's loop has already shut down.
+                self.unsubscribe(subscription)
+
+
+hub = SlotHub(settings.slot_events_queue_size)
@@ -0,0 +1,34 @@
+import csv
+import io
+import orjson
+from datetime import datetime
+from enum import Enum
+from typing import Iterable, Iterator, List, Sequence
+
+
+def ndjson_chunks(columns: Sequence[str], partitions: Iterable[List[tuple]]) -> Iterator[bytes]:
+    for rows in partitions:
+        yield b"".join(orjson.dumps(dict(zip(columns, row))) + b"\n" for row in rows)
+
+
+def _csv_value(value):
+    # Match the NDJSON rendering of timestamps and enums.
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def csv_chunks(columns: Sequence[str], partitions: Iterable[List[tuple]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in partitions:
+        writer.writerows([_csv_value(value) for value in row] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, for an empty export.
+    if buffer.tell():
+        yield buffer.getvalue()
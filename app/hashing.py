@@ -0,0 +1,126 @@
+import logging
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from passlib.context import CryptContext
+from typing import Iterable, List
+from app import metrics
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# settings.bcrypt_rounds is the one place the bcrypt cost is configured.
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
+
+
+class HashQueueFull(Exception):
+    """No room in the hashing queue within the queue timeout; the API answers 503."""
+    retry_after_seconds = 1
+
+    def __init__(self):
+        super().__init__("Too many password operations in progress, retry shortly")
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(plain: str, hashed: str) -> bool:
+    return pwd_context.verify(plain, hashed)
+
+
+class HashTimings:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = {}
+        self.total_seconds = {}
+        self.max_seconds = {}
+
+    def observe(self, operation: str, seconds: float):
+        with self._lock:
+            self.count[operation] = self.count.get(operation, 0) + 1
+            self.total_seconds[operation] = self.total_seconds.get(operation, 0.0) + seconds
+            self.max_seconds[operation] = max(self.max_seconds.get(operation, 0.0), seconds)
+
+
+class PasswordHasher:
+    def __init__(
+        self,
+        workers: int = settings.password_hash_workers,
+        queue_size: int = settings.password_hash_queue_size,
+        queue_timeout: float = settings.password_hash_queue_timeout,
+        executor: str = settings.password_hash_executor,
+    ):
+        if executor not in ("process", "thread"):
+            raise ValueError(f"Unknown password hash executor: {executor}")
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self.executor_kind = executor
+        self.timings = HashTimings()
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> Executor:
+        with self._executor_lock:
+            if self._executor is None:
+                if self.executor_kind == "process":
+                    # spawn: forking a process that already runs threads is unsafe.
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+            return self._executor
+
+    def _run(self, operation: str, fn, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise HashQueueFull()
+        started = time.perf_counter()
+        try:
+            return self._get_executor().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+            elapsed = time.perf_counter() - started
+            self.timings.observe(operation, elapsed)
+            metrics.record_timing("hash", elapsed)
+            logger.debug("password %s took %.1f ms", operation, elapsed * 1000)
+
+    def hash(self, password: str) -> str:
+        return self._run("hash", _hash, password)
+
+    def verify(self, plain: str, hashed: str) -> bool:
+        return self._run("verify", _verify, plain, hashed)
+
+    def hash_many(self, passwords: Iterable[str]) -> List[str]:
+        """Hash a batch in parallel, keeping at most one hash per worker in flight.
+
+        Batch items wait for queue room instead of failing, and the window
+        leaves the rest of the queue free for interactive logins.
+        """
+        executor = self._get_executor()
+        pending = deque()
+        hashes = []
+        started = time.perf_counter()
+        for password in passwords:
+            if len(pending) >= self.workers:
+                hashes.append(pending.popleft().result())
+            self._slots.acquire()
+            future = executor.submit(_hash, password)
+            future.add_done_callback(lambda _: self._slots.release())
+            pending.append(future)
+        hashes.extend(future.result() for future in pending)
+        if hashes:
+            self.timings.observe("hash_many", (time.perf_counter() - started) / len(hashes))
+        return hashes
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+hasher = PasswordHasher()
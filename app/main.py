@@ -1,8 +1,23 @@
-from fastapi import FastAPI
-from app.api import endpoints
+import logging
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, Request
+from app import database, metrics
+from app.api import endpoints, async_endpoints
+from app.hashing import HashQueueFull, hasher
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
+from app.config import settings
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    hasher.shutdown()
+    if database.async_engine is not None:
+        await database.async_engine.dispose()
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 origins = [
     "http://localhost:3000",
@@ -14,9 +29,50 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[endpoints.NEXT_CURSOR_HEADER],
 )
 
-app.include_router(endpoints.router)
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    stats = metrics.RequestStats()
+    token = metrics.current_request.set(stats)
+    try:
+        response = await call_next(request)
+    finally:
+        metrics.current_request.reset(token)
+    # The route template rather than the path keeps the label set small.
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    response.headers["Server-Timing"] = stats.server_timing()
+    metrics.observe_request(request.method, route, response.status_code, stats)
+    threshold = settings.request_query_warning_threshold
+    if threshold and stats.queries > threshold:
+        statement, repeats = stats.statements.most_common(1)[0]
+        logger.warning(
+            "%s %s ran %d queries (%.1f ms of SQL); possible N+1, ran %d times: %s",
+            request.method, route, stats.queries, stats.sql_seconds * 1000, repeats, " ".join(statement.split()),
+        )
+    return response
+
+def include_api_routes(app: FastAPI, async_mode: bool):
+    if not async_mode:
+        app.include_router(endpoints.router)
+        return
+    # Async handlers replace their threadpool counterparts; everything else
+    # keeps running from the sync router.
+    app.include_router(async_endpoints.router)
+    served = {(route.path, method) for route in async_endpoints.router.routes for method in route.methods}
+    # WebSocket routes have no methods and are always kept.
+    app.include_router(APIRouter(routes=[
+        route for route in endpoints.router.routes
+        if not any((route.path, method) in served for method in getattr(route, "methods", ()))
+    ]))
+
+include_api_routes(app, database.DB_MODE == "async")
+
+@app.exception_handler(HashQueueFull)
+async def hash_queue_full(request: Request, exc: HashQueueFull):
+    return JSONResponse(status_code=503, content={"detail": str(exc)},
+                        headers={"Retry-After": str(exc.retry_after_seconds)})
 
 @app.get("/")
 def read_root():
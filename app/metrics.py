@@ -0,0 +1,165 @@
+"""Per-request timings and process-wide metrics in the Prometheus text format.
+
+The HTTP middleware in app.main starts a RequestStats for every request;
+the engine hooks in app.database and the password hasher add to it through
+a context variable, which follows the request into the threadpool.
+"""
+import threading
+import time
+from collections import Counter as Tally
+from contextvars import ContextVar
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.statements = Tally()
+        self.timings: Dict[str, float] = {}
+
+    def add_query(self, statement: str, seconds: float):
+        self.queries += 1
+        self.sql_seconds += seconds
+        self.statements[statement] += 1
+        if seconds > self.slowest_seconds:
+            self.slowest_seconds, self.slowest_statement = seconds, statement
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        entries = [
+            f'db;dur={self.sql_seconds * 1000:.2f};desc="{self.queries} queries"',
+            f"db-slowest;dur={self.slowest_seconds * 1000:.2f}",
+        ]
+        entries.extend(f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.timings.items())
+        entries.append(f"total;dur={self.elapsed() * 1000:.2f}")
+        return ", ".join(entries)
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _quote(value) -> str:
+    return '"' + _escape(value) + '"'
+
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pairs = [f"{name}={_quote(value)}" for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name, self.documentation, self.labels = name, documentation, tuple(labels)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = list(self._values.items())
+        for label_values, value in values:
+            yield f"{self.name}{_labels(self.labels, label_values)} {value}"
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float], labels: Sequence[str] = ()):
+        self.name, self.documentation, self.labels = name, documentation, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            counts = self._values.get(label_values)
+            if counts is None:
+                # One count per bucket, then +Inf, then the sum.
+                counts = self._values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            counts[-2] += 1
+            counts[-1] += value
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            values = [(key, list(counts)) for key, counts in self._values.items()]
+        for label_values, counts in values:
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                yield f"{self.name}_bucket{_labels(self.labels, label_values, 'le=%s' % _quote(bound))} {count}"
+            yield f"{self.name}_sum{_labels(self.labels, label_values)} {counts[-1]}"
+            yield f"{self.name}_count{_labels(self.labels, label_values)} {counts[-2]}"
+
+
+def sampled(name: str, documentation: str, samples: Iterable[Tuple[dict, float]],
+            kind: str = "gauge") -> Iterator[str]:
+    """Lines for a metric whose values are read from elsewhere at scrape time."""
+    yield f"# HELP {name} {documentation}"
+    yield f"# TYPE {name} {kind}"
+    for labels, value in samples:
+        yield f"{name}{_labels(list(labels), list(labels.values()))} {value}"
+
+
+http_requests = Counter("http_requests_total", "HTTP requests served.", ["method", "route", "status"])
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Wall time of HTTP requests.", REQUEST_BUCKETS, ["method", "route"]
+)
+http_request_queries = Histogram(
+    "http_request_db_queries", "SQL statements executed per HTTP request.", COUNT_BUCKETS, ["method", "route"]
+)
+http_request_sql_duration = Histogram(
+    "http_request_db_duration_seconds", "SQL time per HTTP request.", REQUEST_BUCKETS, ["method", "route"]
+)
+db_query_duration = Histogram("db_query_duration_seconds", "Duration of single SQL statements.", QUERY_BUCKETS)
+
+REGISTRY = [http_requests, http_request_duration, http_request_queries, http_request_sql_duration, db_query_duration]
+
+
+def record_query(statement: str, seconds: float):
+    db_query_duration.observe(seconds)
+    stats = current_request.get()
+    if stats is not None:
+        stats.add_query(statement, seconds)
+
+
+def record_timing(name: str, seconds: float):
+    """Add to a named Server-Timing entry of the current request (e.g. hash)."""
+    stats = current_request.get()
+    if stats is not None:
+        stats.timings[name] = stats.timings.get(name, 0.0) + seconds
+
+
+def observe_request(method: str, route: str, status: int, stats: RequestStats):
+    http_requests.inc(method, route, status)
+    http_request_duration.observe(stats.elapsed(), method, route)
+    http_request_queries.observe(stats.queries, method, route)
+    http_request_sql_duration.observe(stats.sql_seconds, method, route)
+
+
+def render(*extra: Iterable[str]) -> str:
+    lines = [line for metric in REGISTRY for line in metric.render()]
+    for block in extra:
+        lines.extend(block)
+    return "\n".join(lines) + "\n"
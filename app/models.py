@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum as SqlEnum
+from sqlalchemy import Column, Integer, String, Date, DateTime, Time, ForeignKey, Index, UniqueConstraint, Enum as SqlEnum, func, literal_column, text
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
 from sqlalchemy.orm import relationship
 from app.database import Base
 import enum
@@ -21,6 +22,14 @@ class Patient(Base):
     appointments = relationship("Appointment", back_populates="patient")
     user = relationship("User", back_populates="patient_profile")
 
+    __table_args__ = (
+        Index("ix_patients_first_name_lower", func.lower(first_name).label("first_name_lower"),
+              postgresql_ops={"first_name_lower": "text_pattern_ops"}),
+        Index("ix_patients_last_name_lower", func.lower(last_name).label("last_name_lower"),
+              postgresql_ops={"last_name_lower": "text_pattern_ops"}),
+        Index("ix_patients_insurance", "insurance"),
+    )
+
 class Doctor(Base):
     __tablename__ = "doctors"
 
@@ -29,10 +38,29 @@ class Doctor(Base):
     first_name = Column(String, nullable=False)
     last_name = Column(String, nullable=False)
     specialization = Column(String, nullable=False)
+    # Bumped in the same transaction as every change to the doctor's
+    # availabilities or appointments; see app.crud.calendar_version_bump.
+    calendar_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     appointments = relationship("Appointment", back_populates="doctor")
     user = relationship("User", back_populates="doctor_profile")
 
+    __table_args__ = (
+        Index("ix_doctors_first_name_lower", func.lower(first_name).label("first_name_lower"),
+              postgresql_ops={"first_name_lower": "text_pattern_ops"}),
+        Index("ix_doctors_last_name_lower", func.lower(last_name).label("last_name_lower"),
+              postgresql_ops={"last_name_lower": "text_pattern_ops"}),
+        Index("ix_doctors_specialization", "specialization"),
+        # Directory search (crud.search_doctor_records); needs pg_trgm.
+        Index(
+            "ix_doctors_search_trgm",
+            func.lower(first_name + literal_column("' '", String) + last_name + literal_column("' '", String)
+                       + specialization).label("search_text"),
+            postgresql_using="gin",
+            postgresql_ops={"search_text": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
 class Appointment(Base):
     __tablename__ = "appointments"
 
@@ -46,6 +74,26 @@ class Appointment(Base):
     patient = relationship("Patient", back_populates="appointments")
     doctor = relationship("Doctor", back_populates="appointments")
 
+    __table_args__ = (
+        Index("ix_appointments_doctor_id_start_time_end_time", "doctor_id", "start_time", "end_time"),
+        Index("ix_appointments_patient_id_start_time", "patient_id", "start_time"),
+        Index(
+            "ix_appointments_scheduled_doctor_id_start_time",
+            "doctor_id", "start_time", "end_time",
+            postgresql_where=text("status = 'scheduled'"),
+            sqlite_where=text("status = 'scheduled'"),
+        ),
+        # Two scheduled appointments of one doctor may not overlap. SQLite has
+        # no equivalent, crud.create_appointment guards the insert there.
+        ExcludeConstraint(
+            (doctor_id, "="),
+            (func.tsrange(start_time, end_time), "&&"),
+            name="appointments_no_overlap",
+            using="gist",
+            where=text("status = 'scheduled'"),
+        ).ddl_if(dialect="postgresql"),
+    )
+
 class DoctorAvailability(Base):
     __tablename__ = "doctor_availabilities"
 
@@ -56,6 +104,50 @@ class DoctorAvailability(Base):
 
     doctor = relationship("Doctor", backref="availabilities")
 
+    __table_args__ = (
+        Index("ix_doctor_availabilities_doctor_id_start_time_end_time", "doctor_id", "start_time", "end_time"),
+    )
+
+class AvailabilityRule(Base):
+    """Weekly recurring availability, expanded per date by app.recurrence."""
+    __tablename__ = "availability_rules"
+
+    id = Column(Integer, primary_key=True, index=True)
+    doctor_id = Column(Integer, ForeignKey("doctors.id"), nullable=False)
+    # Bit n set means the rule applies on weekday n (Monday = 0).
+    weekday_mask = Column(Integer, nullable=False)
+    start_date = Column(Date, nullable=False)
+    # Open-ended when NULL.
+    end_date = Column(Date)
+    start_time = Column(Time, nullable=False)
+    end_time = Column(Time, nullable=False)
+
+    doctor = relationship("Doctor", backref="availability_rules")
+    exceptions = relationship("AvailabilityException", back_populates="rule",
+                              cascade="all, delete-orphan", order_by="AvailabilityException.date")
+
+    __table_args__ = (
+        Index("ix_availability_rules_doctor_id_start_date", "doctor_id", "start_date"),
+    )
+
+    @property
+    def weekdays(self):
+        return [day for day in range(7) if self.weekday_mask & (1 << day)]
+
+class AvailabilityException(Base):
+    """A date on which an availability rule does not apply."""
+    __tablename__ = "availability_exceptions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    rule_id = Column(Integer, ForeignKey("availability_rules.id", ondelete="CASCADE"), nullable=False)
+    date = Column(Date, nullable=False)
+
+    rule = relationship("AvailabilityRule", back_populates="exceptions")
+
+    __table_args__ = (
+        UniqueConstraint("rule_id", "date", name="uq_availability_exceptions_rule_id_date"),
+    )
+
 class Role(str, enum.Enum):
     doctor = "doctor"
     patient = "patient"
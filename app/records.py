@@ -0,0 +1,58 @@
+"""Trusted serialization for the read endpoints.
+
+The listings select only the columns of their response model and turn the
+row tuples into plain dicts that orjson writes directly, skipping the
+per-row Pydantic validation. The routes keep their response_model, so the
+OpenAPI schema does not change; tests/test_records.py checks the output
+against the models.
+"""
+from typing import Iterable, List, Mapping, Optional
+from fastapi.responses import ORJSONResponse
+from app import models
+
+USER_COLUMNS = (
+    models.User.id.label("user_id"),
+    models.User.email.label("user_email"),
+    models.User.role.label("user_role"),
+)
+PATIENT_COLUMNS = (
+    models.Patient.id, models.Patient.first_name, models.Patient.last_name,
+    models.Patient.phone, models.Patient.insurance, *USER_COLUMNS,
+)
+DOCTOR_COLUMNS = (
+    models.Doctor.id, models.Doctor.first_name, models.Doctor.last_name,
+    models.Doctor.specialization, *USER_COLUMNS,
+)
+APPOINTMENT_COLUMNS = (
+    models.Appointment.id, models.Appointment.patient_id, models.Appointment.doctor_id,
+    models.Appointment.start_time, models.Appointment.end_time, models.Appointment.status,
+)
+
+
+def patients(rows: Iterable[tuple]) -> List[dict]:
+    return [
+        {"id": id, "first_name": first_name, "last_name": last_name, "phone": phone, "insurance": insurance,
+         "user": {"id": user_id, "email": email, "role": role}}
+        for id, first_name, last_name, phone, insurance, user_id, email, role in rows
+    ]
+
+
+def doctors(rows: Iterable[tuple]) -> List[dict]:
+    return [
+        {"id": id, "first_name": first_name, "last_name": last_name, "specialization": specialization,
+         "user": {"id": user_id, "email": email, "role": role}}
+        for id, first_name, last_name, specialization, user_id, email, role in rows
+    ]
+
+
+def appointments(rows: Iterable[tuple]) -> List[dict]:
+    return [
+        {"id": id, "patient_id": patient_id, "doctor_id": doctor_id,
+         "start_time": start_time, "end_time": end_time, "status": status}
+        for id, patient_id, doctor_id, start_time, end_time, status in rows
+    ]
+
+
+def json_response(content, headers: Optional[Mapping[str, str]] = None) -> ORJSONResponse:
+    # orjson writes datetimes and str enums the way the response models do.
+    return ORJSONResponse(content, headers=headers)
@@ -0,0 +1,40 @@
+"""Lazy expansion of weekly availability rules into concrete intervals.
+
+Rules are never materialized into doctor_availabilities rows; callers load
+the rules that can apply to the dates they look at and walk just those
+dates.
+"""
+from datetime import date, datetime, timedelta
+from typing import Iterable, Iterator, Sequence, Tuple
+from app.slots import Interval
+
+
+def weekday_mask(weekdays: Iterable[int]) -> int:
+    mask = 0
+    for day in weekdays:
+        mask |= 1 << day
+    return mask
+
+
+def occurs_on(rule, day: date) -> bool:
+    return (
+        rule.start_date <= day
+        and (rule.end_date is None or day <= rule.end_date)
+        and bool(rule.weekday_mask & (1 << day.weekday()))
+        and all(exception.date != day for exception in rule.exceptions)
+    )
+
+
+def expand_rules(rules: Sequence, first_day: date, last_day: date) -> Iterator[Tuple[int, Interval]]:
+    """Yield ``(doctor_id, (start, end))`` for every occurrence between the
+    two dates (inclusive), date by date and in ``rules`` order within a date."""
+    day = first_day
+    while day <= last_day:
+        for rule in rules:
+            if occurs_on(rule, day):
+                yield rule.doctor_id, (datetime.combine(day, rule.start_time), datetime.combine(day, rule.end_time))
+        day += timedelta(days=1)
+
+
+def rule_windows(rules: Sequence, day: date) -> Iterator[Interval]:
+    return (window for _, window in expand_rules(rules, day, day))
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from datetime import datetime, time
+from pydantic import BaseModel, EmailStr, ValidationInfo, conint, field_validator
+from datetime import datetime, date, time, timedelta
 from typing import Optional, List
 import enum
 
@@ -70,6 +70,18 @@ class AppointmentOut(AppointmentCreate):
     class Config:
         orm_mode = True
 
+class BatchMode(str, enum.Enum):
+    all_or_nothing = "all_or_nothing"
+    best_effort = "best_effort"
+
+class AppointmentBatchCreate(BaseModel):
+    appointments: List[AppointmentCreate]
+    mode: BatchMode = BatchMode.all_or_nothing
+
+class AppointmentReschedule(BaseModel):
+    start_time: datetime
+    end_time: datetime
+
 class AvailabilityCreate(BaseModel):
     start_time: datetime
     end_time: datetime
@@ -80,15 +92,138 @@ class AvailabilityOut(AvailabilityCreate):
     class Config:
         orm_mode = True
 
+class AvailabilityRuleCreate(BaseModel):
+    weekdays: List[conint(ge=0, le=6)]  # Monday = 0
+    start_date: date
+    end_date: Optional[date] = None  # open-ended when omitted
+    start_time: time
+    end_time: time
+    exceptions: List[date] = []
+
+class AvailabilityExceptionCreate(BaseModel):
+    dates: List[date]
+
+class AvailabilityExceptionOut(BaseModel):
+    date: date
+
+    class Config:
+        orm_mode = True
+
+class AvailabilityRuleOut(BaseModel):
+    id: int
+    doctor_id: int
+    weekdays: List[int]
+    start_date: date
+    end_date: Optional[date] = None
+    start_time: time
+    end_time: time
+    exceptions: List[AvailabilityExceptionOut]
+
+    class Config:
+        orm_mode = True
+
 class TimeSlot(BaseModel):
     start: str  # e.g. "09:00"
     end: str
 
+class DoctorDaySlots(BaseModel):
+    doctor_id: int
+    date: date
+    slots: List[TimeSlot]
+
+class NextAvailableSlot(BaseModel):
+    doctor_id: int
+    start: datetime
+    end: datetime
+    free_until: datetime  # end of the free gap the slot starts
+
 class UserCreate(BaseModel):
     email: EmailStr
     password: str
     role: Role
 
+# How far past its first occurrence a bulk availability row may repeat.
+MAX_WEEKLY_REPEAT_DAYS = 366
+
+class BulkAvailabilityCreate(AvailabilityCreate):
+    doctor_id: int
+    # Repeat the block every week up to and including this date.
+    repeat_weekly_until: Optional[date] = None
+
+    @field_validator("repeat_weekly_until")
+    @classmethod
+    def repeat_within_horizon(cls, until: Optional[date], info: ValidationInfo) -> Optional[date]:
+        start = info.data.get("start_time")
+        if until is None or start is None:
+            return until
+        if until < start.date():
+            raise ValueError("must not be before the start_time date")
+        if until > start.date() + timedelta(days=MAX_WEEKLY_REPEAT_DAYS):
+            raise ValueError(f"must be at most {MAX_WEEKLY_REPEAT_DAYS} days after the start_time date")
+        return until
+
+class BulkRowResult(BaseModel):
+    row: int
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class BulkImportResult(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkRowResult]
+
+class ExportFormat(str, enum.Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+class PoolStats(BaseModel):
+    engine: str
+    pool: str
+    checkouts: int
+    # Only reported for QueuePool; overflow is negative until the pool is full.
+    size: Optional[int] = None
+    checked_in: Optional[int] = None
+    checked_out: Optional[int] = None
+    overflow: Optional[int] = None
+
+class DoctorDay(BaseModel):
+    doctor_id: int
+    date: date
+
+class DayCapacity(BaseModel):
+    date: date
+    available_minutes: int
+    booked_minutes: int
+    free_minutes: int
+    utilization: Optional[float] = None
+    free_gaps: int
+    largest_gap_minutes: int
+    fragmentation: Optional[float] = None
+    slots: int
+
+class DoctorCapacity(BaseModel):
+    doctor_id: int
+    available_minutes: int
+    booked_minutes: int
+    free_minutes: int
+    utilization: Optional[float] = None
+    free_gaps: int
+    fragmentation: Optional[float] = None
+    slots: int
+    days: Optional[List[DayCapacity]] = None
+
+class CapacityReport(BaseModel):
+    start_date: date
+    end_date: date
+    duration_minutes: int
+    doctors: List[DoctorCapacity]
+
+class SlotStoreReport(BaseModel):
+    entries: int
+    hits: int
+    misses: int
+    stale: List[DoctorDay]
+
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
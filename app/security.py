@@ -1,26 +1,31 @@
-from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from app.models import User
 from sqlalchemy.orm import Session
-from fastapi import HTTPException, Depends, status
+from fastapi import HTTPException, Depends, Query, WebSocketException, status
 from fastapi.security import OAuth2PasswordBearer
-from app.database import get_db
-from typing import Union, List
+from app.database import get_db, get_async_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.hashing import hasher
+from app.config import settings
+from sqlalchemy import event, inspect
+from typing import Union, List, Optional
+from collections import OrderedDict
 import os
+import threading
+import time
 
 SECRET_KEY = os.getenv("JWT_SECRET", "super-secret")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
 def verify_password(plain, hashed):
-    return pwd_context.verify(plain, hashed)
+    return hasher.verify(plain, hashed)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return hasher.hash(password)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
@@ -35,20 +40,130 @@ def decode_token(token: str):
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    payload = decode_token(token)
-    user = db.query(User).filter(User.email == payload.get("sub")).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
+class UserCache:
+    """Bounded LRU of resolved users, keyed by token subject.
+
+    Entries expire after ``ttl_seconds`` or when the token that populated them
+    does, whichever comes first. Cached users are detached copies, so only
+    column attributes are available on them.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, subject: str) -> Optional[User]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[subject]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(subject)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, subject: str, user: User, token_exp: Optional[float] = None) -> User:
+        cached = User(id=user.id, email=user.email, hashed_password=user.hashed_password, role=user.role)
+        lifetime = self.ttl_seconds
+        if token_exp is not None:
+            lifetime = min(lifetime, token_exp - time.time())
+        if lifetime <= 0:
+            return cached
+        with self._lock:
+            self._entries[subject] = (time.monotonic() + lifetime, cached)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return cached
+
+    def invalidate(self, subject: str):
+        with self._lock:
+            self._entries.pop(subject, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+user_cache = UserCache(settings.user_cache_size, settings.user_cache_ttl_seconds)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    # A changed email leaves the entry under the old subject behind too.
+    for email in [target.email, *inspect(target).attrs.email.history.deleted]:
+        user_cache.invalidate(email)
+
+def get_token_payload(token: str = Depends(oauth2_scheme)):
+    return decode_token(token)
+
+def load_user(db: Session, payload: dict) -> User:
+    subject = payload.get("sub")
+    user = user_cache.get(subject)
+    if user is None:
+        user = db.query(User).filter(User.email == subject).first()
+        if not user:
+            raise HTTPException(status_code=401, detail="User not found")
+        user = user_cache.put(subject, user, payload.get("exp"))
     return user
 
-def require_role(roles: Union[str, List[str]]):
-    def role_checker(current_user: User = Depends(get_current_user)):
-        allowed_roles = [roles] if isinstance(roles, str) else roles
-        if current_user.role not in allowed_roles:
+def get_current_user(payload: dict = Depends(get_token_payload), db: Session = Depends(get_db)):
+    return load_user(db, payload)
+
+def _role_guard(roles: Union[str, List[str]]):
+    allowed_roles = [roles] if isinstance(roles, str) else roles
+
+    def check(role):
+        if role not in allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Access restricted to: {', '.join(allowed_roles)}"
             )
+    return check
+
+def require_role(roles: Union[str, List[str]]):
+    check = _role_guard(roles)
+
+    def role_checker(payload: dict = Depends(get_token_payload), db: Session = Depends(get_db)):
+        # The role claim lets us turn requests away without touching the
+        # database; the stored role stays authoritative for letting them in.
+        if payload.get("role") is not None:
+            check(payload["role"])
+        current_user = load_user(db, payload)
+        check(current_user.role)
         return current_user
-    return role_checker
\ No newline at end of file
+    return role_checker
+
+def require_role_async(roles: Union[str, List[str]]):
+    check = _role_guard(roles)
+
+    async def role_checker(payload: dict = Depends(get_token_payload), db: AsyncSession = Depends(get_async_db)):
+        if payload.get("role") is not None:
+            check(payload["role"])
+        current_user = await db.run_sync(load_user, payload)
+        check(current_user.role)
+        return current_user
+    return role_checker
+
+def require_role_ws(roles: Union[str, List[str]]):
+    """require_role for WebSocket routes. Browsers cannot set headers on the
+    handshake, so the token comes in the ``token`` query parameter."""
+    role_checker = require_role(roles)
+
+    def ws_role_checker(token: str = Query(...), db: Session = Depends(get_db)):
+        try:
+            return role_checker(decode_token(token), db)
+        except HTTPException as exc:
+            raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=exc.detail)
+        finally:
+            # The dependency only closes the session when the socket does;
+            # hand the primary connection back as soon as the handshake is
+            # authenticated instead of holding it idle in a transaction.
+            db.close()
+    return ws_role_checker
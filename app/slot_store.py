@@ -0,0 +1,218 @@
+"""Per-process store of each doctor's free intervals per day.
+
+An entry holds the day's availability windows and scheduled appointments
+and the free gaps derived from them, so a slot listing for any duration is
+read straight off the gaps. Entries are labelled with the doctor's
+calendar_version and only served while it is unchanged, so writes made by
+other worker processes are picked up on the next read. Local writes patch
+or drop just the doctor-days they touch. Booking never relies on the store:
+the guarded INSERT in crud.create_appointment is what rejects overlaps.
+"""
+import threading
+import time
+from bisect import insort
+from collections import OrderedDict, defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app import events, models, slots
+from app.config import settings
+from app.slots import Interval
+
+Key = Tuple[int, date]
+
+
+class DaySlots:
+    def __init__(self, day: date, availabilities: Iterable[Interval], appointments: Iterable[Interval],
+                 version: int = 0):
+        self.day = day
+        self.version = version
+        self.windows = [slots.day_window(start, end, day) for start, end in availabilities]
+        self.appointments = sorted(appointments)
+        self._compute_gaps()
+
+    def _compute_gaps(self):
+        busy = slots.merge_intervals(self.appointments)
+        busy_ends = [end for _, end in busy]
+        self.gaps = [list(slots.free_intervals(window, busy, busy_ends)) for window in self.windows]
+
+    def book(self, start: datetime, end: datetime):
+        insort(self.appointments, (start, end))
+        self._compute_gaps()
+
+    def release(self, start: datetime, end: datetime) -> bool:
+        try:
+            self.appointments.remove((start, end))
+        except ValueError:
+            return False
+        self._compute_gaps()
+        return True
+
+    def open_slots(self, slot_minutes: int) -> List[dict]:
+        """Same output as slots.open_slots over the rows this entry was built from."""
+        length = timedelta(minutes=slot_minutes)
+        return [
+            {"start": start.strftime("%H:%M"), "end": (start + length).strftime("%H:%M")}
+            for window, gaps in zip(self.windows, self.gaps)
+            for gap in gaps
+            for start in slots.slot_starts(window[0], gap, length)
+        ]
+
+    def __eq__(self, other):
+        return isinstance(other, DaySlots) and (self.day, self.windows, self.appointments) == \
+            (other.day, other.windows, other.appointments)
+
+
+class SlotStore:
+    """Bounded LRU of DaySlots keyed by (doctor_id, day)."""
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Key, Tuple[float, DaySlots]]" = OrderedDict()
+        self._days: Dict[int, Set[date]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def get(self, doctor_id: int, day: date, version: int) -> Optional[DaySlots]:
+        key = (doctor_id, day)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now or entry[1].version != version:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def peek(self, doctor_id: int, day: date) -> Optional[DaySlots]:
+        with self._lock:
+            entry = self._entries.get((doctor_id, day))
+            return entry[1] if entry is not None else None
+
+    def put(self, doctor_id: int, day_slots: DaySlots):
+        if self.maxsize <= 0:
+            return
+        key = (doctor_id, day_slots.day)
+        with self._lock:
+            current = self._entries.get(key)
+            # A slow reader must not replace what a newer write left behind.
+            if current is not None and current[1].version > day_slots.version:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, day_slots)
+            self._entries.move_to_end(key)
+            self._days[doctor_id].add(day_slots.day)
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: Key):
+        self._entries.pop(key, None)
+        days = self._days.get(key[0])
+        if days is not None:
+            days.discard(key[1])
+            if not days:
+                del self._days[key[0]]
+
+    def book(self, doctor_id: int, start: datetime, end: datetime, version: int):
+        """Patch in an appointment committed as calendar ``version``."""
+        self._patch(doctor_id, start.date(), version, lambda day_slots: day_slots.book(start, end))
+
+    def release(self, doctor_id: int, start: datetime, end: datetime, version: int):
+        """Patch out an appointment canceled or completed as calendar ``version``."""
+        self._patch(doctor_id, start.date(), version, lambda day_slots: day_slots.release(start, end))
+
+    def _patch(self, doctor_id: int, day: date, version: int, change):
+        key = (doctor_id, day)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            if entry[1].version == version - 1 and change(entry[1]) is not False:
+                entry[1].version = version
+            else:
+                # Another write came in between; reload on the next read.
+                self._drop(key)
+
+    def invalidate(self, doctor_id: int, first_day: date, last_day: date):
+        with self._lock:
+            for day in [d for d in self._days.get(doctor_id, ()) if first_day <= d <= last_day]:
+                self._drop((doctor_id, day))
+
+    def keys(self) -> List[Key]:
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._days.clear()
+
+
+store = SlotStore(settings.slot_store_size, settings.slot_store_ttl_seconds)
+
+
+def _affected_days(target) -> Iterable[Tuple[int, date, date]]:
+    # Both the current values and, for updates, the ones being replaced.
+    state = inspect(target)
+
+    def values(attr):
+        return [getattr(target, attr), *state.attrs[attr].history.deleted]
+
+    for doctor_id in values("doctor_id"):
+        if isinstance(target, models.AvailabilityRule):
+            for first_day in values("start_date"):
+                for last_day in values("end_date"):
+                    yield doctor_id, first_day, last_day or date.max
+        elif isinstance(target, models.Appointment):
+            # Appointments only count towards the day they start on.
+            for start in values("start_time"):
+                yield doctor_id, start.date(), start.date()
+        else:
+            for start in values("start_time"):
+                for end in values("end_time"):
+                    yield doctor_id, start.date(), end.date()
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_days(session, flush_context):
+    for target in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(target, (models.Appointment, models.DoctorAvailability, models.AvailabilityRule)):
+            session.info.setdefault("slot_store_changes", set()).update(_affected_days(target))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_days(session):
+    # Only once the change is visible to other sessions.
+    for doctor_id, first_day, last_day in session.info.pop("slot_store_changes", ()):
+        store.invalidate(doctor_id, first_day, last_day)
+        events.hub.publish(doctor_id, first_day, last_day)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_days(session):
+    session.info.pop("slot_store_changes", None)
+
+
+def check_consistency(db: Session, loader) -> List[Key]:
+    """Rebuild every stored day with ``loader(db, doctor_id, day)``.
+
+    Entries from an older calendar version are dropped as outdated; entries
+    whose version is current but whose contents differ are dropped and
+    returned, since only a write that skipped the version bump explains them.
+    """
+    stale = []
+    for doctor_id, day in store.keys():
+        cached = store.peek(doctor_id, day)
+        if cached is None:
+            continue
+        fresh = loader(db, doctor_id, day)
+        if cached.version == fresh.version and cached != fresh:
+            stale.append((doctor_id, day))
+        if cached.version != fresh.version or cached != fresh:
+            store.invalidate(doctor_id, day, day)
+    return stale
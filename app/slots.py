@@ -0,0 +1,137 @@
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime, date, timedelta
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+Interval = Tuple[datetime, datetime]
+
+SLOT_STEP = timedelta(minutes=5)
+
+
+def day_window(start: datetime, end: datetime, day: date) -> Interval:
+    # An availability contributes the same wall-clock hours to every day it
+    # spans, clipped to the availability itself.
+    return (
+        max(start, datetime.combine(day, start.time())),
+        min(end, datetime.combine(day, end.time())),
+    )
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def normalize_availabilities(blocks: Iterable[Interval]) -> List[Interval]:
+    """The fewest availability blocks offering the same time as ``blocks``.
+
+    A block spanning several days stands for the same hours on each of them
+    (see day_window), so two blocks are only merged when they overlap or
+    touch and are either on the same single day or repeat the same hours.
+    Single-day blocks inside another block's hours of that day are dropped,
+    and so are empty ones.
+    """
+    groups = defaultdict(list)
+    for start, end in blocks:
+        if end > start:
+            key = start.date() if start.date() == end.date() else (start.time(), end.time())
+            groups[key].append((start, end))
+    merged = [block for group in groups.values() for block in merge_intervals(group)]
+    spanning = [(start, end) for start, end in merged if start.date() != end.date()]
+    return sorted(
+        block for block in merged
+        if block[0].date() != block[1].date() or not any(block_covers(outer, block) for outer in spanning)
+    )
+
+
+def block_covers(outer: Interval, inner: Interval) -> bool:
+    """Whether availability block ``outer`` offers all the time ``inner`` does."""
+    start, end = inner
+    if start.date() == end.date():
+        window_start, window_end = day_window(*outer, start.date())
+        return window_start <= start and end <= window_end
+    return outer[0] <= start and end <= outer[1] and \
+        (outer[0].time(), outer[1].time()) == (start.time(), end.time())
+
+
+def free_intervals(window: Interval, busy: Sequence[Interval], busy_ends: Sequence[datetime] = None) -> Iterator[Interval]:
+    """Yield the gaps of ``window`` not covered by the merged ``busy`` list."""
+    window_start, window_end = window
+    if busy_ends is None:
+        busy_ends = [e for _, e in busy]
+
+    cursor = window_start
+    # Busy intervals ending at or before the window start cannot block it.
+    for busy_start, busy_end in busy[bisect_right(busy_ends, window_start):]:
+        if busy_start >= window_end:
+            break
+        if busy_start > cursor:
+            yield (cursor, busy_start)
+        cursor = max(cursor, busy_end)
+
+    if cursor < window_end:
+        yield (cursor, window_end)
+
+
+def slot_starts(window_start: datetime, gap: Interval, length: timedelta, step: timedelta = SLOT_STEP) -> Iterator[datetime]:
+    """Yield the grid-aligned starts inside ``gap`` that fit a slot of ``length``."""
+    gap_start, gap_end = gap
+    offset = max(gap_start - window_start, timedelta(0))
+    current = window_start + -(-offset // step) * step
+    while current + length <= gap_end:
+        yield current
+        current += step
+
+
+def open_slots(availabilities: Iterable[Interval], appointments: Iterable[Interval], day: date, slot_minutes: int) -> List[dict]:
+    """Interval-sweep version of the per-day slot listing.
+
+    Appointments are sorted and merged once; each availability window then
+    walks only the busy intervals it overlaps, so the cost is
+    O((A + V) log A + slots) instead of O(steps x A).
+    """
+    length = timedelta(minutes=slot_minutes)
+    busy = merge_intervals(appointments)
+    busy_ends = [e for _, e in busy]
+
+    slots = []
+    for avail_start, avail_end in availabilities:
+        window = day_window(avail_start, avail_end, day)
+        for gap in free_intervals(window, busy, busy_ends):
+            for start in slot_starts(window[0], gap, length):
+                slots.append({
+                    "start": start.strftime("%H:%M"),
+                    "end": (start + length).strftime("%H:%M")
+                })
+    return slots
+
+
+def naive_open_slots(availabilities: Iterable[Interval], appointments: Iterable[Interval], day: date, slot_minutes: int) -> List[dict]:
+    """Reference sliding-window implementation, kept for tests and benchmarks."""
+    taken_slots = list(appointments)
+    open_slots = []
+
+    for avail_start, avail_end in availabilities:
+        current, end = day_window(avail_start, avail_end, day)
+
+        while current + timedelta(minutes=slot_minutes) <= end:
+            slot_end = current + timedelta(minutes=slot_minutes)
+            overlap = any(
+                s < slot_end and e > current for s, e in taken_slots
+            )
+
+            if not overlap:
+                open_slots.append({
+                    "start": current.strftime("%H:%M"),
+                    "end": slot_end.strftime("%H:%M")
+                })
+
+            current += SLOT_STEP
+
+    return open_slots
@@ -0,0 +1,254 @@
+"""Load test of the API against a synthetic clinic.
+
+Seeds N doctors and M patients with dense availabilities and appointments,
+drives the real app in-process through httpx's ASGI transport and reports
+throughput and latency percentiles for login, slot lookup, booking and
+listing::
+
+    python -m benchmarks.bench_api --doctors 50 --patients 500 --output results.json
+    python -m benchmarks.bench_api --baseline results.json --threshold 0.25
+
+With --baseline the run exits non-zero when a scenario got slower than the
+baseline by more than the threshold. bcrypt is turned down to its minimum
+cost unless BCRYPT_ROUNDS is set. Runs against a temporary SQLite database
+unless --database-url and --reset are given (see benchmarks.common).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import add_database_arguments, database_url, percentile, recreate_tables
+
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+SCENARIOS = ("login", "slots", "booking", "listing")
+FIRST_DAY = datetime(2031, 3, 3)
+PASSWORD = "benchpass"
+SLOT = timedelta(minutes=30)
+# Compared against the baseline: latencies may not grow, throughput may not drop.
+LATENCY_METRICS = ("p50_ms", "p99_ms")
+THROUGHPUT_METRIC = "requests_per_second"
+
+
+def seed(url, doctors, patients, days, booked, rng):
+    """Create the clinic and return the (doctor_id, start) slots left free."""
+    from sqlalchemy import create_engine, insert
+    from app.models import User, Role, Doctor, Patient, DoctorAvailability, Appointment, AppointmentStatus
+    from app.security import get_password_hash
+
+    engine = create_engine(url)
+    recreate_tables(engine)
+    hashed = get_password_hash(PASSWORD)
+    free = []
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "email": "admin@example.com", "hashed_password": hashed, "role": Role.admin}])
+        conn.execute(insert(User), [
+            {"id": 100 + n, "email": f"doctor{n}@example.com", "hashed_password": hashed, "role": Role.doctor}
+            for n in range(doctors)
+        ])
+        conn.execute(insert(Doctor), [
+            {"id": n + 1, "user_id": 100 + n, "first_name": "Doc", "last_name": str(n), "specialization": "GP"}
+            for n in range(doctors)
+        ])
+        first_patient_user = 100 + doctors
+        conn.execute(insert(User), [
+            {"id": first_patient_user + n, "email": f"patient{n}@example.com", "hashed_password": hashed,
+             "role": Role.patient}
+            for n in range(patients)
+        ])
+        conn.execute(insert(Patient), [
+            {"id": n + 1, "user_id": first_patient_user + n, "first_name": "Pat", "last_name": str(n)}
+            for n in range(patients)
+        ])
+
+        availabilities, appointments = [], []
+        for doctor_id in range(1, doctors + 1):
+            for day in range(days):
+                start = FIRST_DAY + timedelta(days=day, hours=8)
+                end = start + timedelta(hours=10)
+                availabilities.append({"doctor_id": doctor_id, "start_time": start, "end_time": end})
+                while start < end:
+                    if rng.random() < booked:
+                        appointments.append({
+                            "doctor_id": doctor_id, "patient_id": rng.randint(1, patients),
+                            "start_time": start, "end_time": start + SLOT,
+                            "status": AppointmentStatus.scheduled,
+                        })
+                    else:
+                        free.append((doctor_id, start))
+                    start += SLOT
+        conn.execute(insert(DoctorAvailability), availabilities)
+        if appointments:
+            conn.execute(insert(Appointment), appointments)
+    engine.dispose()
+    rng.shuffle(free)
+    return free
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        THROUGHPUT_METRIC: len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p90_ms": percentile(latencies, 0.90) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def requests_for(scenario, count, args, free, rng, admin_headers):
+    """Yield (method, url, kwargs) for ``count`` requests of one scenario."""
+    days = [(FIRST_DAY + timedelta(days=day)).date().isoformat() for day in range(args.days)]
+    for _ in range(count):
+        if scenario == "login":
+            yield "POST", "/login", {"data": {"username": f"patient{rng.randrange(args.patients)}@example.com",
+                                              "password": PASSWORD}}
+        elif scenario == "slots":
+            yield "GET", f"/doctors/{rng.randint(1, args.doctors)}/available-slots", {
+                "params": {"date": rng.choice(days), "duration_minutes": 30}, "headers": admin_headers}
+        elif scenario == "booking":
+            # Each booking takes a slot the seed left free, so all of them succeed.
+            doctor_id, start = next(free)
+            yield "POST", "/appointments", {"headers": admin_headers, "json": {
+                "doctor_id": doctor_id, "patient_id": rng.randint(1, args.patients),
+                "start_time": start.isoformat(), "end_time": (start + SLOT).isoformat()}}
+        elif scenario == "listing":
+            first = rng.randrange(max(args.days - 6, 1))
+            yield "GET", f"/doctors/{rng.randint(1, args.doctors)}/appointments", {
+                "params": {"start_date": days[first], "end_date": days[min(first + 6, args.days - 1)], "limit": 100},
+                "headers": admin_headers}
+
+
+async def drive(app, scenario, count, args, free, rng, admin_headers):
+    import httpx
+
+    latencies = []
+    errors = 0
+    pending = iter(requests_for(scenario, count, args, free, rng, admin_headers))
+
+    async def worker(client):
+        nonlocal errors
+        for method, url, kwargs in pending:
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+    return summarize(latencies, errors, elapsed)
+
+
+def compare(results, baseline, threshold):
+    """Regressions of ``results`` against ``baseline`` as readable lines."""
+    regressions = []
+    for scenario, base in baseline.get("scenarios", {}).items():
+        current = results["scenarios"].get(scenario)
+        if current is None:
+            continue
+        if current["errors"] > base.get("errors", 0):
+            regressions.append(f"{scenario}: {current['errors']} errors (baseline {base.get('errors', 0)})")
+        for metric in LATENCY_METRICS:
+            if base.get(metric) and current[metric] > base[metric] * (1 + threshold):
+                regressions.append(f"{scenario}: {metric} {current[metric]:.2f} vs baseline {base[metric]:.2f}")
+        if base.get(THROUGHPUT_METRIC) and current[THROUGHPUT_METRIC] < base[THROUGHPUT_METRIC] * (1 - threshold):
+            regressions.append(f"{scenario}: {THROUGHPUT_METRIC} {current[THROUGHPUT_METRIC]:.0f} "
+                               f"vs baseline {base[THROUGHPUT_METRIC]:.0f}")
+    return regressions
+
+
+def run(args, url):
+    # The app binds its engine to DATABASE_URL when it is first imported.
+    os.environ["DATABASE_URL"] = url
+    rng = random.Random(args.seed)
+    free = seed(url, args.doctors, args.patients, args.days, args.booked, rng)
+    if "booking" in args.scenarios and len(free) < args.warmup + args.requests:
+        sys.exit(f"Only {len(free)} free slots to book; lower --booked or add doctors or days.")
+    free = iter(free)
+
+    from app import database
+    from app.hashing import hasher
+    from app.main import app
+    from app.security import create_access_token
+
+    admin_headers = {"Authorization": "Bearer " + create_access_token(
+        {"sub": "admin@example.com", "uid": 1, "role": "admin"})}
+
+    async def run_all():
+        results = {}
+        try:
+            for scenario in args.scenarios:
+                # Warm-up requests fill the pools and caches and are not reported.
+                await drive(app, scenario, args.warmup, args, free, rng, admin_headers)
+                results[scenario] = await drive(app, scenario, args.requests, args, free, rng, admin_headers)
+            return results
+        finally:
+            # ASGITransport skips the lifespan, so clean up here.
+            if database.async_engine is not None:
+                await database.async_engine.dispose()
+
+    try:
+        scenarios = asyncio.run(run_all())
+    finally:
+        hasher.shutdown()
+        database.engine.dispose()
+    return {
+        "config": {key: getattr(args, key) for key in
+                   ("doctors", "patients", "days", "booked", "requests", "warmup", "concurrency", "seed")}
+                  | {"db_mode": database.DB_MODE},
+        "scenarios": scenarios,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--doctors", type=int, default=50)
+    parser.add_argument("--patients", type=int, default=500)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--booked", type=float, default=0.5, help="Fraction of 30-minute slots seeded as booked")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario")
+    parser.add_argument("--warmup", type=int, default=50, help="Unreported requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=0)
+    add_database_arguments(parser)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed relative slowdown before a scenario counts as a regression")
+    args = parser.parse_args()
+
+    with database_url(args) as url:
+        results = run(args, url)
+
+    print(f"{'scenario':>10} {'req/s':>9} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for scenario, result in results["scenarios"].items():
+        print(f"{scenario:>10} {result[THROUGHPUT_METRIC]:>9.0f} {result['p50_ms']:>9.2f} "
+              f"{result['p90_ms']:>9.2f} {result['p99_ms']:>9.2f} {result['errors']:>7}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} of the baseline.")
+
+
+if __name__ == "__main__":
+    main()
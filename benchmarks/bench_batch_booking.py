@@ -0,0 +1,117 @@
+"""Statements, commits and latency of booking a weekly series one
+appointment at a time (as 12 POST /appointments calls would) versus one
+crud.create_appointments_batch call::
+
+    python -m benchmarks.bench_batch_booking --series 50 --weeks 12
+
+Runs against a temporary SQLite database unless --database-url and --reset
+are given (see benchmarks.common).
+"""
+import argparse
+import statistics
+import time
+from datetime import date, datetime, time as clock, timedelta
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, recurrence, schemas
+from app.models import User, Role, Doctor, Patient, DoctorAvailability, AvailabilityRule
+
+from benchmarks.common import add_database_arguments, database_url, percentile, recreate_tables
+
+FIRST_DAY = date(2031, 9, 2)
+
+
+def seed(engine, doctors, weeks):
+    recreate_tables(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(User(id=1, email="patient@example.com", hashed_password="x", role=Role.patient))
+    db.add(Patient(id=1, user_id=1, first_name="Pat", last_name="Ient"))
+    for n in range(doctors):
+        db.add(User(id=n + 10, email=f"doc{n}@example.com", hashed_password="x", role=Role.doctor))
+        db.add(Doctor(id=n + 1, user_id=n + 10, first_name="Doc", last_name=str(n), specialization="Physiotherapy"))
+        # Half the doctors publish concrete blocks, the other half a weekly rule.
+        if n % 2:
+            db.add(AvailabilityRule(
+                doctor_id=n + 1, weekday_mask=recurrence.weekday_mask([FIRST_DAY.weekday()]),
+                start_date=FIRST_DAY, end_date=None, start_time=clock(8), end_time=clock(18),
+            ))
+        else:
+            for week in range(weeks):
+                start = datetime.combine(FIRST_DAY + timedelta(weeks=week), clock(8))
+                db.add(DoctorAvailability(doctor_id=n + 1, start_time=start, end_time=start.replace(hour=18)))
+    db.commit()
+    db.close()
+
+
+def series(doctor_id, weeks):
+    start = datetime.combine(FIRST_DAY, clock(9))
+    return [
+        schemas.AppointmentCreate(
+            patient_id=1, doctor_id=doctor_id,
+            start_time=start + timedelta(weeks=week), end_time=start + timedelta(weeks=week, minutes=45),
+        )
+        for week in range(weeks)
+    ]
+
+
+def book_sequentially(db, items):
+    for item in items:
+        if crud.is_doctor_available(db, item.doctor_id, item.start_time, item.end_time):
+            crud.create_appointment(db, item)
+
+
+def book_batch(db, items):
+    assert crud.create_appointments_batch(db, items).failed == 0
+
+
+def run(engine, book, count, weeks):
+    seed(engine, count, weeks)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    statements, commits = [], []
+    count_statement = lambda *args: statements.append(1)
+    count_commit = lambda *args: commits.append(1)
+    event.listen(engine, "before_cursor_execute", count_statement)
+    event.listen(engine, "commit", count_commit)
+    latencies = []
+    try:
+        for doctor_id in range(1, count + 1):
+            db = Session()
+            started = time.perf_counter()
+            book(db, series(doctor_id, weeks))
+            latencies.append(time.perf_counter() - started)
+            db.close()
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statement)
+        event.remove(engine, "commit", count_commit)
+
+    latencies.sort()
+    return {
+        "statements": len(statements) / count,
+        "commits": len(commits) / count,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--series", type=int, default=50)
+    parser.add_argument("--weeks", type=int, default=12)
+    add_database_arguments(parser)
+    args = parser.parse_args()
+
+    with database_url(args) as url:
+        engine = create_engine(url)
+        print(f"{'implementation':>16} {'stmts/series':>13} {'commits/series':>15} {'mean ms':>9} {'p95 ms':>9}")
+        for label, book in (("sequential", book_sequentially), ("batch", book_batch)):
+            result = run(engine, book, args.series, args.weeks)
+            print(f"{label:>16} {result['statements']:>13.1f} {result['commits']:>15.1f} "
+                  f"{result['mean_ms']:>9.2f} {result['p95_ms']:>9.2f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Throughput and tail latency of the slot and booking endpoints with
+DB_MODE=sync versus DB_MODE=async::
+
+    python -m benchmarks.bench_db_modes --requests 2000 --concurrency 64
+
+Each mode runs in its own interpreter because DB_MODE is read when
+app.database is imported. Runs against a temporary SQLite (aiosqlite)
+database; to exercise asyncpg, pass a scratch PostgreSQL database as
+--database-url together with --reset, since its tables are dropped.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import add_database_arguments, database_url, percentile, recreate_tables
+
+DAY = datetime(2025, 6, 18)
+DOCTORS = 20
+
+
+def seed(url):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.models import User, Role, Doctor, Patient, DoctorAvailability
+
+    engine = create_engine(url)
+    recreate_tables(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(User(id=1, email="admin@example.com", hashed_password="x", role=Role.admin))
+    db.add(User(id=2, email="patient@example.com", hashed_password="x", role=Role.patient))
+    db.add(Patient(id=1, user_id=2, first_name="Pat", last_name="Ient"))
+    for n in range(DOCTORS):
+        db.add(User(id=n + 10, email=f"doc{n}@example.com", hashed_password="x", role=Role.doctor))
+        db.add(Doctor(id=n + 1, user_id=n + 10, first_name="Doc", last_name=str(n), specialization="GP"))
+        db.add(DoctorAvailability(
+            doctor_id=n + 1, start_time=DAY.replace(hour=0), end_time=DAY.replace(hour=23, minute=55)
+        ))
+    db.commit()
+    db.close()
+    engine.dispose()
+
+
+async def drive(app, token, requests, concurrency):
+    import httpx
+
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies = {"slots": [], "booking": []}
+    counter = iter(range(requests))
+
+    async def worker(client):
+        for n in counter:
+            if n % 2:
+                kind = "slots"
+                call = client.get(
+                    f"/doctors/{n % DOCTORS + 1}/available-slots",
+                    params={"date": DAY.date().isoformat(), "duration_minutes": 30}, headers=headers,
+                )
+            else:
+                # Every booking gets its own 5-minute slot, so all of them succeed.
+                start = DAY + timedelta(minutes=5 * (n // 2 // DOCTORS))
+                kind = "booking"
+                call = client.post("/appointments", headers=headers, json={
+                    "patient_id": 1, "doctor_id": n // 2 % DOCTORS + 1,
+                    "start_time": start.isoformat(), "end_time": (start + timedelta(minutes=5)).isoformat(),
+                })
+            started = time.perf_counter()
+            response = await call
+            latencies[kind].append(time.perf_counter() - started)
+            response.raise_for_status()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    result = {"requests_per_second": requests / elapsed}
+    for kind, values in latencies.items():
+        values.sort()
+        result[f"{kind}_p99_ms"] = percentile(values, 0.99) * 1000
+    return result
+
+
+def worker_main(args):
+    from app import database
+    from app.main import app
+    from app.security import create_access_token
+
+    token = create_access_token({"sub": "admin@example.com", "uid": 1, "role": "admin"})
+
+    async def run():
+        try:
+            return await drive(app, token, args.requests, args.concurrency)
+        finally:
+            # ASGITransport skips the lifespan, so close the pool here.
+            if database.async_engine is not None:
+                await database.async_engine.dispose()
+
+    print(json.dumps(asyncio.run(run())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    add_database_arguments(parser)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker_main(args)
+        return
+
+    with database_url(args) as url:
+        print(f"{'mode':>6} {'req/s':>9} {'slots p99 ms':>13} {'booking p99 ms':>15}")
+        for mode in ("sync", "async"):
+            seed(url)
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_db_modes", "--worker",
+                 "--requests", str(args.requests), "--concurrency", str(args.concurrency)],
+                env={**os.environ, "DATABASE_URL": url, "DB_MODE": mode},
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{mode:>6} {result['requests_per_second']:>9.0f} "
+                  f"{result['slots_p99_ms']:>13.2f} {result['booking_p99_ms']:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Cost of serving a large listing through the response models versus the
+column-projected records path in app.records::
+
+    python -m benchmarks.bench_listings --rows 10000
+
+"models" is what FastAPI does for a response_model route (ORM query,
+validation, JSON-mode dump) rendered with the stdlib JSONResponse or the
+ORJSONResponse default; "records" selects the columns and writes the dicts
+with orjson. Page sizes are capped by the API, so this times the query and
+serialization of one large page directly. Runs against a temporary SQLite
+database unless --database-url and --reset are given (see benchmarks.common).
+"""
+import argparse
+import timeit
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, records, schemas
+from app.models import User, Role, Doctor, Patient, Appointment, AppointmentStatus
+
+from benchmarks.common import add_database_arguments, database_url, recreate_tables
+
+START = datetime(2031, 5, 5, 9)
+
+
+def seed(engine, rows):
+    recreate_tables(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "email": "doc@example.com", "hashed_password": "x", "role": Role.doctor}])
+        conn.execute(insert(Doctor), [{"id": 1, "user_id": 1, "first_name": "Doc", "last_name": "Tor",
+                                       "specialization": "GP"}])
+        conn.execute(insert(User), [
+            {"id": n + 10, "email": f"patient{n}@example.com", "hashed_password": "x", "role": Role.patient}
+            for n in range(rows)
+        ])
+        conn.execute(insert(Patient), [
+            {"id": n + 1, "user_id": n + 10, "first_name": "Pat", "last_name": str(n),
+             "phone": "555-0100", "insurance": "NHIF"}
+            for n in range(rows)
+        ])
+        conn.execute(insert(Appointment), [
+            {"doctor_id": 1, "patient_id": n % rows + 1, "start_time": START + timedelta(minutes=5 * n),
+             "end_time": START + timedelta(minutes=5 * n + 5), "status": AppointmentStatus.scheduled}
+            for n in range(rows)
+        ])
+
+
+def through_models(list_models, schema, response_class):
+    adapter = TypeAdapter(List[schema])
+
+    def serve(db, rows):
+        objects, _ = list_models(db, limit=rows)
+        content = adapter.dump_python(adapter.validate_python(objects, from_attributes=True), mode="json")
+        return response_class(content).body
+    return serve
+
+
+def through_records(list_records):
+    def serve(db, rows):
+        content, _ = list_records(db, limit=rows)
+        return records.json_response(content).body
+    return serve
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    add_database_arguments(parser)
+    args = parser.parse_args()
+
+    with database_url(args) as url:
+        engine = create_engine(url)
+        seed(engine, args.rows)
+        Session = sessionmaker(bind=engine)
+        listings = (
+            ("patients", crud.list_patients, crud.list_patient_records, schemas.PatientOut),
+            ("appointments", crud.list_appointments, crud.list_appointment_records, schemas.AppointmentOut),
+        )
+        print(f"{'listing':>13} {'models+json ms':>15} {'models+orjson ms':>17} {'records ms':>11} {'speedup':>8}")
+        for name, list_models, list_records, schema in listings:
+            timings = {}
+            for label, serve in (
+                ("json", through_models(list_models, schema, JSONResponse)),
+                ("orjson", through_models(list_models, schema, ORJSONResponse)),
+                ("records", through_records(list_records)),
+            ):
+                def once():
+                    # A fresh session per request, as the API uses.
+                    db = Session()
+                    try:
+                        serve(db, args.rows)
+                    finally:
+                        db.close()
+                timings[label] = min(timeit.repeat(once, number=1, repeat=args.repeat)) * 1000
+            print(f"{name:>13} {timings['json']:>15.1f} {timings['orjson']:>17.1f} {timings['records']:>11.1f} "
+                  f"{timings['json'] / timings['records']:>7.1f}x")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
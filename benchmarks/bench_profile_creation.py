@@ -0,0 +1,102 @@
+"""Round trips and latency of creating a patient, before and after the
+single-transaction rewrite of crud.create_patient::
+
+    python -m benchmarks.bench_profile_creation --count 200
+
+bcrypt is turned down to its minimum cost so the database work is what
+gets measured. Runs against a temporary SQLite database unless
+--database-url and --reset are given (see benchmarks.common).
+"""
+import argparse
+import os
+import statistics
+import time
+
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("PASSWORD_HASH_EXECUTOR", "thread")
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models, schemas
+from app.security import get_password_hash
+
+from benchmarks.common import add_database_arguments, database_url, percentile, recreate_tables
+
+
+def legacy_create_patient(db, patient):
+    """The previous two-commit implementation, kept for comparison."""
+    user = models.User(
+        email=patient.email,
+        hashed_password=get_password_hash(patient.password),
+        role=models.Role.patient
+    )
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+
+    db_patient = models.Patient(
+        user_id=user.id,
+        first_name=patient.first_name,
+        last_name=patient.last_name,
+        insurance=patient.insurance,
+        phone=patient.phone
+    )
+    db.add(db_patient)
+    db.commit()
+    db.refresh(db_patient)
+    return db_patient
+
+
+def run(engine, create, label, count):
+    recreate_tables(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    statements, commits = [], []
+    count_statement = lambda *args: statements.append(1)
+    count_commit = lambda *args: commits.append(1)
+    event.listen(engine, "before_cursor_execute", count_statement)
+    event.listen(engine, "commit", count_commit)
+    latencies = []
+    try:
+        for n in range(count):
+            db = Session()
+            started = time.perf_counter()
+            patient = create(db, schemas.PatientCreate(
+                first_name="Bench", last_name=str(n), email=f"{label}{n}@example.com", password="pw"
+            ))
+            # Serializing the response touches the same attributes as PatientOut.
+            schemas.PatientOut.model_validate(patient, from_attributes=True)
+            latencies.append(time.perf_counter() - started)
+            db.close()
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statement)
+        event.remove(engine, "commit", count_commit)
+
+    latencies.sort()
+    return {
+        "statements": len(statements) / count,
+        "commits": len(commits) / count,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=200)
+    add_database_arguments(parser)
+    args = parser.parse_args()
+
+    with database_url(args) as url:
+        engine = create_engine(url)
+        print(f"{'implementation':>16} {'stmts/req':>10} {'commits/req':>12} {'mean ms':>9} {'p95 ms':>9}")
+        for label, create in (("legacy", legacy_create_patient), ("single_tx", crud.create_patient)):
+            result = run(engine, create, label, args.count)
+            print(f"{label:>16} {result['statements']:>10.1f} {result['commits']:>12.1f} "
+                  f"{result['mean_ms']:>9.2f} {result['p95_ms']:>9.2f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
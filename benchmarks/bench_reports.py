@@ -0,0 +1,97 @@
+"""Capacity report for a clinic-month on NumPy minute grids versus looping
+generate_open_slots over every doctor and day::
+
+    python -m benchmarks.bench_reports --doctors 200 --days 31
+
+The loop only produces the slot counts; the report also computes the
+minutes, gaps and fragmentation. The slot store is cleared before each loop
+run so it measures cold reads, as a nightly job would see them. Runs
+against a temporary SQLite database unless --database-url and --reset are
+given (see benchmarks.common).
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, reports, slot_store
+from app.models import User, Role, Doctor, Patient, DoctorAvailability, Appointment, AppointmentStatus
+
+from benchmarks.common import add_database_arguments, database_url, recreate_tables
+
+FIRST_DAY = date(2031, 7, 1)
+SLOT = timedelta(minutes=30)
+
+
+def seed(engine, doctors, days, booked, rng):
+    recreate_tables(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": n + 1, "email": f"user{n}@example.com", "hashed_password": "x",
+             "role": Role.patient if n == doctors else Role.doctor}
+            for n in range(doctors + 1)
+        ])
+        conn.execute(insert(Doctor), [
+            {"id": n + 1, "user_id": n + 1, "first_name": "Doc", "last_name": str(n), "specialization": "GP"}
+            for n in range(doctors)
+        ])
+        conn.execute(insert(Patient), [{"id": 1, "user_id": doctors + 1, "first_name": "Pat", "last_name": "Ient"}])
+        availabilities, appointments = [], []
+        for doctor_id in range(1, doctors + 1):
+            for day in range(days):
+                start = datetime.combine(FIRST_DAY + timedelta(days=day), datetime.min.time()) + timedelta(hours=8)
+                end = start + timedelta(hours=9)
+                availabilities.append({"doctor_id": doctor_id, "start_time": start, "end_time": end})
+                while start < end:
+                    if rng.random() < booked:
+                        appointments.append({"doctor_id": doctor_id, "patient_id": 1, "start_time": start,
+                                             "end_time": start + SLOT, "status": AppointmentStatus.scheduled})
+                    start += SLOT
+        conn.execute(insert(DoctorAvailability), availabilities)
+        conn.execute(insert(Appointment), appointments)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--doctors", type=int, default=200)
+    parser.add_argument("--days", type=int, default=31)
+    parser.add_argument("--booked", type=float, default=0.6, help="Fraction of 30-minute slots seeded as booked")
+    parser.add_argument("--duration", type=int, default=30)
+    add_database_arguments(parser)
+    args = parser.parse_args()
+
+    with database_url(args) as url:
+        engine = create_engine(url)
+        seed(engine, args.doctors, args.days, args.booked, random.Random(0))
+        Session = sessionmaker(bind=engine)
+        last_day = FIRST_DAY + timedelta(days=args.days - 1)
+
+        db = Session()
+        started = time.perf_counter()
+        report = reports.capacity_report(db, FIRST_DAY, last_day, args.duration)
+        vectorized = time.perf_counter() - started
+        db.close()
+
+        slot_store.store.clear()
+        db = Session()
+        started = time.perf_counter()
+        counts = [
+            sum(len(crud.generate_open_slots(db, doctor_id, FIRST_DAY + timedelta(days=day), args.duration))
+                for day in range(args.days))
+            for doctor_id in range(1, args.doctors + 1)
+        ]
+        looped = time.perf_counter() - started
+        db.close()
+        engine.dispose()
+
+    assert counts == [doctor["slots"] for doctor in report["doctors"]]
+    print(f"{args.doctors} doctors x {args.days} days, {sum(counts)} slots of {args.duration} minutes")
+    print(f"generate_open_slots loop {looped * 1000:>9.0f} ms")
+    print(f"numpy report             {vectorized * 1000:>9.0f} ms  ({looped / vectorized:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Micro-benchmark for the per-day slot computation.
+
+Compares the interval-sweep engine with the original sliding-window loop as
+the number of booked appointments grows, and with reading the slots off a
+precomputed app.slot_store entry (the cost of a store hit)::
+
+    python -m benchmarks.bench_slots
+    python -m benchmarks.bench_slots --appointments 10 100 1000 --repeat 5
+"""
+import argparse
+import random
+import timeit
+from datetime import datetime, timedelta, date
+
+from app.slot_store import DaySlots
+from app.slots import open_slots, naive_open_slots
+
+DAY = date(2025, 6, 18)
+
+
+def build_calendar(appointment_count, seed=0):
+    rng = random.Random(seed)
+    midnight = datetime.combine(DAY, datetime.min.time())
+    availabilities = [(midnight.replace(hour=7), midnight.replace(hour=21))]
+    appointments = []
+    # Bookings crowd the morning; the free afternoon is where the sliding
+    # window pays for a full scan of the appointment list at every step.
+    for _ in range(appointment_count):
+        start = midnight + timedelta(minutes=rng.randrange(7 * 60, 13 * 60))
+        appointments.append((start, start + timedelta(minutes=rng.choice([5, 10, 15]))))
+    return availabilities, appointments
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--appointments", type=int, nargs="+", default=[0, 10, 50, 100, 500, 1000])
+    parser.add_argument("--slot-minutes", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'appointments':>12} {'naive ms':>10} {'sweep ms':>10} {'stored ms':>10} {'speedup':>8}")
+    for count in args.appointments:
+        availabilities, appointments = build_calendar(count)
+        assert open_slots(availabilities, appointments, DAY, args.slot_minutes) == \
+            naive_open_slots(availabilities, appointments, DAY, args.slot_minutes)
+
+        stored = DaySlots(DAY, availabilities, appointments)
+        timings = {}
+        for name, fn in (
+            ("naive", naive_open_slots),
+            ("sweep", open_slots),
+            ("stored", lambda *_: stored.open_slots(args.slot_minutes)),
+        ):
+            timer = timeit.Timer(lambda: fn(availabilities, appointments, DAY, args.slot_minutes))
+            loops, _ = timer.autorange()
+            timings[name] = min(timer.repeat(args.repeat, loops)) / loops * 1000
+
+        print(f"{count:>12} {timings['naive']:>10.3f} {timings['sweep']:>10.3f} {timings['stored']:>10.3f} "
+              f"{timings['naive'] / timings['sweep']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
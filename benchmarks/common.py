@@ -0,0 +1,41 @@
+"""Database setup and statistics shared by the benchmark scripts.
+
+Every benchmark seeds its own clinic into empty tables. By default that is a
+SQLite file in a temporary directory; a --database-url is only accepted
+together with --reset, because seeding drops and recreates all tables there.
+"""
+import tempfile
+from contextlib import contextmanager
+
+
+def add_database_arguments(parser):
+    parser.add_argument("--database-url", help="Run against this database instead of a temporary SQLite file")
+    parser.add_argument("--reset", action="store_true",
+                        help="Allow dropping and recreating all tables of --database-url")
+
+
+@contextmanager
+def database_url(args):
+    """The URL to benchmark against: --database-url or a temporary SQLite file."""
+    if args.database_url:
+        if not args.reset:
+            raise SystemExit(f"Seeding drops every table of {args.database_url}; pass --reset to confirm.")
+        yield args.database_url
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        yield f"sqlite:///{tmp}/bench.db"
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of already sorted values."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, int(len(values) * fraction + 0.5) - 1))]
+
+
+def recreate_tables(engine):
+    # Imported here so scripts can set DATABASE_URL before app.database loads.
+    from app.database import Base
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
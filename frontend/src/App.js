@@ -3,6 +3,19 @@ import axios from "axios";
 import "./App.css";
 
 const API_BASE = "http://localhost:8000";
+const WS_BASE = API_BASE.replace(/^http/, "ws");
+const PAGE_SIZE = 50;
+
+const sortSlots = (list) => [...list].sort((a, b) => a.start.localeCompare(b.start));
+
+const applySlotDelta = (current, { added, removed }) => {
+  const remaining = [...current];
+  removed.forEach((slot) => {
+    const idx = remaining.findIndex((s) => s.start === slot.start && s.end === slot.end);
+    if (idx !== -1) remaining.splice(idx, 1);
+  });
+  return sortSlots([...remaining, ...added]);
+};
 
 function App() {
   const [email, setEmail] = useState("");
@@ -23,9 +36,12 @@ function App() {
 
   const [patients, setPatients] = useState([]);
   const [doctors, setDoctors] = useState([]);
+  const [patientsCursor, setPatientsCursor] = useState(null);
+  const [doctorsCursor, setDoctorsCursor] = useState(null);
   const [date, setDate] = useState(null);
   const [duration, setDuration] = useState(null);
   const [slots, setSlots] = useState([]);
+  const [slotStream, setSlotStream] = useState(0);
 
   const login = async () => {
     const formData = new URLSearchParams();
@@ -41,19 +57,30 @@ function App() {
     }
   };
 
-  const fetchAvailableSlots = async () => {
-    if (!appointment.doctor_id || !date || !duration) {
-      alert("Select doctor, date and duration first");
-      return;
+  // The server sends the day's slots once, then pushes changes as they happen.
+  useEffect(() => {
+    if (!token || !appointment.doctor_id || !date || !duration) {
+      setSlots([]);
+      return undefined;
     }
-
-    const res = await axios.get(`${API_BASE}/doctors/${appointment.doctor_id}/available-slots`, {
-      params: { date, duration_minutes: duration },
-      headers: { Authorization: `Bearer ${token}` },
-    });
-
-    setSlots(res.data);
-  };
+    const params = new URLSearchParams({ date, duration_minutes: duration, token });
+    const socket = new WebSocket(`${WS_BASE}/ws/doctors/${appointment.doctor_id}/slots?${params}`);
+    socket.onmessage = (event) => {
+      const message = JSON.parse(event.data);
+      if (message.type === "snapshot") {
+        setSlots(sortSlots(message.slots));
+      } else if (message.type === "delta") {
+        setSlots((current) => applySlotDelta(current, message));
+      }
+    };
+    socket.onclose = (event) => {
+      // 1013: we fell behind and were dropped; start over with a fresh snapshot.
+      if (event.code === 1013) {
+        setTimeout(() => setSlotStream((n) => n + 1), 1000);
+      }
+    };
+    return () => socket.close();
+  }, [token, appointment.doctor_id, date, duration, slotStream]);
 
 
   const register = async () => {
@@ -99,21 +126,47 @@ function App() {
     }
   };
 
+  const fetchPage = async (resource, cursor) => {
+    const res = await axios.get(`${API_BASE}/${resource}`, {
+      params: cursor ? { limit: PAGE_SIZE, cursor } : { limit: PAGE_SIZE },
+      headers: { Authorization: `Bearer ${token}` },
+    });
+    return { items: res.data, next: res.headers["x-next-cursor"] || null };
+  };
+
   const fetchDoctorsAndPatients = async () => {
     try {
-      const patientRes = await axios.get(`${API_BASE}/patients`, {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-      const doctorRes = await axios.get(`${API_BASE}/doctors`, {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-      setPatients(patientRes.data);
-      setDoctors(doctorRes.data);
+      const patientPage = await fetchPage("patients", null);
+      const doctorPage = await fetchPage("doctors", null);
+      setPatients(patientPage.items);
+      setPatientsCursor(patientPage.next);
+      setDoctors(doctorPage.items);
+      setDoctorsCursor(doctorPage.next);
     } catch (err) {
       alert("Failed to load users");
     }
   };
 
+  const loadMorePatients = async () => {
+    try {
+      const page = await fetchPage("patients", patientsCursor);
+      setPatients([...patients, ...page.items]);
+      setPatientsCursor(page.next);
+    } catch (err) {
+      alert("Failed to load patients");
+    }
+  };
+
+  const loadMoreDoctors = async () => {
+    try {
+      const page = await fetchPage("doctors", doctorsCursor);
+      setDoctors([...doctors, ...page.items]);
+      setDoctorsCursor(page.next);
+    } catch (err) {
+      alert("Failed to load doctors");
+    }
+  };
+
   useEffect(() => {
     if (token && view === "admin") {
       fetchDoctorsAndPatients();
@@ -170,6 +223,7 @@ function App() {
               <option key={p.id} value={p.id}>{p.user.email} - {p.first_name} {p.last_name}</option>
             ))}
           </select>
+          {patientsCursor && <button onClick={loadMorePatients}>Load more patients</button>}
 
           <select value={appointment.doctor_id} onChange={(e) => setAppointment({ ...appointment, doctor_id: e.target.value })}>
             <option value="">Select Doctor</option>
@@ -177,10 +231,10 @@ function App() {
               <option key={d.id} value={d.id}>{d.user.email} - {d.first_name} {d.last_name}</option>
             ))}
           </select>
+          {doctorsCursor && <button onClick={loadMoreDoctors}>Load more doctors</button>}
           <label>Appointment Date</label>
           <input type="date" value={date} onChange={(e) => setDate(e.target.value)} />
           <input type="number" placeholder="Appointment Duration (mins)" value={duration} onChange={(e) => setDuration(Number(e.target.value))} />
-          <button onClick={fetchAvailableSlots}>Get Available Slots</button>
 
           {slots.length > 0 && (
             <div className="slot-list">
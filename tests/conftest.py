@@ -0,0 +1,66 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app import directory, slot_store
+from app.database import Base
+from app.models import User, Role, Doctor, Patient, DoctorAvailability
+
+NINE = datetime(2025, 6, 18, 9, 0)
+DAY = NINE.date()
+
+
+@pytest.fixture(autouse=True)
+def empty_slot_store():
+    # Test modules reuse doctor ids and dates across separate databases.
+    slot_store.store.clear()
+    directory.doctors.clear()
+    yield
+    slot_store.store.clear()
+    directory.doctors.clear()
+
+
+def sqlite_engine(path):
+    """Engine on a new SQLite file with the schema created."""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = sqlite_engine(tmp_path / "test.db")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def module_engine(tmp_path_factory):
+    # For modules that seed one large database and only read from it.
+    engine = sqlite_engine(tmp_path_factory.mktemp("db") / "test.db")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def Session(engine):
+    """Session factory on a clinic of one doctor, free 9-11 on DAY and the day after, and one patient."""
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = Session()
+    db.add_all([
+        User(id=1, email="doc@example.com", hashed_password="x", role=Role.doctor),
+        Doctor(id=1, user_id=1, first_name="Doc", last_name="Tor", specialization="GP"),
+        User(id=2, email="pat@example.com", hashed_password="x", role=Role.patient),
+        Patient(id=1, user_id=2, first_name="Pat", last_name="Ient"),
+        DoctorAvailability(doctor_id=1, start_time=NINE, end_time=NINE + timedelta(hours=2)),
+        DoctorAvailability(doctor_id=1, start_time=NINE + timedelta(days=1), end_time=NINE + timedelta(days=1, hours=2)),
+    ])
+    db.commit()
+    db.close()
+    return Session
+
+
+def count_queries(db):
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
@@ -0,0 +1,48 @@
+from datetime import timedelta
+from sqlalchemy import event, func, select
+from app import crud, schemas
+from app.models import Appointment
+from app.slot_store import store
+from tests.conftest import NINE, DAY
+
+
+def items(*offsets):
+    return [
+        schemas.AppointmentCreate(
+            patient_id=1, doctor_id=1, start_time=NINE + offset, end_time=NINE + offset + timedelta(minutes=30)
+        )
+        for offset in offsets
+    ]
+
+
+def test_batch_is_checked_with_set_based_queries(Session):
+    db = Session()
+    crud.generate_open_slots(db, 1, DAY, 30)
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    result = crud.create_appointments_batch(db, items(timedelta(0), timedelta(days=1)))
+
+    assert result.created == 2
+    # Checks, guarded INSERT and the version bump.
+    assert len(statements) == 3
+    assert store.peek(1, DAY) is None
+    assert crud.generate_open_slots(db, 1, DAY, 30)[0]["start"] == "09:30"
+    db.close()
+
+
+def test_rows_booked_concurrently_are_skipped_by_the_insert_guard(Session, monkeypatch):
+    db = Session()
+    crud.create_appointment(db, items(timedelta(0))[0])
+    # As if the other booking committed between the checks and the INSERT.
+    monkeypatch.setattr(crud, "_check_appointment_batch", lambda db, items: {})
+
+    batch = items(timedelta(0), timedelta(days=1))
+    result = crud.create_appointments_batch(db, batch)
+    assert [r.error for r in result.results] == ["Doctor not available at that time.", crud.BATCH_REJECTED]
+    assert db.scalar(select(func.count(Appointment.id))) == 1
+
+    result = crud.create_appointments_batch(db, batch, schemas.BatchMode.best_effort)
+    assert result.created == 1 and result.results[1].id is not None
+    assert db.scalar(select(func.count(Appointment.id))) == 2
+    db.close()
@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta, date
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import async_crud, crud, schemas, slot_store
+from app.database import Base, async_url
+from app.models import User, Role, Doctor, Patient, Appointment, DoctorAvailability
+
+pytest.importorskip("aiosqlite")
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+DAY = date(2025, 6, 18)
+START = datetime(2025, 6, 18, 9, 0)
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all([
+        User(id=1, email="doc@example.com", hashed_password="x", role=Role.doctor),
+        Doctor(id=1, user_id=1, first_name="Doc", last_name="Tor", specialization="GP"),
+        User(id=2, email="pat@example.com", hashed_password="x", role=Role.patient),
+        Patient(id=1, user_id=2, first_name="Pat", last_name="Ient"),
+        DoctorAvailability(doctor_id=1, start_time=START, end_time=START + timedelta(hours=4)),
+        Appointment(doctor_id=1, patient_id=1, start_time=START + timedelta(minutes=40),
+                    end_time=START + timedelta(minutes=70)),
+    ])
+    db.commit()
+    db.close()
+    engine.dispose()
+    return url
+
+
+def run(url, fn):
+    async def main():
+        engine = create_async_engine(async_url(url))
+        try:
+            async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+                return await fn(db)
+        finally:
+            await engine.dispose()
+    return asyncio.run(main())
+
+
+def test_async_slots_match_sync(database_url):
+    engine = create_engine(database_url)
+    with sessionmaker(bind=engine)() as db:
+        expected = crud.generate_open_slots(db, 1, DAY, 30)
+        expected_search = list(crud.search_open_slots(db, DAY, DAY, 30))
+    engine.dispose()
+    slot_store.store.clear()
+
+    assert run(database_url, lambda db: async_crud.generate_open_slots(db, 1, DAY, 30)) == expected
+
+    async def search(db):
+        return list(await async_crud.search_open_slots(db, DAY, DAY, 30))
+    assert run(database_url, search) == expected_search
+
+
+def test_async_booking_rejects_overlap(database_url):
+    def request(minutes):
+        start = START + timedelta(minutes=minutes)
+        return schemas.AppointmentCreate(patient_id=1, doctor_id=1, start_time=start, end_time=start + timedelta(minutes=30))
+
+    async def book(db):
+        taken = await async_crud.create_appointment(db, request(50))
+        free = await async_crud.create_appointment(db, request(120))
+        available = await async_crud.is_doctor_available(db, 1, request(120).start_time, request(120).end_time)
+        return taken, free, available
+
+    taken, free, available = run(database_url, book)
+    assert taken is None
+    assert free is not None and free.start_time == START + timedelta(minutes=120)
+    assert not available
+
+
+def test_async_booking_rejects_inverted_times(database_url):
+    start = START + timedelta(minutes=150)
+    inverted = schemas.AppointmentCreate(patient_id=1, doctor_id=1, start_time=start,
+                                         end_time=start - timedelta(minutes=30))
+    with pytest.raises(ValueError):
+        run(database_url, lambda db: async_crud.create_appointment(db, inverted))
@@ -0,0 +1,89 @@
+import random
+import pytest
+from datetime import datetime, timedelta
+from app import crud, schemas, slots
+from app.models import DoctorAvailability
+from app.slot_store import store
+from tests.conftest import NINE, DAY
+
+
+def blocks(db, doctor_id=1):
+    return [(a.start_time, a.end_time) for a in
+            db.query(DoctorAvailability).filter_by(doctor_id=doctor_id).order_by(DoctorAvailability.start_time)]
+
+
+def add(db, start, end, doctor_id=1):
+    return crud.create_availability(db, doctor_id, schemas.AvailabilityCreate(start_time=start, end_time=end))
+
+
+def covered_minutes(intervals, day):
+    windows = [slots.day_window(start, end, day) for start, end in intervals]
+    return {(start, end) for start, end in slots.merge_intervals(w for w in windows if w[0] < w[1])}
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_normalizing_keeps_the_offered_time(seed):
+    rng = random.Random(seed)
+    monday = datetime(2025, 6, 16)
+    intervals = []
+    for _ in range(rng.randint(0, 8)):
+        start = monday + timedelta(days=rng.randrange(4), hours=rng.randrange(6, 18), minutes=rng.choice([0, 30]))
+        intervals.append((start, start + timedelta(minutes=rng.choice([0, 30, 60, 120, 24 * 60 + 60, 48 * 60]))))
+    intervals += rng.sample(intervals, min(len(intervals), 2))
+
+    normalized = slots.normalize_availabilities(intervals)
+
+    assert normalized == slots.normalize_availabilities(normalized)
+    for day in range(6):
+        current = (monday + timedelta(days=day)).date()
+        assert covered_minutes(normalized, current) == covered_minutes(intervals, current)
+    # Plain interval containment, which booking checks use, does not grow either.
+    assert slots.merge_intervals(normalized) == slots.merge_intervals(i for i in intervals if i[1] > i[0])
+
+
+def test_writes_merge_overlapping_and_adjacent_blocks(Session):
+    db = Session()
+    crud.generate_open_slots(db, 1, DAY, 30)
+
+    # The fixture has 9-11; clicking it again changes nothing.
+    assert add(db, NINE, NINE + timedelta(hours=2)).end_time == NINE + timedelta(hours=2)
+    merged = add(db, NINE + timedelta(hours=2), NINE + timedelta(hours=3))
+    assert (merged.start_time, merged.end_time) == (NINE, NINE + timedelta(hours=3))
+    add(db, NINE + timedelta(hours=4), NINE + timedelta(hours=5))
+    add(db, NINE + timedelta(hours=2, minutes=30), NINE + timedelta(hours=4))
+
+    assert blocks(db)[0] == (NINE, NINE + timedelta(hours=5))
+    assert len(blocks(db)) == 2
+    assert store.peek(1, DAY) is None
+    slot_list = crud.generate_open_slots(db, 1, DAY, 30)
+    assert len(slot_list) == len({(slot["start"], slot["end"]) for slot in slot_list}) == (300 - 30) // 5 + 1
+
+
+def test_blocks_with_other_hours_are_kept_apart(Session):
+    db = Session()
+    week = add(db, NINE + timedelta(days=2), NINE + timedelta(days=6, hours=8))
+    evening = add(db, NINE + timedelta(days=3, hours=8), NINE + timedelta(days=3, hours=11))
+    inside = add(db, NINE + timedelta(days=4, hours=1), NINE + timedelta(days=4, hours=2))
+
+    # 9-17 on several days does not cover the evening, but holds the hour on day 4.
+    assert evening.id != week.id and inside.id == week.id
+    assert len(blocks(db)) == 4
+
+
+def test_normalize_command_merges_existing_rows(Session):
+    db = Session()
+    db.add_all([
+        DoctorAvailability(doctor_id=1, start_time=NINE, end_time=NINE + timedelta(hours=2)),
+        DoctorAvailability(doctor_id=1, start_time=NINE + timedelta(hours=1), end_time=NINE + timedelta(hours=3)),
+        DoctorAvailability(doctor_id=1, start_time=NINE, end_time=NINE),
+    ])
+    db.commit()
+    before = crud.generate_open_slots(db, 1, DAY, 30)
+
+    assert list(crud.normalize_availabilities(db, dry_run=True)) == [(1, 5, 2)]
+    assert len(blocks(db)) == 5
+    assert list(crud.normalize_availabilities(db)) == [(1, 5, 2)]
+    assert blocks(db) == [(NINE, NINE + timedelta(hours=3)), (NINE + timedelta(days=1), NINE + timedelta(days=1, hours=2))]
+    after = crud.generate_open_slots(db, 1, DAY, 30)
+    assert set(map(str, before)) == set(map(str, after)) and len(after) < len(before)
+    assert list(crud.normalize_availabilities(db)) == [(1, 2, 2)]
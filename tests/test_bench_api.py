@@ -0,0 +1,25 @@
+from benchmarks.bench_api import compare, summarize
+from benchmarks.common import percentile
+
+
+def result(**scenarios):
+    return {"scenarios": {
+        name: summarize([ms / 1000] * 10, errors, elapsed) for name, (ms, errors, elapsed) in scenarios.items()
+    }}
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([7], 0.9) == 7
+    assert percentile([], 0.5) == 0.0
+
+
+def test_compare_flags_slowdowns_beyond_the_threshold():
+    baseline = result(slots=(10, 0, 1.0), booking=(20, 0, 1.0))
+
+    assert compare(result(slots=(12, 0, 1.1), booking=(20, 0, 1.0)), baseline, 0.25) == []
+    regressions = compare(result(slots=(13, 0, 1.0), booking=(20, 2, 1.5)), baseline, 0.25)
+    assert [line.split(":")[0] for line in regressions] == ["slots", "slots", "booking", "booking"]
+    assert "errors" in regressions[2] and "requests_per_second" in regressions[3]
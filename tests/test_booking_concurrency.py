@@ -0,0 +1,57 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import crud, schemas
+from app.database import Base
+from app.models import User, Role, Doctor, Patient, Appointment, DoctorAvailability
+
+START = datetime(2025, 6, 18, 9, 0)
+
+
+def test_parallel_bookings_of_one_slot_admit_exactly_one(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'booking.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = Session()
+    db.add_all([
+        User(id=1, email="doc@example.com", hashed_password="x", role=Role.doctor),
+        Doctor(id=1, user_id=1, first_name="Doc", last_name="Tor", specialization="GP"),
+    ])
+    for n in range(2, 34):
+        db.add(User(id=n, email=f"patient{n}@example.com", hashed_password="x", role=Role.patient))
+        db.add(Patient(id=n, user_id=n, first_name="Pat", last_name=str(n)))
+    db.add(DoctorAvailability(doctor_id=1, start_time=START, end_time=START + timedelta(hours=2)))
+    db.commit()
+    db.close()
+
+    barrier = threading.Barrier(32)
+
+    def book(patient_id):
+        # Overlapping but not identical requests for the same doctor.
+        offset = timedelta(minutes=patient_id % 3 * 5)
+        request = schemas.AppointmentCreate(
+            patient_id=patient_id, doctor_id=1,
+            start_time=START + offset, end_time=START + offset + timedelta(minutes=30),
+        )
+        session = Session()
+        try:
+            barrier.wait()
+            return crud.create_appointment(session, request) is not None
+        finally:
+            session.close()
+
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        results = list(pool.map(book, range(2, 34)))
+
+    assert results.count(True) == 1
+
+    db = Session()
+    assert db.query(Appointment).count() == 1
+    db.close()
+    engine.dispose()
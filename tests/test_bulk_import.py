@@ -0,0 +1,102 @@
+import pytest
+from datetime import datetime
+from sqlalchemy.orm import sessionmaker
+from app import bulk, crud, schemas
+from app.models import User, Role, Patient, Doctor, DoctorAvailability
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    session.add(User(id=1, email="taken@example.com", hashed_password="x", role=Role.patient))
+    session.add(User(id=2, email="doc@example.com", hashed_password="x", role=Role.doctor))
+    session.add(Doctor(id=1, user_id=2, first_name="Doc", last_name="Tor", specialization="GP"))
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_bulk_create_patients_reports_errors_per_row(db):
+    rows = bulk.parse_rows(
+        b"first_name,last_name,email,password,phone,insurance\n"
+        b"Ann,Lee,ann@example.com,pw1,,NHIF\n"
+        b",NoFirst,nofirst@example.com,pw2,,\n"
+        b"Bob,Ray,taken@example.com,pw3,,\n"
+        b"Cy,Ray,cy@example.com,pw4,555,\n"
+        b"Cy,Twice,cy@example.com,pw5,,\n"
+        b"Di,Kim,di@example.com,pw6,,\n",
+        "text/csv",
+    )
+
+    result = crud.bulk_create_patients(db, rows, chunk_size=2)
+
+    assert (result.created, result.failed) == (3, 3)
+    errors = {r.row: r.error for r in result.results if r.error}
+    assert set(errors) == {1, 2, 4}
+    assert "Email already registered" == errors[2] == errors[4]
+
+    created = {r.row: r.id for r in result.results if r.error is None}
+    patients = {p.id: p for p in db.query(Patient).all()}
+    assert patients[created[0]].user.email == "ann@example.com"
+    assert patients[created[0]].phone is None
+    assert patients[created[3]].phone == "555"
+    assert patients[created[5]].user.role == Role.patient
+
+
+def test_bulk_create_availabilities_expands_weekly_blocks(db):
+    result = crud.bulk_create_availabilities(db, [
+        {"doctor_id": 1, "start_time": "2025-06-02T09:00:00", "end_time": "2025-06-02T12:00:00",
+         "repeat_weekly_until": "2025-06-23"},
+        {"doctor_id": 99, "start_time": "2025-06-02T09:00:00", "end_time": "2025-06-02T12:00:00"},
+        {"doctor_id": 1, "start_time": "2025-06-03T12:00:00", "end_time": "2025-06-03T09:00:00"},
+    ])
+
+    assert (result.created, result.failed) == (1, 2)
+    starts = sorted(a.start_time for a in db.query(DoctorAvailability).all())
+    assert starts == [datetime(2025, 6, day, 9) for day in (2, 9, 16, 23)]
+
+
+def test_bulk_availabilities_limit_the_weekly_repeat(db):
+    result = crud.bulk_create_availabilities(db, [
+        {"doctor_id": 1, "start_time": "2025-06-02T09:00:00", "end_time": "2025-06-02T12:00:00",
+         "repeat_weekly_until": "9999-12-31"},
+        {"doctor_id": 1, "start_time": "2025-06-02T09:00:00", "end_time": "2025-06-02T12:00:00",
+         "repeat_weekly_until": "2025-06-01"},
+        {"doctor_id": 1, "start_time": "2025-06-02T09:00:00", "end_time": "2025-06-02T12:00:00",
+         "repeat_weekly_until": "2026-06-03"},
+    ])
+
+    assert (result.created, result.failed) == (1, 2)
+    assert [r.error.split(":")[0] for r in result.results[:2]] == ["repeat_weekly_until", "repeat_weekly_until"]
+    assert db.query(DoctorAvailability).count() == 53
+
+
+def test_bulk_availabilities_are_merged_with_stored_blocks(db):
+    crud.create_availability(db, 1, schemas.AvailabilityCreate(
+        start_time=datetime(2025, 6, 2, 13), end_time=datetime(2025, 6, 2, 15)
+    ))
+    result = crud.bulk_create_availabilities(db, [
+        {"doctor_id": 1, "start_time": "2025-06-02T09:00:00", "end_time": "2025-06-02T12:00:00",
+         "repeat_weekly_until": "2025-06-09"},
+        {"doctor_id": 1, "start_time": "2025-06-02T11:00:00", "end_time": "2025-06-02T13:00:00"},
+        {"doctor_id": 1, "start_time": "2025-06-09T09:30:00", "end_time": "2025-06-09T10:00:00"},
+        {"doctor_id": 1, "start_time": "2025-06-04T09:00:00", "end_time": "2025-06-04T10:00:00"},
+    ], chunk_size=2)
+
+    assert result.failed == 0
+    blocks = {(a.start_time, a.end_time): a.id for a in db.query(DoctorAvailability).all()}
+    assert sorted(blocks) == [
+        (datetime(2025, 6, 2, 9), datetime(2025, 6, 2, 15)),
+        (datetime(2025, 6, 4, 9), datetime(2025, 6, 4, 10)),
+        (datetime(2025, 6, 9, 9), datetime(2025, 6, 9, 12)),
+    ]
+    monday = blocks[datetime(2025, 6, 2, 9), datetime(2025, 6, 2, 15)]
+    assert [r.id for r in result.results] == [
+        monday, monday, blocks[datetime(2025, 6, 9, 9), datetime(2025, 6, 9, 12)],
+        blocks[datetime(2025, 6, 4, 9), datetime(2025, 6, 4, 10)],
+    ]
+
+
+def test_parse_rows_rejects_non_array_json():
+    with pytest.raises(ValueError):
+        bulk.parse_rows(b'{"email": "a@example.com"}', "application/json")
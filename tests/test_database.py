@@ -0,0 +1,37 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import database
+from app.config import Settings
+
+
+def test_engine_options_size_the_postgres_pool():
+    config = Settings(db_pool_size=20, db_max_overflow=0, db_pool_timeout=3, db_statement_timeout_ms=1500)
+    options = database.engine_options("postgresql://u:p@db/app", config)
+
+    assert options["pool_size"] == 20
+    assert options["max_overflow"] == 0
+    assert options["pool_timeout"] == 3
+    assert options["pool_pre_ping"] is True
+    assert options["connect_args"] == {"options": "-c statement_timeout=1500"}
+
+    async_options = database.engine_options("postgresql+asyncpg://u:p@db/app", config)
+    assert async_options["connect_args"] == {"server_settings": {"statement_timeout": "1500"}}
+
+
+def test_engine_options_leave_sqlite_pool_alone():
+    options = database.engine_options("sqlite:///:memory:", Settings(db_statement_timeout_ms=1500))
+    assert "pool_size" not in options and "connect_args" not in options
+    create_engine("sqlite:///:memory:", **options).dispose()
+
+
+def test_read_sessions_go_to_the_replica_when_configured(tmp_path, monkeypatch):
+    primary = object()
+    assert next(database.get_read_db(primary)) is primary
+
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    monkeypatch.setattr(database, "ReadSessionLocal", sessionmaker(bind=replica))
+    reads = database.get_read_db(primary)
+    session = next(reads)
+    assert session is not primary and session.get_bind() is replica
+    reads.close()
+    replica.dispose()
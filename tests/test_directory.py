@@ -0,0 +1,66 @@
+from sqlalchemy import event, insert
+from app import crud, directory, schemas
+from app.models import Doctor, Role, User
+
+
+def add_doctors(db, *doctors):
+    first_id = 100 + db.query(User).count()
+    db.execute(insert(User), [
+        {"id": first_id + n, "email": f"d{first_id + n}@example.com", "hashed_password": "x", "role": Role.doctor}
+        for n in range(len(doctors))
+    ])
+    db.execute(insert(Doctor), [
+        {"id": first_id + n, "user_id": first_id + n, "first_name": first, "last_name": last, "specialization": spec}
+        for n, (first, last, spec) in enumerate(doctors)
+    ])
+    db.commit()
+
+
+def names(doctors):
+    return [f"{d['first_name']} {d['last_name']}" for d in doctors]
+
+
+def test_search_ranks_name_matches_before_specialization(Session):
+    db = Session()
+    add_doctors(db, ("Carla", "Smith", "Dermatology"), ("Ann", "Carter", "GP"),
+                ("Ben", "Jones", "Cardiology"), ("Car", "Lee", "GP"))
+
+    doctors, next_cursor = crud.search_doctor_records(db, "car")
+    # Whole-word name match, then name prefixes by last name, then specialization.
+    assert names(doctors) == ["Car Lee", "Ann Carter", "Carla Smith", "Ben Jones"]
+    assert next_cursor is None
+
+    assert names(crud.search_doctor_records(db, "CAR sm")[0]) == ["Carla Smith"]
+    assert names(crud.search_doctor_records(db, "car", specialization="GP")[0]) == ["Car Lee", "Ann Carter"]
+    assert crud.search_doctor_records(db, "zz")[0] == []
+    assert crud.search_doctor_records(db, "  ") == ([], None)
+
+
+def test_search_pages_by_offset(Session):
+    db = Session()
+    add_doctors(db, *[("Gene", f"Smith{n}", "GP") for n in range(5)])
+
+    seen, cursor = [], 0
+    while cursor is not None:
+        page, cursor = crud.search_doctor_records(db, "smith", offset=cursor, limit=2)
+        seen += [d["last_name"] for d in page]
+    assert seen == [f"Smith{n}" for n in range(5)]
+
+
+def test_directory_follows_new_doctors(Session):
+    db = Session()
+    assert names(crud.search_doctor_records(db, "doc")[0]) == ["Doc Tor"]
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    # create_doctor indexes its row, so the next search only checks the table.
+    crud.create_doctor(db, schemas.DoctorCreate(
+        email="new@example.com", password="secret", first_name="Newton", last_name="Doe", specialization="GP"))
+    statements.clear()
+    assert names(crud.search_doctor_records(db, "new")[0]) == ["Newton Doe"]
+    assert len(statements) == 1
+
+    # Rows written elsewhere (another process, a bulk import) are loaded on the next search.
+    add_doctors(db, ("Nina", "Newman", "GP"))
+    assert names(crud.search_doctor_records(db, "new")[0]) == ["Newton Doe", "Nina Newman"]
+    assert directory.doctors.fingerprint == (3, db.query(Doctor.id).order_by(Doctor.id.desc()).first()[0])
@@ -7,6 +7,7 @@ from app.database import Base, get_db, SessionLocal
 from app.security import get_password_hash, create_access_token
 from app.models import User, Role
 from datetime import datetime, timedelta, date
+import json
 
 # Setup test database
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -63,6 +64,23 @@ def test_register():
     assert response.status_code == 200
     assert response.json()["email"] == "user1@example.com"
 
+def test_register_is_turned_away_while_the_hash_queue_is_full(monkeypatch):
+    from app import security
+    from app.hashing import HashQueueFull
+
+    class FullHasher:
+        def hash(self, password):
+            raise HashQueueFull()
+
+    monkeypatch.setattr(security, "hasher", FullHasher())
+    response = client.post("/register", json={
+        "email": "busy@example.com",
+        "password": "password123",
+        "role": "patient"
+    })
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
 def test_login():
     response = client.post("/login", data={"username": "user1@example.com", "password": "password123"})
     assert response.status_code == 200
@@ -144,6 +162,18 @@ def test_get_available_slots():
     assert slot_response.status_code == 200
     assert isinstance(slot_response.json(), list)
 
+    # A second click on the same block is merged instead of stored twice.
+    again = client.post("/availabilities", json={
+        "start_time": start.isoformat(),
+        "end_time": end.isoformat()
+    }, headers={"Authorization": f"Bearer {doctor_token}"})
+    assert again.json()["id"] == availability_response.json()["id"]
+    inverted = client.post("/availabilities", json={
+        "start_time": end.isoformat(),
+        "end_time": start.isoformat()
+    }, headers={"Authorization": f"Bearer {doctor_token}"})
+    assert inverted.status_code == 400
+
 
 def test_create_appointment():
     token = get_admin_token()
@@ -195,4 +225,438 @@ def test_create_appointment():
     assert appointment_response.status_code == 200
     data = appointment_response.json()
     assert data["doctor_id"] == doctor_id
-    assert data["patient_id"] == patient_id
\ No newline at end of file
+    assert data["patient_id"] == patient_id
+
+    inverted = client.post("/appointments", json={
+        "doctor_id": doctor_id,
+        "patient_id": patient_id,
+        "start_time": (start + timedelta(minutes=60)).isoformat(),
+        "end_time": (start + timedelta(minutes=30)).isoformat()
+    }, headers={"Authorization": f"Bearer {token}"})
+    assert inverted.status_code == 400
+    assert inverted.json()["detail"] == "end_time must be after start_time"
+
+def test_search_available_slots():
+    admin_token = get_admin_token()
+
+    doctor_response = client.post("/doctors", json={
+        "first_name": "Sam",
+        "last_name": "Search",
+        "specialization": "Neurology",
+        "email": "neuro@example.com",
+        "password": "docpass"
+    }, headers={"Authorization": f"Bearer {admin_token}"})
+    doctor_id = doctor_response.json()["id"]
+    doctor_token = create_access_token({"sub": "neuro@example.com"})
+
+    start = datetime.now().replace(hour=13, minute=0, second=0, microsecond=0) + timedelta(days=2)
+    client.post("/availabilities", json={
+        "start_time": start.isoformat(),
+        "end_time": (start + timedelta(hours=2)).isoformat()
+    }, headers={"Authorization": f"Bearer {doctor_token}"})
+
+    response = client.get("/available-slots/search", params={
+        "start_date": date.today().isoformat(),
+        "end_date": (date.today() + timedelta(days=6)).isoformat(),
+        "specialization": "Neurology",
+        "duration_minutes": 30
+    }, headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [(r["doctor_id"], r["date"]) for r in results] == [(doctor_id, start.date().isoformat())]
+
+    single_day = client.get(f"/doctors/{doctor_id}/available-slots", params={
+        "date": start.date().isoformat(),
+        "duration_minutes": 30
+    }, headers={"Authorization": f"Bearer {admin_token}"})
+    assert results[0]["slots"] == single_day.json()
+
+    response = client.get("/available-slots/next", params={
+        "specialization": "Neurology", "duration_minutes": 45, "count": 2
+    }, headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    assert response.json() == [{
+        "doctor_id": doctor_id, "start": start.isoformat(), "end": (start + timedelta(minutes=45)).isoformat(),
+        "free_until": (start + timedelta(hours=2)).isoformat(),
+    }]
+    assert client.get("/available-slots/next", headers={"Authorization": f"Bearer {admin_token}"}).status_code == 400
+    aware = client.get("/available-slots/next", params={
+        "doctor_id": doctor_id, "start": "2030-01-01T08:00:00Z"
+    }, headers={"Authorization": f"Bearer {admin_token}"})
+    assert aware.status_code == 400
+    assert aware.json()["detail"] == "start must be a local time without a UTC offset"
+
+
+def test_search_available_slots_rejects_inverted_range():
+    token = get_admin_token()
+    response = client.get("/available-slots/search", params={
+        "start_date": "2025-06-18",
+        "end_date": "2025-06-17"
+    }, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 400
+
+
+def test_list_patients_pages_with_cursor():
+    token = get_admin_token()
+    for n in range(3):
+        client.post("/patients", json={
+            "first_name": f"Page{n}",
+            "last_name": "Walker",
+            "email": f"page{n}@example.com",
+            "password": "userpass",
+            "insurance": "PAGED"
+        }, headers={"Authorization": f"Bearer {token}"})
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2, "insurance": "PAGED"}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/patients", params=params, headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+        seen += [p["user"]["email"] for p in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert seen == ["page0@example.com", "page1@example.com", "page2@example.com"]
+
+
+def test_list_doctors_filters_by_name_prefix_and_specialization():
+    token = get_admin_token()
+    response = client.get("/doctors", params={"name": "smi", "specialization": "Cardiology"},
+                          headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert [d["user"]["email"] for d in response.json()] == ["jane@example.com"]
+
+
+
+def test_search_doctors():
+    token = get_admin_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    response = client.get("/doctors/search", params={"q": "smi"}, headers=headers)
+    assert response.status_code == 200
+    assert "jane@example.com" in [d["user"]["email"] for d in response.json()]
+
+    response = client.post("/doctors", json={
+        "first_name": "Quentin", "last_name": "Searchable", "specialization": "Neurology",
+        "email": "quentin@example.com", "password": "docpass",
+    }, headers=headers)
+    assert response.status_code == 200
+    response = client.get("/doctors/search", params={"q": "searcha", "limit": 1}, headers=headers)
+    assert [d["user"]["email"] for d in response.json()] == ["quentin@example.com"]
+    assert "X-Next-Cursor" not in response.headers
+
+    assert client.get("/doctors/search", params={"q": ""}, headers=headers).status_code == 422
+    assert client.get("/doctors/search", params={"q": "smi"}).status_code == 401
+
+def test_export_patients_csv():
+    token = get_admin_token()
+    response = client.get("/export/patients", params={"format": "csv"}, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = response.text.splitlines()
+    assert lines[0] == "id,email,first_name,last_name,phone,insurance"
+    assert any(",john@example.com,John,Doe," in line for line in lines[1:])
+
+
+def test_bulk_import_doctors_json():
+    token = get_admin_token()
+    response = client.post("/bulk/doctors", json=[
+        {"first_name": "Bulk", "last_name": "One", "specialization": "Oncology",
+         "email": "bulk1@example.com", "password": "docpass"},
+        {"first_name": "Bulk", "last_name": "Two", "specialization": "Oncology",
+         "email": "not-an-email", "password": "docpass"},
+    ], headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["created"], body["failed"]) == (1, 1)
+    assert body["results"][1]["error"].startswith("email")
+
+def test_capacity_report():
+    token = get_admin_token()
+    response = client.get("/admin/reports/capacity", params={
+        "start_date": date.today().isoformat(),
+        "end_date": (date.today() + timedelta(days=6)).isoformat(),
+        "specialization": "Neurology", "daily": True,
+    }, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    doctors = {d["doctor_id"]: d for d in response.json()["doctors"]}
+    # Sam Search has one free two-hour block in the week.
+    [sam] = [d for d in doctors.values() if d["available_minutes"]]
+    assert (sam["free_minutes"], sam["slots"], sam["fragmentation"]) == (120, 19, 0.0)
+    assert [day["slots"] for day in sam["days"]] == [19]
+
+def test_db_pool_stats():
+    token = get_admin_token()
+    response = client.get("/admin/db-pool", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    primary = response.json()[0]
+    assert primary["engine"] == "primary"
+    assert primary["checkouts"] >= 0
+
+def test_check_slot_store():
+    token = get_admin_token()
+    response = client.post("/admin/slot-store/check", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json()["stale"] == []
+
+def test_available_slots_etag():
+    token = get_admin_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    doctor_id = client.post("/doctors", json={
+        "first_name": "Etag", "last_name": "Doc", "specialization": "GP",
+        "email": "etag@example.com", "password": "docpass"
+    }, headers=headers).json()["id"]
+    patient_id = client.post("/patients", json={
+        "first_name": "Etag", "last_name": "Patient", "email": "etag-patient@example.com",
+        "password": "pw", "phone": "1", "insurance": "NHIF"
+    }, headers=headers).json()["id"]
+    start = datetime(2031, 3, 4, 9, 0)
+    client.post("/availabilities", json={
+        "start_time": start.isoformat(), "end_time": (start + timedelta(hours=2)).isoformat()
+    }, headers={"Authorization": f"Bearer {create_access_token({'sub': 'etag@example.com'})}"})
+    params = {"date": "2031-03-04", "duration_minutes": 30}
+
+    first = client.get(f"/doctors/{doctor_id}/available-slots", params=params, headers=headers)
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+    assert first.headers["Vary"] == "Authorization"
+
+    cached = client.get(f"/doctors/{doctor_id}/available-slots", params=params,
+                        headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+    assert cached.content == b""
+
+    other_duration = client.get(f"/doctors/{doctor_id}/available-slots", params={**params, "duration_minutes": 60},
+                                headers={**headers, "If-None-Match": etag})
+    assert other_duration.status_code == 200
+
+    client.post("/appointments", json={
+        "doctor_id": doctor_id, "patient_id": patient_id,
+        "start_time": start.isoformat(), "end_time": (start + timedelta(minutes=30)).isoformat()
+    }, headers=headers)
+    changed = client.get(f"/doctors/{doctor_id}/available-slots", params=params,
+                         headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()[0]["start"] == "09:30"
+
+def test_slot_updates_websocket():
+    token = get_admin_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    doctor_id = client.post("/doctors", json={
+        "first_name": "Push", "last_name": "Doc", "specialization": "GP",
+        "email": "push@example.com", "password": "docpass"
+    }, headers=headers).json()["id"]
+    patient_id = client.post("/patients", json={
+        "first_name": "Push", "last_name": "Patient", "email": "push-patient@example.com",
+        "password": "pw", "phone": "1", "insurance": "NHIF"
+    }, headers=headers).json()["id"]
+    start = datetime(2031, 5, 6, 9, 0)
+    client.post("/availabilities", json={
+        "start_time": start.isoformat(), "end_time": (start + timedelta(hours=1)).isoformat()
+    }, headers={"Authorization": f"Bearer {create_access_token({'sub': 'push@example.com'})}"})
+
+    url = f"/ws/doctors/{doctor_id}/slots?date=2031-05-06&duration_minutes=30&token={token}"
+    with client.websocket_connect(url) as websocket:
+        snapshot = websocket.receive_json()
+        assert snapshot["type"] == "snapshot"
+        assert {"start": "09:00", "end": "09:30"} in snapshot["slots"]
+
+        client.post("/appointments", json={
+            "doctor_id": doctor_id, "patient_id": patient_id,
+            "start_time": start.isoformat(), "end_time": (start + timedelta(minutes=30)).isoformat()
+        }, headers=headers)
+        delta = websocket.receive_json()
+        assert delta["type"] == "delta"
+        assert delta["version"] > snapshot["version"]
+        assert {"start": "09:00", "end": "09:30"} in delta["removed"]
+        assert delta["added"] == []
+
+def test_slot_updates_websocket_rejects_bad_tokens():
+    from starlette.websockets import WebSocketDisconnect
+    with pytest.raises(WebSocketDisconnect) as exc:
+        with client.websocket_connect("/ws/doctors/1/slots?date=2031-05-06&token=nope") as websocket:
+            websocket.receive_json()
+    assert exc.value.code == 1008
+
+def test_availability_rules():
+    token = get_admin_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    doctor_id = client.post("/doctors", json={
+        "first_name": "Rule", "last_name": "Doc", "specialization": "GP",
+        "email": "rules@example.com", "password": "docpass"
+    }, headers=headers).json()["id"]
+    doctor_headers = {"Authorization": f"Bearer {create_access_token({'sub': 'rules@example.com'})}"}
+
+    rejected = client.post("/availability-rules", json={
+        "weekdays": [0], "start_date": "2031-06-02", "start_time": "10:00", "end_time": "09:00"
+    }, headers=doctor_headers)
+    assert rejected.status_code == 400
+
+    response = client.post("/availability-rules", json={
+        "weekdays": [0, 2], "start_date": "2031-06-02", "end_date": "2031-06-30",
+        "start_time": "09:00", "end_time": "10:00", "exceptions": ["2031-06-04"]
+    }, headers=doctor_headers)
+    assert response.status_code == 200
+    rule = response.json()
+    assert rule["weekdays"] == [0, 2]
+    assert rule["exceptions"] == [{"date": "2031-06-04"}]
+
+    def slots(day):
+        return client.get(f"/doctors/{doctor_id}/available-slots", params={"date": day, "duration_minutes": 30},
+                          headers=headers).json()
+
+    assert slots("2031-06-02")[0] == {"start": "09:00", "end": "09:30"}
+    assert slots("2031-06-03") == []
+    assert slots("2031-06-04") == []
+
+    response = client.post(f"/availability-rules/{rule['id']}/exceptions", json={"dates": ["2031-06-09"]},
+                           headers=doctor_headers)
+    assert response.status_code == 200
+    assert slots("2031-06-09") == []
+    assert slots("2031-06-16")
+
+def test_appointment_lifecycle():
+    token = get_admin_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    doctor_id = client.post("/doctors", json={
+        "first_name": "Life", "last_name": "Cycle", "specialization": "GP",
+        "email": "lifecycle@example.com", "password": "docpass"
+    }, headers=headers).json()["id"]
+    patient_id = client.post("/patients", json={
+        "first_name": "Pat", "last_name": "Cycle", "email": "lifecycle-patient@example.com", "password": "patpass"
+    }, headers=headers).json()["id"]
+    doctor_headers = {"Authorization": f"Bearer {create_access_token({'sub': 'lifecycle@example.com'})}"}
+    patient_headers = {"Authorization": f"Bearer {create_access_token({'sub': 'lifecycle-patient@example.com'})}"}
+
+    start = datetime(2031, 7, 1, 9)
+    client.post("/availabilities", json={
+        "start_time": start.isoformat(), "end_time": (start + timedelta(hours=2)).isoformat()
+    }, headers=doctor_headers)
+
+    def book(minutes):
+        return client.post("/appointments", json={
+            "doctor_id": doctor_id, "patient_id": patient_id,
+            "start_time": (start + timedelta(minutes=minutes)).isoformat(),
+            "end_time": (start + timedelta(minutes=minutes + 30)).isoformat(),
+        }, headers=headers).json()["id"]
+
+    def slots():
+        return client.get(f"/doctors/{doctor_id}/available-slots", params={"date": "2031-07-01"},
+                          headers=headers).json()
+
+    first, second, third = book(0), book(30), book(60)
+    assert {"start": "09:00", "end": "09:30"} not in slots()
+
+    response = client.post(f"/appointments/{first}/cancel", headers=patient_headers)
+    assert response.status_code == 200
+    assert response.json()["status"] == "canceled"
+    assert {"start": "09:00", "end": "09:30"} in slots()
+    assert client.post(f"/appointments/{first}/complete", headers=doctor_headers).status_code == 409
+    assert client.post("/appointments/999999/cancel", headers=headers).status_code == 404
+
+    response = client.post(f"/appointments/{second}/complete", headers=doctor_headers)
+    assert response.json()["status"] == "completed"
+
+    def reschedule(appointment_id, minutes, length=30):
+        return client.post(f"/appointments/{appointment_id}/reschedule", json={
+            "start_time": (start + timedelta(minutes=minutes)).isoformat(),
+            "end_time": (start + timedelta(minutes=minutes + length)).isoformat(),
+        }, headers=doctor_headers)
+
+    fourth = book(90)
+    assert reschedule(third, 75).status_code == 400
+    assert reschedule(third, 150).status_code == 400
+    assert reschedule(second, 0).status_code == 409
+    response = reschedule(third, 15)
+    assert response.status_code == 200
+    assert response.json()["start_time"] == "2031-07-01T09:15:00"
+    assert {"start": "09:15", "end": "09:45"} not in slots()
+    assert {"start": "10:00", "end": "10:30"} in slots()
+
+    listing = client.get(f"/doctors/{doctor_id}/appointments", params={
+        "start_date": "2031-07-01", "end_date": "2031-07-01", "limit": 2
+    }, headers=doctor_headers)
+    assert [a["id"] for a in listing.json()] == [first, third]
+    cursor = listing.headers["X-Next-Cursor"]
+    listing = client.get(f"/doctors/{doctor_id}/appointments", params={"cursor": cursor, "limit": 2},
+                         headers=doctor_headers)
+    assert [a["id"] for a in listing.json()] == [second, fourth]
+    assert "X-Next-Cursor" not in listing.headers
+
+    listing = client.get(f"/patients/{patient_id}/appointments", params={"status": "scheduled"},
+                         headers=patient_headers)
+    assert [a["id"] for a in listing.json()] == [third, fourth]
+    assert client.get(f"/patients/{patient_id}/appointments", params={"cursor": "nope"},
+                      headers=headers).status_code == 400
+    assert client.get(f"/doctors/{doctor_id + 1}/appointments", headers=doctor_headers).status_code == 403
+
+def test_batch_appointments():
+    token = get_admin_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    doctor_id = client.post("/doctors", json={
+        "first_name": "Series", "last_name": "Doc", "specialization": "Physiotherapy",
+        "email": "series@example.com", "password": "docpass"
+    }, headers=headers).json()["id"]
+    patient_id = client.post("/patients", json={
+        "first_name": "Series", "last_name": "Patient", "email": "series-patient@example.com", "password": "patpass"
+    }, headers=headers).json()["id"]
+    doctor_headers = {"Authorization": f"Bearer {create_access_token({'sub': 'series@example.com'})}"}
+    client.post("/availability-rules", json={
+        "weekdays": [1], "start_date": "2031-09-02", "end_date": "2031-11-25",
+        "start_time": "09:00", "end_time": "12:00"
+    }, headers=doctor_headers)
+
+    first = datetime(2031, 9, 2, 9)
+    def series(weeks, minutes=0):
+        return [{
+            "doctor_id": doctor_id, "patient_id": patient_id,
+            "start_time": (first + timedelta(weeks=week, minutes=minutes)).isoformat(),
+            "end_time": (first + timedelta(weeks=week, minutes=minutes + 45)).isoformat(),
+        } for week in weeks]
+
+    response = client.post("/appointments/batch", json={"appointments": series(range(12))}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["created"] == 12
+
+    # Weeks 13 and 14 are past the rule, week 0 is taken and the last item
+    # overlaps the one before it.
+    items = series([0, 13]) + series([1], minutes=60) + series([14], minutes=60) + series([1], minutes=90)
+    response = client.post("/appointments/batch", json={"appointments": items}, headers=headers)
+    results = response.json()["results"]
+    assert response.json()["created"] == 0
+    assert [r["error"] for r in results] == [
+        "Overlaps a scheduled appointment", "Doctor not available at that time.",
+        "Not booked: another appointment in the batch failed", "Doctor not available at that time.",
+        "Overlaps another appointment in the batch",
+    ]
+
+    response = client.post("/appointments/batch", json={"appointments": items, "mode": "best_effort"},
+                           headers=headers)
+    assert response.json()["created"] == 1
+    assert response.json()["results"][2]["id"] is not None
+    slots = client.get(f"/doctors/{doctor_id}/available-slots", params={"date": "2031-09-09"}, headers=headers).json()
+    assert {"start": "10:00", "end": "10:30"} not in slots
+    assert {"start": "11:00", "end": "11:30"} in slots
+
+def test_request_timing_and_metrics(caplog, monkeypatch):
+    headers = {"Authorization": f"Bearer {get_admin_token()}"}
+    response = client.get("/patients", headers=headers)
+    timing = response.headers["Server-Timing"]
+    assert timing.startswith("db;dur=") and "queries" in timing and "total;dur=" in timing
+
+    monkeypatch.setattr("app.main.settings.request_query_warning_threshold", 1)
+    with caplog.at_level("WARNING", logger="app.main"):
+        client.get("/patients", headers=headers)
+        client.get("/doctors/1/available-slots", params={"date": "2040-01-02"}, headers=headers)
+    assert "/patients" not in caplog.text
+    assert "GET /doctors/{doctor_id}/available-slots ran" in caplog.text and "possible N+1" in caplog.text
+
+    body = client.get("/metrics").text
+    assert 'http_requests_total{method="GET",route="/patients",status="200"}' in body
+    assert 'http_request_db_queries_bucket{method="GET",route="/patients",le="+Inf"}' in body
+    assert "slot_store_hits_total" in body
@@ -0,0 +1,46 @@
+import asyncio
+import threading
+from datetime import date
+from app.events import DROPPED, CalendarChange, SlotHub
+
+DAY = date(2025, 6, 18)
+
+
+def test_publish_reaches_matching_subscribers_from_other_threads():
+    async def main():
+        hub = SlotHub(queue_size=4)
+        same_day = hub.subscribe(1, DAY)
+        other_day = hub.subscribe(1, date(2025, 6, 19))
+        other_doctor = hub.subscribe(2, DAY)
+
+        thread = threading.Thread(target=hub.publish, args=(1, DAY, DAY))
+        thread.start()
+        thread.join()
+
+        assert await same_day.get(1) == CalendarChange(1, DAY, DAY)
+        assert await other_day.get(0.05) is None
+        assert await other_doctor.get(0.05) is None
+
+        hub.unsubscribe(same_day)
+        hub.publish(1, DAY, DAY)
+        await asyncio.sleep(0)
+        assert same_day.queue.empty()
+        assert hub.subscriber_count() == 2
+
+    asyncio.run(main())
+
+
+def test_slow_subscribers_are_dropped():
+    async def main():
+        hub = SlotHub(queue_size=2)
+        slow = hub.subscribe(1, DAY)
+        for _ in range(3):
+            hub.publish(1, DAY, DAY)
+        await asyncio.sleep(0)
+
+        assert await slow.get(1) is DROPPED
+        assert slow.drain()
+        hub.unsubscribe(slow)
+        assert hub.dropped == 1
+
+    asyncio.run(main())
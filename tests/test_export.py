@@ -0,0 +1,89 @@
+import csv
+import io
+import json
+import tracemalloc
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+from app import crud, export
+from app.models import User, Patient, Doctor, Appointment, Role, AppointmentStatus
+
+
+@pytest.fixture(scope="module")
+def session_factory(module_engine):
+    with module_engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": n, "email": f"patient{n}@example.com", "hashed_password": "x", "role": Role.patient}
+            for n in range(1, 40001)
+        ])
+        conn.execute(insert(Patient), [
+            {"id": n, "user_id": n, "first_name": f"First{n}", "last_name": f"Last{n}",
+             "phone": "0700000000", "insurance": "NHIF"}
+            for n in range(1, 40001)
+        ])
+        conn.execute(insert(User), [{"id": 50000, "email": "doc@example.com", "hashed_password": "x", "role": Role.doctor}])
+        conn.execute(insert(Doctor), [{"id": 1, "user_id": 50000, "first_name": "Doc", "last_name": "Tor", "specialization": "GP"}])
+        start = datetime(2025, 6, 1, 9)
+        conn.execute(insert(Appointment), [
+            {"doctor_id": 1, "patient_id": n, "start_time": start + timedelta(hours=n),
+             "end_time": start + timedelta(hours=n, minutes=30), "status": AppointmentStatus.scheduled}
+            for n in range(1, 100)
+        ])
+    return sessionmaker(bind=module_engine)
+
+
+def export_peak_memory(db, row_limit):
+    query = crud.patients_export_query().limit(row_limit)
+    columns = [column.key for column in query.selected_columns]
+    tracemalloc.start()
+    try:
+        lines = 0
+        for chunk in export.ndjson_chunks(columns, crud.stream_rows(db, query)):
+            lines += chunk.count(b"\n")
+        return lines, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_export_memory_stays_flat_as_table_grows(session_factory):
+    db = session_factory()
+    try:
+        small_rows, small_peak = export_peak_memory(db, 4000)
+        large_rows, large_peak = export_peak_memory(db, 40000)
+    finally:
+        db.close()
+
+    assert (small_rows, large_rows) == (4000, 40000)
+    # Ten times the rows must not mean noticeably more memory.
+    assert large_peak < small_peak * 1.5 + 256 * 1024, (small_peak, large_peak)
+
+
+def test_appointments_csv_export_filters_by_date(session_factory):
+    db = session_factory()
+    query = crud.appointments_export_query(datetime(2025, 6, 2).date(), datetime(2025, 6, 2).date(), doctor_id=1)
+    columns = [column.key for column in query.selected_columns]
+    try:
+        body = "".join(export.csv_chunks(columns, crud.stream_rows(db, query, chunk_size=7)))
+    finally:
+        db.close()
+
+    rows = list(csv.DictReader(io.StringIO(body)))
+    assert len(rows) == 24
+    assert rows[0]["start_time"] == "2025-06-02T00:00:00"
+    assert rows[0]["status"] == "scheduled"
+
+
+def test_ndjson_export_rows_are_json_objects(session_factory):
+    db = session_factory()
+    query = crud.doctors_export_query()
+    columns = [column.key for column in query.selected_columns]
+    try:
+        body = b"".join(export.ndjson_chunks(columns, crud.stream_rows(db, query)))
+    finally:
+        db.close()
+
+    assert [json.loads(line) for line in body.splitlines()] == [{
+        "id": 1, "email": "doc@example.com", "first_name": "Doc",
+        "last_name": "Tor", "specialization": "GP",
+    }]
@@ -0,0 +1,27 @@
+import pytest
+from app.hashing import HashQueueFull, PasswordHasher
+
+
+def test_hash_and_verify_in_process_pool():
+    hasher = PasswordHasher(workers=1, executor="process")
+    try:
+        hashed = hasher.hash("s3cret")
+        assert hasher.verify("s3cret", hashed)
+        assert not hasher.verify("wrong", hashed)
+    finally:
+        hasher.shutdown()
+
+    assert hasher.timings.count == {"hash": 1, "verify": 2}
+    assert hasher.timings.max_seconds["hash"] > 0
+
+
+def test_saturated_queue_is_reported():
+    hasher = PasswordHasher(workers=1, queue_size=1, queue_timeout=0.01, executor="thread")
+    # Occupy the only queue slot as an in-flight hash would.
+    hasher._slots.acquire()
+    try:
+        with pytest.raises(HashQueueFull):
+            hasher.hash("s3cret")
+    finally:
+        hasher._slots.release()
+        hasher.shutdown()
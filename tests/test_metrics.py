@@ -0,0 +1,32 @@
+from app import metrics
+
+
+def test_request_stats_track_the_slowest_statement():
+    stats = metrics.RequestStats()
+    token = metrics.current_request.set(stats)
+    try:
+        metrics.record_query("SELECT 1", 0.002)
+        metrics.record_query("SELECT 2", 0.005)
+        metrics.record_query("SELECT 1", 0.001)
+        metrics.record_timing("hash", 0.25)
+    finally:
+        metrics.current_request.reset(token)
+    metrics.record_query("SELECT 3", 1.0)
+
+    assert stats.queries == 3
+    assert stats.slowest_statement == "SELECT 2"
+    assert stats.statements.most_common(1) == [("SELECT 1", 2)]
+    timing = stats.server_timing()
+    assert 'db;dur=8.00;desc="3 queries"' in timing and "hash;dur=250.00" in timing
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("test_seconds", "Test.", (0.1, 1.0), ["route"])
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, '/a"b')
+
+    lines = list(histogram.render())
+    assert 'test_seconds_bucket{route="/a\\"b",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{route="/a\\"b",le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{route="/a\\"b",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{route="/a\\"b"} 3' in lines
@@ -0,0 +1,99 @@
+import random
+import pytest
+from datetime import datetime, time, timedelta
+from app import crud
+from app.models import Appointment, AvailabilityRule, Doctor, DoctorAvailability, User, Role
+from tests.conftest import NINE, DAY, count_queries
+
+
+def add_doctor(db, doctor_id, specialization="GP"):
+    db.add_all([
+        User(id=10 + doctor_id, email=f"doc{doctor_id}@example.com", hashed_password="x", role=Role.doctor),
+        Doctor(id=doctor_id, user_id=10 + doctor_id, first_name="Doc", last_name=str(doctor_id),
+               specialization=specialization),
+    ])
+
+
+def reference_slots(db, doctor_id, not_before, slot_minutes, days):
+    starts = []
+    for offset in range(days):
+        day = not_before.date() + timedelta(days=offset)
+        for slot in crud.generate_open_slots(db, doctor_id, day, slot_minutes):
+            start = datetime.combine(day, time.fromisoformat(slot["start"]))
+            if start >= not_before:
+                starts.append(start)
+    return sorted(set(starts))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_finder_agrees_with_generate_open_slots(Session, seed):
+    rng = random.Random(seed)
+    db = Session()
+    first_day = DAY - timedelta(days=2)
+    for _ in range(rng.randint(0, 6)):
+        start = datetime.combine(first_day + timedelta(days=rng.randrange(10)), time(rng.randrange(6, 16)))
+        db.add(DoctorAvailability(doctor_id=1, start_time=start,
+                                  end_time=start + timedelta(minutes=rng.choice([60, 240, 3 * 24 * 60 + 120]))))
+    if rng.random() < 0.5:
+        db.add(AvailabilityRule(doctor_id=1, weekday_mask=rng.randrange(1, 128), start_date=first_day,
+                                end_date=None, start_time=time(13), end_time=time(17)))
+    for _ in range(rng.randint(0, 30)):
+        start = datetime.combine(first_day + timedelta(days=rng.randrange(12)),
+                                 time(rng.randrange(6, 18), rng.choice([0, 10, 25, 45])))
+        db.add(Appointment(doctor_id=1, patient_id=1, start_time=start,
+                           end_time=start + timedelta(minutes=rng.choice([15, 30, 50, 120]))))
+    db.commit()
+    slot_minutes = rng.choice([15, 30, 45, 90])
+    not_before = datetime.combine(first_day + timedelta(days=rng.randrange(3)), time(rng.randrange(24), 7))
+
+    expected = reference_slots(db, 1, not_before, slot_minutes, 14)
+    found = crud.next_available_slots(db, [1], slot_minutes, not_before, count=1000, max_days=14)
+
+    assert [slot["start"] for slot in found[:1]] == expected[:1]
+    assert {slot["start"] for slot in found} <= set(expected)
+    # Every free slot lies in one of the reported gaps.
+    length = timedelta(minutes=slot_minutes)
+    assert all(any(slot["start"] <= start and start + length <= slot["free_until"] for slot in found)
+               for start in expected)
+
+
+def test_finder_stops_at_the_answer(Session):
+    db = Session()
+    # A year of full days, booked solid for the first three weeks.
+    day_start = datetime.combine(DAY, time(8))
+    db.add_all(DoctorAvailability(doctor_id=1, start_time=day_start + timedelta(days=n),
+                                  end_time=day_start + timedelta(days=n, hours=10)) for n in range(2, 365))
+    db.add_all(Appointment(doctor_id=1, patient_id=1, start_time=day_start + timedelta(days=n),
+                           end_time=day_start + timedelta(days=n, hours=10)) for n in range(0, 21))
+    db.commit()
+
+    statements = count_queries(db)
+    found = crud.next_available_slots(db, [1], 45, NINE, count=2, max_days=365)
+
+    assert [(slot["start"], slot["free_until"]) for slot in found] == [
+        (day_start + timedelta(days=21), day_start + timedelta(days=21, hours=10)),
+        (day_start + timedelta(days=22), day_start + timedelta(days=22, hours=10)),
+    ]
+    # Rules, then a few keyset pages of availabilities and appointments,
+    # independent of the 363 days still ahead.
+    assert len(statements) <= 6
+
+
+def test_finder_merges_a_specialization(Session):
+    db = Session()
+    add_doctor(db, 2)
+    add_doctor(db, 3, specialization="Cardiology")
+    db.add(DoctorAvailability(doctor_id=2, start_time=NINE - timedelta(hours=1), end_time=NINE + timedelta(hours=1)))
+    db.add(DoctorAvailability(doctor_id=3, start_time=NINE - timedelta(hours=3), end_time=NINE))
+    db.add(Appointment(doctor_id=1, patient_id=1, start_time=NINE, end_time=NINE + timedelta(minutes=30)))
+    db.commit()
+
+    doctor_ids = crud.specialization_doctor_ids(db, "GP")
+    found = crud.next_available_slots(db, doctor_ids, 30, NINE - timedelta(hours=4), count=3)
+
+    assert [(slot["doctor_id"], slot["start"]) for slot in found] == [
+        (2, NINE - timedelta(hours=1)),
+        (1, NINE + timedelta(minutes=30)),
+        (1, NINE + timedelta(days=1)),
+    ]
+    assert crud.next_available_slots(db, doctor_ids, 30, NINE + timedelta(days=2), max_days=30) == []
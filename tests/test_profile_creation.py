@@ -0,0 +1,39 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+from app import crud, schemas
+from app.models import User, Patient, Doctor
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+
+
+def test_failed_profile_insert_leaves_no_user(db):
+    # first_name is NOT NULL, so the profile insert fails after the user row.
+    patient = schemas.PatientCreate.model_construct(
+        first_name=None, last_name="Lee", email="orphan@example.com", password="pw", phone=None, insurance=None
+    )
+
+    with pytest.raises(IntegrityError):
+        crud.create_patient(db, patient)
+
+    assert db.query(User).count() == 0
+    assert db.query(Patient).count() == 0
+
+
+def test_create_doctor_commits_once(db):
+    commits = []
+    event.listen(db, "after_commit", lambda session: commits.append(session))
+
+    doctor = crud.create_doctor(db, schemas.DoctorCreate(
+        first_name="Jane", last_name="Doe", specialization="GP", email="jane@example.com", password="pw"
+    ))
+
+    assert len(commits) == 1
+    assert doctor.user.email == "jane@example.com"
+    assert db.query(Doctor).one().user_id == doctor.user.id
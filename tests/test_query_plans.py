@@ -0,0 +1,90 @@
+import pytest
+from contextlib import contextmanager
+from datetime import datetime, timedelta, date
+from sqlalchemy import event, text
+from sqlalchemy.orm import sessionmaker
+from app import crud
+from app.models import User, Role, Doctor, Patient, Appointment, DoctorAvailability, AppointmentStatus
+
+DAY = date(2025, 6, 18)
+
+
+@pytest.fixture(scope="module")
+def seeded_session(module_engine):
+    db = sessionmaker(bind=module_engine)()
+
+    for n in range(20):
+        db.add(User(id=n + 1, email=f"doc{n}@example.com", hashed_password="x", role=Role.doctor))
+        db.add(Doctor(id=n + 1, user_id=n + 1, first_name="Doc", last_name=str(n), specialization="GP"))
+    db.add(User(id=100, email="patient@example.com", hashed_password="x", role=Role.patient))
+    db.add(Patient(id=1, user_id=100, first_name="Pat", last_name="Ient"))
+
+    base = datetime.combine(DAY, datetime.min.time()) - timedelta(days=60)
+    for doctor_id in range(1, 21):
+        for day in range(120):
+            start = base + timedelta(days=day, hours=9)
+            db.add(DoctorAvailability(doctor_id=doctor_id, start_time=start, end_time=start + timedelta(hours=8)))
+            for slot in range(0, 8 * 60, 45):
+                db.add(Appointment(
+                    doctor_id=doctor_id, patient_id=1,
+                    start_time=start + timedelta(minutes=slot),
+                    end_time=start + timedelta(minutes=slot + 30),
+                    status=AppointmentStatus.scheduled if slot % 90 else AppointmentStatus.canceled,
+                ))
+    db.commit()
+    db.execute(text("ANALYZE"))
+    yield db
+    db.close()
+
+
+@contextmanager
+def capture_query_plans(db):
+    plans = []
+
+    def explain(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+            plans.append((statement, [row[3] for row in cursor.fetchall()]))
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", explain)
+    try:
+        yield plans
+    finally:
+        event.remove(engine, "before_cursor_execute", explain)
+
+
+def assert_index_scans(plans, tables):
+    seen = set()
+    for statement, details in plans:
+        for table in tables:
+            if f"FROM {table}" not in statement:
+                continue
+            seen.add(table)
+            scans = [d for d in details if table in d]
+            assert scans and all("USING" in d and "INDEX" in d for d in scans), (statement, details)
+    assert seen == set(tables)
+
+
+def test_generate_open_slots_uses_indexes(seeded_session):
+    with capture_query_plans(seeded_session) as plans:
+        slots = crud.generate_open_slots(seeded_session, 5, DAY, 30)
+
+    assert slots
+    assert_index_scans(plans, ["doctor_availabilities", "appointments"])
+
+
+def test_is_doctor_available_uses_indexes(seeded_session):
+    start = datetime.combine(DAY, datetime.min.time()).replace(hour=9, minute=30)
+    with capture_query_plans(seeded_session) as plans:
+        crud.is_doctor_available(seeded_session, 5, start, start + timedelta(minutes=15))
+
+    assert_index_scans(plans, ["doctor_availabilities", "appointments"])
+
+
+def test_appointment_listings_use_indexes(seeded_session):
+    with capture_query_plans(seeded_session) as plans:
+        crud.list_appointments(seeded_session, doctor_id=5, start_date=DAY, end_date=DAY + timedelta(days=6))
+        crud.list_appointments(seeded_session, patient_id=1, start_date=DAY, end_date=DAY)
+
+    assert_index_scans(plans, ["appointments"])
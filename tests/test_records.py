@@ -0,0 +1,51 @@
+import orjson
+import pytest
+from datetime import datetime, timedelta
+from typing import List
+from pydantic import TypeAdapter
+from sqlalchemy.orm import sessionmaker
+from app import crud, records, schemas
+from app.models import User, Role, Doctor, Patient, Appointment, AppointmentStatus
+
+
+@pytest.fixture(scope="module")
+def db(module_engine):
+    db = sessionmaker(bind=module_engine)()
+    for n in range(1, 6):
+        db.add(User(id=n, email=f"doc{n}@example.com", hashed_password="x", role=Role.doctor))
+        db.add(Doctor(id=n, user_id=n, first_name="Doc", last_name=f"Tor {n}", specialization="GP"))
+        db.add(User(id=100 + n, email=f"pat{n}@example.com", hashed_password="x", role=Role.patient))
+        db.add(Patient(id=n, user_id=100 + n, first_name="Pät", last_name=f'"{n}"',
+                       phone=None if n % 2 else "555", insurance=None if n % 3 else "NHIF"))
+    start = datetime(2031, 5, 5, 9, 0, 0, 250000)
+    for n in range(12):
+        db.add(Appointment(
+            doctor_id=n % 5 + 1, patient_id=n % 5 + 1,
+            start_time=start + timedelta(minutes=15 * n), end_time=start + timedelta(minutes=15 * n + 15),
+            status=list(AppointmentStatus)[n % 3],
+        ))
+    db.commit()
+    yield db
+    db.close()
+
+
+def as_json(content):
+    return orjson.loads(records.json_response(content).body)
+
+
+@pytest.mark.parametrize("list_models, list_records, schema, filters", [
+    (crud.list_patients, crud.list_patient_records, schemas.PatientOut, {"limit": 3}),
+    (crud.list_patients, crud.list_patient_records, schemas.PatientOut, {"cursor": 2, "insurance": "NHIF"}),
+    (crud.list_doctors, crud.list_doctor_records, schemas.DoctorOut, {"name": "tor"}),
+    (crud.list_appointments, crud.list_appointment_records, schemas.AppointmentOut, {"limit": 5, "doctor_id": 2}),
+    (crud.list_appointments, crud.list_appointment_records, schemas.AppointmentOut, {}),
+])
+def test_records_match_the_response_models(db, list_models, list_records, schema, filters):
+    objects, expected_cursor = list_models(db, **filters)
+    content, next_cursor = list_records(db, **filters)
+
+    adapter = TypeAdapter(List[schema])
+    expected = adapter.dump_python(adapter.validate_python(objects, from_attributes=True), mode="json")
+    assert expected
+    assert as_json(content) == expected
+    assert next_cursor == expected_cursor
@@ -0,0 +1,102 @@
+import random
+import pytest
+from datetime import datetime, date, time, timedelta
+from sqlalchemy.orm import sessionmaker
+from app import crud, recurrence, schemas
+from app.models import User, Role, Doctor, Patient, Appointment, AvailabilityRule, AvailabilityException, DoctorAvailability
+from app.slot_store import store
+
+MONDAY = date(2025, 6, 16)
+
+
+def rule(weekdays, start_date, end_date, start, end, exceptions=(), doctor_id=1):
+    return AvailabilityRule(
+        doctor_id=doctor_id, weekday_mask=recurrence.weekday_mask(weekdays),
+        start_date=start_date, end_date=end_date, start_time=start, end_time=end,
+        exceptions=[AvailabilityException(date=day) for day in sorted(set(exceptions))],
+    )
+
+
+def test_expand_rules_respects_weekdays_range_and_exceptions():
+    rules = [rule([0, 2], MONDAY, MONDAY + timedelta(days=14), time(9), time(12), exceptions=[MONDAY + timedelta(days=7)])]
+
+    occurrences = list(recurrence.expand_rules(rules, MONDAY - timedelta(days=3), MONDAY + timedelta(days=30)))
+
+    assert [window[0] for _, window in occurrences] == [
+        datetime(2025, 6, 16, 9), datetime(2025, 6, 18, 9),
+        datetime(2025, 6, 25, 9), datetime(2025, 6, 30, 9),
+    ]
+    assert occurrences[0] == (1, (datetime(2025, 6, 16, 9), datetime(2025, 6, 16, 12)))
+
+
+def test_open_ended_rules_expand_lazily():
+    occurrences = recurrence.expand_rules([rule([4], MONDAY, None, time(8), time(9))], MONDAY, date.max)
+    assert next(occurrences)[1][0] == datetime(2025, 6, 20, 8)
+    assert next(occurrences)[1][0] == datetime(2025, 6, 27, 8)
+
+
+@pytest.fixture
+def db(engine):
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    db.add(User(id=100, email="pat@example.com", hashed_password="x", role=Role.patient))
+    db.add(Patient(id=1, user_id=100, first_name="Pat", last_name="Ient"))
+    for doctor_id in (1, 2):
+        db.add(User(id=doctor_id, email=f"doc{doctor_id}@example.com", hashed_password="x", role=Role.doctor))
+        db.add(Doctor(id=doctor_id, user_id=doctor_id, first_name="Doc", last_name=str(doctor_id), specialization="GP"))
+    db.commit()
+    yield db
+    db.close()
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_rules_match_materialized_rows(db, seed):
+    # Doctor 1 gets rules, doctor 2 the same calendar as concrete rows.
+    rng = random.Random(seed)
+    last_day = MONDAY + timedelta(days=20)
+    for _ in range(rng.randint(1, 3)):
+        start = time(rng.randrange(6, 14), rng.choice([0, 15, 30]))
+        end = (datetime.combine(MONDAY, start) + timedelta(minutes=rng.randrange(30, 480, 15))).time()
+        first = MONDAY + timedelta(days=rng.randrange(7))
+        weekdays = rng.sample(range(7), rng.randint(1, 5))
+        skipped = [first + timedelta(days=rng.randrange(20)) for _ in range(2)]
+        db.add(rule(weekdays, first, rng.choice([None, last_day - timedelta(days=3)]), start, end, skipped))
+    db.commit()
+    for _, (start, end) in recurrence.expand_rules(db.query(AvailabilityRule).all(), MONDAY, last_day):
+        db.add(DoctorAvailability(doctor_id=2, start_time=start, end_time=end))
+    for doctor_id in (1, 2):
+        for day in range(0, 21, 2):
+            start = datetime.combine(MONDAY + timedelta(days=day), time(10, 10))
+            db.add(Appointment(doctor_id=doctor_id, patient_id=1, start_time=start, end_time=start + timedelta(minutes=50)))
+    db.commit()
+
+    for day in range(21):
+        current = MONDAY + timedelta(days=day)
+        # Materialized rows come back in insertion order, which is the
+        # expansion order, so even the slot order has to agree.
+        assert crud.generate_open_slots(db, 1, current, 30) == crud.generate_open_slots(db, 2, current, 30)
+        for _ in range(5):
+            start = datetime.combine(current, time(rng.randrange(5, 22), rng.choice([0, 10, 45])))
+            end = start + timedelta(minutes=rng.choice([15, 30, 90]))
+            assert crud.is_doctor_available(db, 1, start, end) == crud.is_doctor_available(db, 2, start, end)
+
+    search = {
+        doctor_id: [(day, day_slots) for _, day, day_slots in results]
+        for doctor_id in (1, 2)
+        for results in [crud.search_open_slots(db, MONDAY, last_day, 30, doctor_ids=[doctor_id])]
+    }
+    assert search[1] == search[2]
+
+
+def test_new_exceptions_refresh_stored_days(db):
+    created = crud.create_availability_rule(db, 1, schemas.AvailabilityRuleCreate(
+        weekdays=[0], start_date=MONDAY, start_time=time(9), end_time=time(10)
+    ))
+    assert crud.generate_open_slots(db, 1, MONDAY, 30)
+    version = crud.get_calendar_version(db, 1)
+
+    crud.add_availability_exceptions(db, created, [MONDAY])
+
+    assert crud.get_calendar_version(db, 1) > version
+    assert store.peek(1, MONDAY) is None
+    assert crud.generate_open_slots(db, 1, MONDAY, 30) == []
+    assert crud.generate_open_slots(db, 1, MONDAY + timedelta(days=7), 30)
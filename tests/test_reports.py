@@ -0,0 +1,72 @@
+import random
+import pytest
+from datetime import datetime, time, timedelta
+from app import crud, reports, slots
+from app.models import Appointment, AvailabilityRule, Doctor, DoctorAvailability, User, Role
+from tests.conftest import DAY
+
+
+def random_clinic(db, rng, first_day, days):
+    for doctor_id in (2, 3):
+        db.add_all([
+            User(id=10 + doctor_id, email=f"doc{doctor_id}@example.com", hashed_password="x", role=Role.doctor),
+            Doctor(id=doctor_id, user_id=10 + doctor_id, first_name="Doc", last_name=str(doctor_id),
+                   specialization="GP" if doctor_id == 2 else "Cardiology"),
+        ])
+    for doctor_id in (1, 2, 3):
+        for _ in range(rng.randint(0, 8)):
+            start = datetime.combine(first_day + timedelta(days=rng.randrange(-1, days)),
+                                     time(rng.randrange(6, 16), rng.choice([0, 7, 30])))
+            db.add(DoctorAvailability(doctor_id=doctor_id, start_time=start, end_time=start + timedelta(
+                minutes=rng.choice([45, 180, 600, 2 * 24 * 60 + 90]))))
+        if rng.random() < 0.5:
+            db.add(AvailabilityRule(doctor_id=doctor_id, weekday_mask=rng.randrange(1, 128), start_date=first_day,
+                                    end_date=None, start_time=time(12, 15), end_time=time(16)))
+        for _ in range(rng.randint(0, 25)):
+            start = datetime.combine(first_day + timedelta(days=rng.randrange(days)),
+                                     time(rng.randrange(6, 20), rng.choice([0, 10, 25, 45])))
+            db.add(Appointment(doctor_id=doctor_id, patient_id=1, start_time=start,
+                               end_time=start + timedelta(minutes=rng.choice([15, 30, 50, 120]))))
+    db.commit()
+
+
+@pytest.mark.parametrize("seed", range(15))
+def test_report_matches_generate_open_slots(Session, seed):
+    rng = random.Random(seed)
+    db = Session()
+    first_day, days = DAY - timedelta(days=3), 7
+    random_clinic(db, rng, first_day, days)
+    slot_minutes = rng.choice([15, 30, 45, 60])
+
+    report = reports.capacity_report(db, first_day, first_day + timedelta(days=days - 1), slot_minutes)
+
+    assert [doctor["doctor_id"] for doctor in report["doctors"]] == [1, 2, 3]
+    assert reports.cross_check(db, report, samples=100) == []
+    for doctor in report["doctors"]:
+        for day in doctor["days"]:
+            day_slots = crud.load_day_slots(db, doctor["doctor_id"], day["date"])
+            windows = slots.merge_intervals(window for window in day_slots.windows if window[0] < window[1])
+            busy = slots.merge_intervals(day_slots.appointments)
+            free = [gap for window in windows for gap in slots.free_intervals(window, busy)]
+            minutes = [int((end - start).total_seconds() // 60) for start, end in free]
+            assert day["available_minutes"] == sum(int((end - start).total_seconds() // 60) for start, end in windows)
+            assert day["free_minutes"] == sum(minutes)
+            assert day["booked_minutes"] == day["available_minutes"] - day["free_minutes"]
+            assert day["largest_gap_minutes"] == max(minutes, default=0)
+        assert doctor["slots"] == sum(day["slots"] for day in doctor["days"])
+
+
+def test_report_totals(Session):
+    db = Session()
+    db.add(Appointment(doctor_id=1, patient_id=1, start_time=datetime.combine(DAY, time(9, 30)),
+                       end_time=datetime.combine(DAY, time(10))))
+    db.commit()
+
+    report = reports.capacity_report(db, DAY, DAY + timedelta(days=1), 30, specialization="GP", daily=False)
+
+    # The fixture's doctor is available 9-11 on both days.
+    assert report["doctors"] == [{
+        "doctor_id": 1, "available_minutes": 240, "booked_minutes": 30, "free_minutes": 210,
+        "utilization": 0.125, "free_gaps": 3, "fragmentation": round(1 - 180 / 210, 4), "slots": 27, "days": None,
+    }]
+    assert reports.capacity_report(db, DAY, DAY, 30, specialization="Cardiology")["doctors"] == []
@@ -0,0 +1,159 @@
+import random
+import pytest
+from datetime import timedelta
+from sqlalchemy import text
+from app import crud, schemas
+from app.models import AppointmentStatus
+from app.slot_store import DaySlots, SlotStore, store
+from app.slots import open_slots
+from tests.conftest import NINE, DAY, count_queries
+from tests.test_slots import random_calendar
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_day_slots_match_open_slots(seed):
+    rng = random.Random(seed)
+    availabilities, appointments = random_calendar(rng)
+    slot_minutes = rng.choice([5, 15, 30, 60])
+    day_slots = DaySlots(DAY, availabilities, appointments[1:])
+    if appointments:
+        day_slots.book(*appointments[0])
+
+    assert day_slots.open_slots(slot_minutes) == open_slots(availabilities, appointments, DAY, slot_minutes)
+
+
+def test_entries_are_only_served_for_their_version():
+    slot_store = SlotStore(maxsize=10, ttl_seconds=60)
+    newer = DaySlots(DAY, [], [], version=2)
+    slot_store.put(1, newer)
+    # A reader that loaded before the last write must not replace it.
+    slot_store.put(1, DaySlots(DAY, [], [], version=1))
+    assert slot_store.get(1, DAY, 2) is newer
+    assert slot_store.get(1, DAY, 3) is None
+    assert slot_store.peek(1, DAY) is None
+
+
+def fresh(db, day=DAY):
+    return crud.load_day_slots(db, 1, day).open_slots(30)
+
+
+def test_reads_are_served_from_the_store(Session):
+    db = Session()
+    first = crud.generate_open_slots(db, 1, DAY, 30)
+    statements = count_queries(db)
+    assert crud.generate_open_slots(db, 1, DAY, 60) == open_slots(
+        [(NINE, NINE + timedelta(hours=2))], [], DAY, 60
+    )
+    assert crud.generate_open_slots(db, 1, DAY, 30) == first
+    # Only the calendar version is read.
+    assert all("doctor_availabilities" not in s and "appointments" not in s for s in statements)
+    assert len(statements) == 2
+    db.close()
+
+
+def test_writes_from_other_processes_are_picked_up(Session):
+    db = Session()
+    crud.generate_open_slots(db, 1, DAY, 30)
+    db.execute(text("INSERT INTO appointments (patient_id, doctor_id, start_time, end_time, status) "
+                    "VALUES (1, 1, :start, :end, 'scheduled')"),
+               {"start": NINE, "end": NINE + timedelta(minutes=30)})
+    db.execute(text("UPDATE doctors SET calendar_version = calendar_version + 1 WHERE id = 1"))
+    db.commit()
+
+    assert crud.generate_open_slots(db, 1, DAY, 30)[0]["start"] == "09:30"
+    db.close()
+
+
+def test_booking_patches_only_its_day(Session):
+    db = Session()
+    crud.generate_open_slots(db, 1, DAY, 30)
+    crud.generate_open_slots(db, 1, DAY + timedelta(days=1), 30)
+    next_day = store.peek(1, DAY + timedelta(days=1))
+
+    crud.create_appointment(db, schemas.AppointmentCreate(
+        patient_id=1, doctor_id=1, start_time=NINE, end_time=NINE + timedelta(minutes=30)
+    ))
+
+    assert store.peek(1, DAY + timedelta(days=1)) is next_day
+    assert store.peek(1, DAY).version == crud.get_calendar_version(db, 1)
+    assert crud.generate_open_slots(db, 1, DAY, 30) == fresh(db)
+    assert crud.generate_open_slots(db, 1, DAY, 30)[0]["start"] == "09:30"
+    assert crud.check_slot_store(db) == []
+    db.close()
+
+
+def test_new_availability_invalidates_its_days(Session):
+    db = Session()
+    crud.generate_open_slots(db, 1, DAY, 30)
+    crud.generate_open_slots(db, 1, DAY + timedelta(days=1), 30)
+
+    crud.create_availability(db, 1, schemas.AvailabilityCreate(
+        start_time=NINE + timedelta(hours=5), end_time=NINE + timedelta(hours=6)
+    ))
+
+    assert store.peek(1, DAY) is None
+    assert store.peek(1, DAY + timedelta(days=1)) is not None
+    assert crud.generate_open_slots(db, 1, DAY, 30) == fresh(db)
+    db.close()
+
+
+def test_cancellation_invalidates_after_commit(Session):
+    db = Session()
+    appointment = crud.create_appointment(db, schemas.AppointmentCreate(
+        patient_id=1, doctor_id=1, start_time=NINE, end_time=NINE + timedelta(minutes=30)
+    ))
+    crud.generate_open_slots(db, 1, DAY, 30)
+
+    appointment.status = AppointmentStatus.canceled
+    db.flush()
+    assert store.peek(1, DAY) is not None
+    db.rollback()
+    assert store.peek(1, DAY) is not None
+
+    appointment.status = AppointmentStatus.canceled
+    db.commit()
+    assert store.peek(1, DAY) is None
+    assert crud.generate_open_slots(db, 1, DAY, 30)[0]["start"] == "09:00"
+    db.close()
+
+
+def test_status_transitions_patch_and_reschedules_invalidate(Session):
+    db = Session()
+    appointment = crud.create_appointment(db, schemas.AppointmentCreate(
+        patient_id=1, doctor_id=1, start_time=NINE, end_time=NINE + timedelta(minutes=30)
+    ))
+    crud.generate_open_slots(db, 1, DAY, 30)
+    cached = store.peek(1, DAY)
+
+    assert crud.transition_appointment(db, appointment.id, AppointmentStatus.canceled).status == AppointmentStatus.canceled
+    assert crud.transition_appointment(db, appointment.id, AppointmentStatus.completed) is None
+    assert store.peek(1, DAY) is cached
+    assert cached.version == crud.get_calendar_version(db, 1)
+    assert crud.generate_open_slots(db, 1, DAY, 30) == fresh(db)
+
+    appointment = crud.create_appointment(db, schemas.AppointmentCreate(
+        patient_id=1, doctor_id=1, start_time=NINE, end_time=NINE + timedelta(minutes=30)
+    ))
+    crud.generate_open_slots(db, 1, DAY + timedelta(days=1), 30)
+    moved = crud.reschedule_appointment(db, appointment, NINE + timedelta(days=1), NINE + timedelta(days=1, minutes=30))
+    assert moved.start_time == NINE + timedelta(days=1)
+    assert store.peek(1, DAY) is None and store.peek(1, DAY + timedelta(days=1)) is None
+    assert crud.generate_open_slots(db, 1, DAY, 30)[0]["start"] == "09:00"
+    assert crud.generate_open_slots(db, 1, DAY + timedelta(days=1), 30)[0]["start"] == "09:30"
+    assert crud.check_slot_store(db) == []
+    db.close()
+
+
+def test_consistency_check_drops_stale_days(Session):
+    db = Session()
+    crud.generate_open_slots(db, 1, DAY, 30)
+    crud.generate_open_slots(db, 1, DAY + timedelta(days=1), 30)
+    # A write the store cannot see, e.g. from another process.
+    db.execute(text("DELETE FROM doctor_availabilities WHERE start_time < :cutoff"),
+               {"cutoff": NINE + timedelta(hours=12)})
+    db.commit()
+
+    assert crud.check_slot_store(db) == [(1, DAY)]
+    assert crud.generate_open_slots(db, 1, DAY, 30) == []
+    assert crud.check_slot_store(db) == []
+    db.close()
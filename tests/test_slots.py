@@ -0,0 +1,59 @@
+import random
+import pytest
+from datetime import datetime, timedelta, date
+from app.slots import open_slots, naive_open_slots, merge_intervals
+
+DAY = date(2025, 6, 18)
+MIDNIGHT = datetime.combine(DAY, datetime.min.time())
+
+
+def random_interval(rng, base, span_minutes, max_length):
+    start = base + timedelta(minutes=rng.randrange(span_minutes), seconds=rng.choice([0, 0, 0, 30]))
+    return start, start + timedelta(minutes=rng.randint(0, max_length))
+
+
+def random_calendar(rng):
+    availabilities = []
+    for _ in range(rng.randint(0, 4)):
+        # Mostly same-day blocks, with some spanning into neighbouring days.
+        base = MIDNIGHT + timedelta(days=rng.choice([0, 0, 0, -1]))
+        availabilities.append(random_interval(rng, base, 24 * 60, rng.choice([240, 600, 2 * 24 * 60])))
+    appointments = [
+        random_interval(rng, MIDNIGHT, 24 * 60, 120)
+        for _ in range(rng.randint(0, 25))
+    ]
+    return availabilities, appointments
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_open_slots_matches_naive(seed):
+    rng = random.Random(seed)
+    availabilities, appointments = random_calendar(rng)
+    slot_minutes = rng.choice([5, 15, 30, 45, 60, 240])
+
+    assert open_slots(availabilities, appointments, DAY, slot_minutes) == \
+        naive_open_slots(availabilities, appointments, DAY, slot_minutes)
+
+
+def test_open_slots_skips_booked_time():
+    availabilities = [(MIDNIGHT.replace(hour=9), MIDNIGHT.replace(hour=10))]
+    appointments = [(MIDNIGHT.replace(hour=9, minute=10), MIDNIGHT.replace(hour=9, minute=40))]
+
+    slots = open_slots(availabilities, appointments, DAY, 20)
+
+    assert slots == [
+        {"start": "09:40", "end": "10:00"},
+    ]
+
+
+def test_merge_intervals_joins_overlapping_and_touching():
+    a = MIDNIGHT.replace(hour=9)
+    assert merge_intervals([
+        (a + timedelta(minutes=30), a + timedelta(minutes=60)),
+        (a, a + timedelta(minutes=30)),
+        (a + timedelta(minutes=90), a + timedelta(minutes=120)),
+        (a + timedelta(minutes=95), a + timedelta(minutes=100)),
+    ]) == [
+        (a, a + timedelta(minutes=60)),
+        (a + timedelta(minutes=90), a + timedelta(minutes=120)),
+    ]
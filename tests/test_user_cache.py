@@ -0,0 +1,106 @@
+import time
+import pytest
+from fastapi import HTTPException
+from app.models import User, Role
+from app.security import UserCache, require_role, load_user, create_access_token, decode_token
+
+
+def make_user(email="cached@example.com", role=Role.doctor):
+    return User(id=7, email=email, hashed_password="x", role=role)
+
+
+class FailingSession:
+    def query(self, *args):
+        raise AssertionError("database should not be queried")
+
+
+def test_hit_miss_and_invalidation():
+    cache = UserCache(maxsize=10, ttl_seconds=60)
+    assert cache.get("cached@example.com") is None
+    cache.put("cached@example.com", make_user())
+
+    assert cache.get("cached@example.com").role == Role.doctor
+    cache.invalidate("cached@example.com")
+    assert cache.get("cached@example.com") is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_entries_expire_with_the_token():
+    cache = UserCache(maxsize=10, ttl_seconds=60)
+    cache.put("cached@example.com", make_user(), token_exp=time.time() + 0.05)
+    assert cache.get("cached@example.com") is not None
+    time.sleep(0.1)
+    assert cache.get("cached@example.com") is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = UserCache(maxsize=2, ttl_seconds=60)
+    for email in ("a@example.com", "b@example.com"):
+        cache.put(email, make_user(email))
+    cache.get("a@example.com")
+    cache.put("c@example.com", make_user("c@example.com"))
+
+    assert cache.get("b@example.com") is None
+    assert cache.get("a@example.com") is not None
+
+
+def test_load_user_serves_cached_user_without_database(monkeypatch):
+    from app import security
+    monkeypatch.setattr(security, "user_cache", UserCache(maxsize=10, ttl_seconds=60))
+    security.user_cache.put("cached@example.com", make_user())
+
+    user = load_user(FailingSession(), {"sub": "cached@example.com"})
+    assert user.email == "cached@example.com"
+
+
+def test_require_role_rejects_from_token_claims_without_database():
+    payload = decode_token(create_access_token({"sub": "nobody@example.com", "uid": 3, "role": "patient"}))
+    checker = require_role("admin")
+
+    with pytest.raises(HTTPException) as exc_info:
+        checker(payload=payload, db=FailingSession())
+    assert exc_info.value.status_code == 403
+
+
+def test_role_change_invalidates_cached_user(monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app import security
+    from app.database import Base
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    monkeypatch.setattr(security, "user_cache", UserCache(maxsize=10, ttl_seconds=60))
+
+    db.add(make_user())
+    db.commit()
+    assert load_user(db, {"sub": "cached@example.com"}).role == Role.doctor
+
+    db.query(User).filter(User.email == "cached@example.com").one().role = Role.admin
+    db.commit()
+
+    assert security.user_cache.get("cached@example.com") is None
+    assert load_user(db, {"sub": "cached@example.com"}).role == Role.admin
+    db.close()
+
+
+def test_websocket_auth_releases_its_session(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app import security
+    from app.database import Base
+    from app.security import require_role_ws
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'ws.db'}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(make_user())
+    db.commit()
+    monkeypatch.setattr(security, "user_cache", UserCache(maxsize=10, ttl_seconds=60))
+
+    user = require_role_ws("doctor")(token=create_access_token({"sub": "cached@example.com"}), db=db)
+    assert user.email == "cached@example.com"
+    assert not db.in_transaction()
+    assert engine.pool.checkedout() == 0
+    engine.dispose()